@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Balance, BalanceSnapshot, BalanceHistory
+from .models import (
+    AuditCheckpoint, AuditOpening, Balance, BalanceDrift, BalanceHistory, BalanceMovement, BalanceSnapshot, DailyBalance,
+)
+from .services import BalanceService
 
 
 @admin.register(Balance)
@@ -12,12 +15,58 @@ class BalanceAdmin(admin.ModelAdmin):
 
 @admin.register(BalanceSnapshot)
 class BalanceSnapshotAdmin(admin.ModelAdmin):
-    list_display = ('snapshot_date', 'created_by', 'description', 'total_records')
-    readonly_fields = ('total_records', 'total_quantity')
+    list_display = ('snapshot_date', 'created_by', 'description', 'is_delta', 'total_records')
+    list_filter = ('is_delta',)
+    readonly_fields = ('parent', 'is_delta', 'total_records', 'total_quantity')
 
 
 @admin.register(BalanceHistory)
 class BalanceHistoryAdmin(admin.ModelAdmin):
-    list_display = ('snapshot', 'place', 'culture', 'balance_type', 'quantity')
-    list_filter = ('balance_type',)
-    search_fields = ('place__name', 'culture__name')
\ No newline at end of file
+    list_display = ('snapshot', 'place', 'culture', 'balance_type', 'quantity', 'is_removed')
+    list_filter = ('balance_type', 'is_removed')
+    search_fields = ('place__name', 'culture__name')
+
+    def save_model(self, request, obj, form, change):
+        # Дельта-нащадки зліпка не повинні побачити цю зміну
+        BalanceService.detach_delta_children(obj.snapshot)
+        super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        BalanceService.detach_delta_children(obj.snapshot)
+        super().delete_model(request, obj)
+
+@admin.register(BalanceMovement)
+class BalanceMovementAdmin(admin.ModelAdmin):
+    list_display = ('date_time', 'place', 'culture', 'balance_type', 'delta', 'source_type', 'source_id')
+    list_filter = ('balance_type', 'source_type')
+    search_fields = ('place__name', 'culture__name')
+    date_hierarchy = 'date_time'
+
+    def has_change_permission(self, request, obj=None):
+        # Журнал рухів — лише для читання
+        return False
+
+
+@admin.register(DailyBalance)
+class DailyBalanceAdmin(admin.ModelAdmin):
+    list_display = ('day', 'place', 'culture', 'balance_type', 'delta', 'closing', 'is_opening')
+    list_filter = ('balance_type', 'is_opening', 'place', 'culture')
+    date_hierarchy = 'day'
+
+
+@admin.register(BalanceDrift)
+class BalanceDriftAdmin(admin.ModelAdmin):
+    list_display = ('detected_at', 'source_type', 'source_id', 'place', 'culture', 'balance_type', 'expected', 'actual', 'resolved_at')
+    list_filter = ('source_type', 'balance_type', 'resolved_at')
+    search_fields = ('place__name', 'culture__name')
+
+
+@admin.register(AuditCheckpoint)
+class AuditCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('source_type', 'baseline_id', 'last_id', 'openings_recorded', 'updated_at')
+
+
+@admin.register(AuditOpening)
+class AuditOpeningAdmin(admin.ModelAdmin):
+    list_display = ('source_type', 'source_id', 'place', 'culture', 'balance_type', 'amount')
+    list_filter = ('source_type', 'balance_type')
@@ -0,0 +1,192 @@
+"""
+Інкрементальний аудит залишків.
+
+Для кожного документа, доданого або зміненого після останнього запуску,
+порівнюється очікуване проведення (за `balance_posting_rules()`) із сумою
+його рухів у `BalanceMovement`. Рухи пишуться в тій самій транзакції, що й
+зміна `Balance`, тож будь-яка помилка в `revert_balance()`/`update_balance()`
+видна як розбіжність і записується в `BalanceDrift`.
+
+Змінені документи знаходимо за новими рухами (source_type, source_id),
+нові — за id більшим за `AuditCheckpoint.last_id`. Видалений документ
+очікує нуль, тож залишений ним "хвіст" у рухах теж потрапляє в розбіжності.
+
+Документи, створені до першого запуску, могли бути проведені ще до журналу
+рухів. Для них при першому запуску записується `AuditOpening` — різниця
+очікуваного і рухів, — і далі перевіряються лише нові рухи: помилка, зроблена
+до першого запуску, в розбіжності не потрапить.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import AuditCheckpoint, AuditOpening, BalanceDrift, BalanceMovement
+from .postings import posting_models
+
+
+MOVEMENTS_CHECKPOINT = BalanceMovement._meta.label_lower
+
+
+class BalanceAuditService:
+    """Порівняння документів з журналом рухів від останньої позиції аудиту."""
+
+    CHUNK_SIZE = 500
+
+    @staticmethod
+    def _checkpoint(source_type, model=None):
+        checkpoint, created = AuditCheckpoint.objects.select_for_update().get_or_create(source_type=source_type)
+        if created and model is not None:
+            # Документи до першого запуску могли бути створені ще до журналу рухів
+            max_id = model._default_manager.aggregate(m=Max('pk'))['m'] or 0
+            checkpoint.baseline_id = checkpoint.last_id = max_id
+            checkpoint.save(update_fields=['baseline_id', 'last_id', 'updated_at'])
+        if model is not None and not checkpoint.openings_recorded:
+            BalanceAuditService._record_openings(model, checkpoint.baseline_id)
+            checkpoint.openings_recorded = True
+            checkpoint.save(update_fields=['openings_recorded', 'updated_at'])
+        return checkpoint
+
+    @staticmethod
+    def _record_openings(model, baseline_id):
+        """`AuditOpening` для документів з id <= baseline_id, чиї рухи не дають їхнього проведення."""
+        source_type = model._meta.label_lower
+        ids = set(model._default_manager.filter(pk__lte=baseline_id).values_list('pk', flat=True))
+        # Уже видалені документи залишили в журналі лише відкат свого проведення
+        ids.update(BalanceMovement.objects.filter(
+            source_type=source_type, source_id__lte=baseline_id,
+        ).values_list('source_id', flat=True).distinct().order_by())
+        ids = sorted(ids)
+        openings = []
+        for start in range(0, len(ids), BalanceAuditService.CHUNK_SIZE):
+            chunk = ids[start:start + BalanceAuditService.CHUNK_SIZE]
+            expected = BalanceAuditService.expected_postings(model, chunk)
+            posted = BalanceAuditService.posted_movements(source_type, chunk)
+            for key in expected.keys() | posted.keys():
+                amount = expected.get(key, Decimal('0')) - posted.get(key, Decimal('0'))
+                if amount:
+                    source_id, place_id, culture_id, balance_type = key
+                    openings.append(AuditOpening(
+                        source_type=source_type, source_id=source_id,
+                        place_id=place_id, culture_id=culture_id, balance_type=balance_type, amount=amount,
+                    ))
+        AuditOpening.objects.bulk_create(openings, batch_size=BalanceAuditService.CHUNK_SIZE)
+
+    @staticmethod
+    def expected_postings(model, ids):
+        """{(id, place_id, culture_id, balance_type): delta} за правилами проведення моделі."""
+        expected = {}
+        queryset = model._default_manager.filter(pk__in=ids)
+        for rule in model.balance_posting_rules():
+            rows = rule.apply(queryset).values('pk', '_place_id', 'culture_id', '_balance_type').annotate(
+                total=Sum('_amount')
+            ).order_by()
+            for row in rows:
+                key = (row['pk'], row['_place_id'], row['culture_id'], row['_balance_type'])
+                expected[key] = expected.get(key, Decimal('0')) + rule.sign * (row['total'] or 0)
+        return expected
+
+    @staticmethod
+    def posted_movements(source_type, ids, openings=False):
+        """{(id, place_id, culture_id, balance_type): delta} — сума рухів документів.
+
+        `openings=True` додає `AuditOpening` старих документів.
+        """
+        rows = BalanceMovement.objects.filter(source_type=source_type, source_id__in=ids).values(
+            'source_id', 'place_id', 'culture_id', 'balance_type'
+        ).annotate(total=Sum('delta')).order_by()
+        posted = {
+            (row['source_id'], row['place_id'], row['culture_id'], row['balance_type']): row['total']
+            for row in rows
+        }
+        if openings:
+            for opening in AuditOpening.objects.filter(source_type=source_type, source_id__in=ids):
+                key = (opening.source_id, opening.place_id, opening.culture_id, opening.balance_type)
+                posted[key] = posted.get(key, Decimal('0')) + opening.amount
+        return posted
+
+    @staticmethod
+    def check_documents(model, ids):
+        """Перевіряє документи і оновлює `BalanceDrift`. Повертає кількість нових розбіжностей."""
+        source_type = model._meta.label_lower
+        expected = BalanceAuditService.expected_postings(model, ids)
+        posted = BalanceAuditService.posted_movements(source_type, ids, openings=True)
+
+        mismatches = {}
+        for key in expected.keys() | posted.keys():
+            exp = expected.get(key, Decimal('0'))
+            act = posted.get(key, Decimal('0'))
+            if exp != act:
+                mismatches[key] = (exp, act)
+
+        open_drifts = {
+            (d.source_id, d.place_id, d.culture_id, d.balance_type): d
+            for d in BalanceDrift.objects.filter(source_type=source_type, source_id__in=ids, resolved_at__isnull=True)
+        }
+
+        now = timezone.now()
+        created = []
+        to_update = []
+        for key, drift in open_drifts.items():
+            if key not in mismatches:
+                drift.resolved_at = now
+                to_update.append(drift)
+            else:
+                drift.expected, drift.actual = mismatches.pop(key)
+                to_update.append(drift)
+
+        for (source_id, place_id, culture_id, balance_type), (exp, act) in mismatches.items():
+            created.append(BalanceDrift(
+                source_type=source_type, source_id=source_id,
+                place_id=place_id, culture_id=culture_id, balance_type=balance_type,
+                expected=exp, actual=act,
+            ))
+
+        BalanceDrift.objects.bulk_update(to_update, ['expected', 'actual', 'resolved_at'])
+        BalanceDrift.objects.bulk_create(created)
+        return len(created)
+
+    @staticmethod
+    @transaction.atomic
+    def run():
+        """Один прохід аудиту від збережених позицій.
+
+        Повертає кортеж (checked_documents, new_drifts).
+        """
+        models = {model._meta.label_lower: model for model in posting_models()}
+
+        movement_checkpoint = BalanceAuditService._checkpoint(MOVEMENTS_CHECKPOINT)
+        # Верхню межу фіксуємо на початку — рухи, що з'являться під час проходу, підуть у наступний
+        last_movement = BalanceMovement.objects.aggregate(m=Max('id'))['m'] or 0
+        touched = {label: set() for label in models}
+        changed = BalanceMovement.objects.filter(
+            id__gt=movement_checkpoint.last_id, id__lte=last_movement, source_type__in=list(models),
+        ).values_list('source_type', 'source_id').distinct().order_by()
+        for source_type, source_id in changed:
+            touched[source_type].add(source_id)
+
+        checked = 0
+        drifts = 0
+        for label, model in models.items():
+            checkpoint = BalanceAuditService._checkpoint(label, model)
+            last_id = model._default_manager.aggregate(m=Max('pk'))['m'] or 0
+            touched[label].update(
+                model._default_manager.filter(pk__gt=checkpoint.last_id, pk__lte=last_id).values_list('pk', flat=True)
+            )
+
+            ids = sorted(touched[label])
+            for start in range(0, len(ids), BalanceAuditService.CHUNK_SIZE):
+                chunk = ids[start:start + BalanceAuditService.CHUNK_SIZE]
+                drifts += BalanceAuditService.check_documents(model, chunk)
+            checked += len(ids)
+
+            if last_id > checkpoint.last_id:
+                checkpoint.last_id = last_id
+                checkpoint.save(update_fields=['last_id', 'updated_at'])
+
+        if last_movement > movement_checkpoint.last_id:
+            movement_checkpoint.last_id = last_movement
+            movement_checkpoint.save(update_fields=['last_id', 'updated_at'])
+
+        return checked, drifts
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from balances.audit import BalanceAuditService
+
+
+class Command(BaseCommand):
+    help = (
+        'Інкрементальний аудит: перевірити документи, додані або змінені з останнього запуску, '
+        'і записати розбіжності з журналом рухів у BalanceDrift.'
+    )
+
+    def handle(self, *args, **options):
+        checked, drifts = BalanceAuditService.run()
+        if drifts:
+            self.stdout.write(self.style.WARNING(f'Перевірено документів: {checked}. Нових розбіжностей: {drifts}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Перевірено документів: {checked}. Розбіжностей немає.'))
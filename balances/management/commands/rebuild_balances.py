@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+# Процес пулу (spawn) імпортує цей модуль ще до django.setup(), тому моделі
+# і сервіси імпортуються всередині функцій, а не на рівні модуля
+
+
+def _init_worker():
+    # Процес пулу запускається "з нуля" (spawn) — Django треба налаштувати в ньому
+    import django
+    django.setup()
+    connections.close_all()
+
+
+def _verify_places(place_ids, baseline_id):
+    from balances.models import BalanceSnapshot
+    from balances.services import BalanceService
+
+    baseline = BalanceSnapshot.objects.get(pk=baseline_id) if baseline_id else None
+    try:
+        return BalanceService.verify_balances(place_ids, baseline)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Перерахувати очікувані Balance з журналів і операцій з відходами, '
+        'порівняти з поточними і (з --fix) виправити розбіжності.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Записати очікувані залишки замість поточних')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Кількість процесів (1 — без пулу)')
+        parser.add_argument('--baseline', type=int, metavar='SNAPSHOT_ID',
+                            help='Рахувати від зліпка: його стан + документи після його дати')
+        parser.add_argument('--from-last-snapshot', action='store_true',
+                            help='Рахувати від останнього зліпка')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Розмір пачки для bulk_update/bulk_create')
+
+    def handle(self, *args, **options):
+        from balances.models import Balance, BalanceMovement, BalanceSnapshot
+        from balances.services import BalanceService
+        from directory.models import Place
+
+        baseline = None
+        if options['baseline']:
+            baseline = BalanceSnapshot.objects.filter(pk=options['baseline']).first()
+            if baseline is None:
+                raise CommandError(f'Зліпок {options["baseline"]} не знайдено.')
+        elif options['from_last_snapshot']:
+            baseline = BalanceSnapshot.objects.order_by('-snapshot_date').first()
+
+        place_ids = sorted(
+            set(Place.objects.values_list('id', flat=True))
+            | set(Balance.objects.values_list('place_id', flat=True))
+        )
+        workers = max(1, min(options['workers'], len(place_ids)))
+        # Місця різного розміру — ділимо по колу, щоб навантаження вирівнялося
+        chunks = [place_ids[i::workers] for i in range(workers)]
+
+        changes = []
+        if workers == 1:
+            changes = BalanceService.verify_balances(place_ids, baseline)
+        else:
+            connections.close_all()
+            # spawn однаково поводиться на Linux, Windows і macOS і не успадковує з'єднань з БД
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            ) as pool:
+                for result in pool.map(_verify_places, chunks, [baseline and baseline.pk] * workers):
+                    changes.extend(result)
+
+        for c in changes:
+            current = '—' if c.old_quantity is None else c.old_quantity
+            self.stdout.write(
+                f'place={c.place_id} culture={c.culture_id} {c.balance_type}: '
+                f'{current} -> {c.new_quantity} ({c.delta:+})'
+            )
+
+        source = f'від зліпка {baseline.pk}' if baseline else 'з усієї історії'
+        if not changes:
+            self.stdout.write(self.style.SUCCESS(f'Розбіжностей немає ({len(place_ids)} місць, {source}).'))
+            return
+
+        if not options['fix']:
+            self.stdout.write(self.style.WARNING(
+                f'Розбіжностей: {len(changes)} ({source}). Запустіть з --fix, щоб виправити.'
+            ))
+            return
+
+        # Місця з розбіжностями перераховуються ще раз під блокуванням їхніх Balance
+        created, updated = BalanceService.fix_balances(
+            {c.place_id for c in changes}, baseline, BalanceMovement.SOURCE_REBUILD, options['batch_size']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Виправлено ({source}). Created: {created}, Updated: {updated}'))
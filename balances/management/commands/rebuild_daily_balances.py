@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from balances.services import BalanceService
+
+
+class Command(BaseCommand):
+    help = 'Перебудувати матеріалізовані залишки на кінець дня (DailyBalance).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-journals', action='store_true',
+                            help='Рахувати з журналів і операцій з відходами замість журналу рухів (бекфіл історії)')
+        parser.add_argument('--no-anchor', dest='anchor', action='store_false',
+                            help='Не вирівнювати залишки по поточному Balance (звіти таку таблицю не використовують)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Розмір пакета для bulk_create')
+
+    def handle(self, *args, **options):
+        count = BalanceService.rebuild_daily_balances(
+            from_journals=options['from_journals'],
+            anchor=options['anchor'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'DailyBalance перебудовано: {count} рядків.'))
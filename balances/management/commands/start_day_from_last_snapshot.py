@@ -7,10 +7,32 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--zeros', action='store_true', help='Для існуючих записів, відсутніх у зліпку, встановити 0')
+        parser.add_argument('--dry-run', action='store_true', help='Лише показати зміни, нічого не записувати')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Розмір пачки для bulk_update/bulk_create')
 
     def handle(self, *args, **options):
         zero = options.get('zeros', False)
-        snapshot, created, updated = BalanceService.start_day_from_last_snapshot(copy_missing_as_zero=zero)
+
+        if options['dry_run']:
+            snapshot, changes = BalanceService.preview_start_day(copy_missing_as_zero=zero)
+            if not snapshot:
+                self.stdout.write(self.style.WARNING('Зліпків не знайдено.'))
+                return
+            for c in changes:
+                old = '—' if c.old_quantity is None else c.old_quantity
+                self.stdout.write(
+                    f'place={c.place_id} culture={c.culture_id} {c.balance_type}: {old} -> {c.new_quantity} ({c.delta:+})'
+                )
+            created = sum(1 for c in changes if c.balance_id is None)
+            self.stdout.write(self.style.SUCCESS(
+                f'Dry-run за зліпком {snapshot.id} ({snapshot.snapshot_date}). '
+                f'Буде створено: {created}, оновлено: {len(changes) - created}'
+            ))
+            return
+
+        snapshot, created, updated = BalanceService.start_day_from_last_snapshot(
+            copy_missing_as_zero=zero, batch_size=options['batch_size']
+        )
         if not snapshot:
             self.stdout.write(self.style.WARNING('Зліпків не знайдено.'))
             return
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:46
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('balances', '0001_initial'),
+        ('directory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance_type', models.CharField(choices=[('stock', 'Зерно'), ('waste', 'Відходи')], default='stock', max_length=10, verbose_name='Тип балансу')),
+                ('delta', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Зміна (тонн)')),
+                ('source_type', models.CharField(default='manual', max_length=50, verbose_name='Джерело')),
+                ('source_id', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='ID документа')),
+                ('date_time', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата операції')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Час проведення')),
+                ('culture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_movements', to='directory.culture', verbose_name='Культура')),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_movements', to='directory.place', verbose_name='Місце зберігання')),
+            ],
+            options={
+                'verbose_name': 'Рух залишку',
+                'verbose_name_plural': 'Рухи залишків',
+                'ordering': ['-date_time', '-id'],
+                'indexes': [models.Index(fields=['date_time'], name='balmove_date_idx'), models.Index(fields=['place', 'culture', 'balance_type', 'date_time'], name='balmove_key_date_idx'), models.Index(fields=['source_type', 'source_id'], name='balmove_source_idx')],
+            },
+        ),
+    ]
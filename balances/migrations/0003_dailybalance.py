@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('balances', '0002_balancemovement'),
+        ('directory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('balance_type', models.CharField(choices=[('stock', 'Зерно'), ('waste', 'Відходи')], default='stock', max_length=10, verbose_name='Тип балансу')),
+                ('delta', models.DecimalField(decimal_places=3, default=0, max_digits=12, verbose_name='Зміна за день (тонн)')),
+                ('closing', models.DecimalField(decimal_places=3, default=0, max_digits=12, verbose_name='Залишок на кінець дня (тонн)')),
+                ('culture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to='directory.culture', verbose_name='Культура')),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_balances', to='directory.place', verbose_name='Місце зберігання')),
+            ],
+            options={
+                'verbose_name': 'Залишок на кінець дня',
+                'verbose_name_plural': 'Залишки на кінець дня',
+                'ordering': ['-day', 'place__name', 'culture__name'],
+                'indexes': [models.Index(fields=['day'], name='dailybal_day_idx')],
+                'unique_together': {('place', 'culture', 'balance_type', 'day')},
+            },
+        ),
+    ]
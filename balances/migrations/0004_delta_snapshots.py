@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('balances', '0003_dailybalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='balancehistory',
+            name='is_removed',
+            field=models.BooleanField(default=False, verbose_name='Видалено відносно базового'),
+        ),
+        migrations.AddField(
+            model_name='balancesnapshot',
+            name='is_delta',
+            field=models.BooleanField(default=False, verbose_name='Дельта-зліпок'),
+        ),
+        migrations.AddField(
+            model_name='balancesnapshot',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='delta_children', to='balances.balancesnapshot', verbose_name='Базовий зліпок'),
+        ),
+        migrations.AddField(
+            model_name='balancesnapshot',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версія записів'),
+        ),
+    ]
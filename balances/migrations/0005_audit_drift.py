@@ -0,0 +1,51 @@
+# Generated by Django 5.2.5 on 2026-10-18 08:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('balances', '0004_delta_snapshots'),
+        ('directory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(max_length=50, unique=True, verbose_name='Таблиця')),
+                ('baseline_id', models.PositiveBigIntegerField(default=0, verbose_name='Перший перевірюваний id')),
+                ('last_id', models.PositiveBigIntegerField(default=0, verbose_name='Останній перевірений id')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Оновлено')),
+            ],
+            options={
+                'verbose_name': 'Позиція аудиту',
+                'verbose_name_plural': 'Позиції аудиту',
+                'ordering': ['source_type'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceDrift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(max_length=50, verbose_name='Документ')),
+                ('source_id', models.PositiveBigIntegerField(verbose_name='ID документа')),
+                ('balance_type', models.CharField(choices=[('stock', 'Зерно'), ('waste', 'Відходи')], default='stock', max_length=10, verbose_name='Тип балансу')),
+                ('expected', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Очікувано (тонн)')),
+                ('actual', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Проведено (тонн)')),
+                ('detected_at', models.DateTimeField(auto_now_add=True, verbose_name='Виявлено')),
+                ('resolved_at', models.DateTimeField(blank=True, null=True, verbose_name='Усунено')),
+                ('culture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_drifts', to='directory.culture', verbose_name='Культура')),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_drifts', to='directory.place', verbose_name='Місце зберігання')),
+            ],
+            options={
+                'verbose_name': 'Розбіжність залишку',
+                'verbose_name_plural': 'Розбіжності залишків',
+                'ordering': ['-detected_at', '-id'],
+                'indexes': [models.Index(fields=['source_type', 'source_id'], name='baldrift_source_idx'), models.Index(fields=['resolved_at'], name='baldrift_resolved_idx')],
+            },
+        ),
+    ]
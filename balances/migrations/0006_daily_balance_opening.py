@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:14
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def anchor_daily_balances(apps, schema_editor):
+    """Вирівнює наявні рядки DailyBalance по поточному Balance.
+
+    До цієї міграції перший рядок ключа писався як 0 + рух, тож `closing`
+    не враховував залишок, що був до появи таблиці. Різниця з Balance
+    додається до всіх рядків ключа і пишеться початковим залишком на день
+    перед першим рядком (або на сьогодні, якщо рядків ще немає).
+    """
+    Balance = apps.get_model('balances', 'Balance')
+    DailyBalance = apps.get_model('balances', 'DailyBalance')
+
+    closing = {}
+    first_day = None
+    rows = DailyBalance.objects.order_by('day').values_list('place_id', 'culture_id', 'balance_type', 'day', 'closing')
+    for place_id, culture_id, balance_type, day, value in rows.iterator(chunk_size=5000):
+        closing[(place_id, culture_id, balance_type)] = value
+        first_day = first_day or day
+
+    current = {
+        (place_id, culture_id, balance_type): quantity
+        for place_id, culture_id, balance_type, quantity
+        in Balance.objects.values_list('place_id', 'culture_id', 'balance_type', 'quantity')
+    }
+    offsets = {
+        key: current.get(key, Decimal('0')) - closing.get(key, Decimal('0'))
+        for key in set(current) | set(closing)
+    }
+
+    for (place_id, culture_id, balance_type), offset in offsets.items():
+        if offset and (place_id, culture_id, balance_type) in closing:
+            DailyBalance.objects.filter(
+                place_id=place_id, culture_id=culture_id, balance_type=balance_type,
+            ).update(closing=F('closing') + offset)
+
+    opening_day = first_day - timedelta(days=1) if first_day else timezone.localdate()
+    DailyBalance.objects.bulk_create([
+        DailyBalance(place_id=key[0], culture_id=key[1], balance_type=key[2],
+                     day=opening_day, delta=0, closing=offset, is_opening=True)
+        for key, offset in offsets.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('balances', '0005_audit_drift'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailybalance',
+            name='is_opening',
+            field=models.BooleanField(default=False, verbose_name='Початковий залишок'),
+        ),
+        migrations.RunPython(anchor_daily_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('balances', '0006_daily_balance_opening'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100, unique=True, verbose_name='Таблиця')),
+                ('version', models.BigIntegerField(verbose_name='Версія')),
+            ],
+            options={
+                'verbose_name': 'Версія даних',
+                'verbose_name_plural': 'Версії даних',
+                'ordering': ['table'],
+            },
+        ),
+    ]
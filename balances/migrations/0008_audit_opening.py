@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('balances', '0007_data_version'),
+        ('directory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditcheckpoint',
+            name='openings_recorded',
+            field=models.BooleanField(default=False, verbose_name='Початкові проведення записано'),
+        ),
+        migrations.AlterField(
+            model_name='auditcheckpoint',
+            name='baseline_id',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Останній id до аудиту'),
+        ),
+        migrations.CreateModel(
+            name='AuditOpening',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_type', models.CharField(max_length=50, verbose_name='Документ')),
+                ('source_id', models.PositiveBigIntegerField(verbose_name='ID документа')),
+                ('balance_type', models.CharField(choices=[('stock', 'Зерно'), ('waste', 'Відходи')], default='stock', max_length=10, verbose_name='Тип балансу')),
+                ('amount', models.DecimalField(decimal_places=3, max_digits=12, verbose_name='Поза журналом рухів (тонн)')),
+                ('culture', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audit_openings', to='directory.culture', verbose_name='Культура')),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audit_openings', to='directory.place', verbose_name='Місце зберігання')),
+            ],
+            options={
+                'verbose_name': 'Початкове проведення аудиту',
+                'verbose_name_plural': 'Початкові проведення аудиту',
+                'ordering': ['source_type', 'source_id'],
+                'unique_together': {('source_type', 'source_id', 'place', 'culture', 'balance_type')},
+            },
+        ),
+    ]
@@ -1,6 +1,13 @@
-from django.db import models
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 
+from .versions import bump
+
 
 class BalanceType(models.TextChoices):
     STOCK = "stock", "Зерно"
@@ -44,13 +51,38 @@ class Balance(models.Model):
     def __str__(self):
         return f"{self.place} - {self.culture} ({self.balance_type}): {self.quantity} т"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        bump(self)
+
+    def delete(self, *args, **kwargs):
+        bump(self)
+        return super().delete(*args, **kwargs)
+
 
 class BalanceSnapshot(models.Model):
-    """Група записів — зліпок на певну дату/час."""
+    """Група записів — зліпок на певну дату/час.
+
+    Повний зліпок зберігає всі ключі (place, culture, balance_type).
+    Дельта-зліпок (`is_delta=True`) зберігає лише ключі, що змінилися відносно
+    `parent`; ключі, яких більше немає, позначені записом з `is_removed=True`.
+    Повний стан відновлює `materialize()` — результат кешується за (pk, version).
+    """
 
     snapshot_date = models.DateTimeField(default=timezone.now, verbose_name='Дата зліпку')
     description = models.CharField(max_length=255, blank=True, default='', verbose_name='Опис')
     created_by = models.CharField(max_length=100, blank=True, default='система', verbose_name='Створено')
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='delta_children',
+        verbose_name='Базовий зліпок',
+    )
+    is_delta = models.BooleanField(default=False, verbose_name='Дельта-зліпок')
+    # Збільшується при кожній зміні записів — ключ кешу матеріалізації
+    version = models.PositiveIntegerField(default=0, editable=False, verbose_name='Версія записів')
 
     class Meta:
         verbose_name = 'Зліпок залишків'
@@ -61,13 +93,85 @@ class BalanceSnapshot(models.Model):
         return f"Зліпок від {self.snapshot_date.strftime('%d.%m.%Y %H:%M')}"
 
     def total_records(self):
+        if self.is_delta:
+            return len(self.materialize())
         return self.history_records.count()
 
     def total_quantity(self):
+        if self.is_delta:
+            return sum(self.materialize().values(), Decimal('0'))
         from django.db.models import Sum
         agg = self.history_records.aggregate(total=Sum('quantity'))
         return agg['total'] or 0
 
+    def _cache_key(self):
+        return f'balances:snapshot:{self.pk}:{self.version}'
+
+    def materialize(self):
+        """Повний стан зліпка: {(place_id, culture_id, balance_type): quantity}.
+
+        Для дельта-зліпка стан батька доповнюється власними записами.
+        """
+        data = cache.get(self._cache_key())
+        if data is not None:
+            return data
+
+        data = dict(self.parent.materialize()) if self.is_delta and self.parent_id else {}
+        rows = self.history_records.values_list('place_id', 'culture_id', 'balance_type', 'quantity', 'is_removed')
+        for place_id, culture_id, balance_type, quantity, is_removed in rows.order_by():
+            key = (place_id, culture_id, balance_type)
+            if is_removed:
+                data.pop(key, None)
+            else:
+                data[key] = quantity
+
+        cache.set(self._cache_key(), data, getattr(settings, 'BALANCE_SNAPSHOT_CACHE_TIMEOUT', 3600))
+        return data
+
+    def get_records(self, filters=None):
+        """Записи зліпка з place/culture — queryset для повного, список для дельта-зліпка.
+
+        `filters` — як у звітах: place_id, culture_id, balance_type.
+        """
+        filters = filters or {}
+        if not self.is_delta:
+            queryset = self.history_records.select_related('place', 'culture').all()
+            if place_id := filters.get('place_id'):
+                queryset = queryset.filter(place_id=place_id)
+            if culture_id := filters.get('culture_id'):
+                queryset = queryset.filter(culture_id=culture_id)
+            if balance_type := filters.get('balance_type'):
+                queryset = queryset.filter(balance_type=balance_type)
+            return queryset
+
+        from directory.models import Culture, Place
+
+        items = [
+            (key, quantity) for key, quantity in self.materialize().items()
+            if (not filters.get('place_id') or str(key[0]) == str(filters['place_id']))
+            and (not filters.get('culture_id') or str(key[1]) == str(filters['culture_id']))
+            and (not filters.get('balance_type') or key[2] == filters['balance_type'])
+        ]
+        places = Place.objects.in_bulk({key[0] for key, _ in items})
+        cultures = Culture.objects.in_bulk({key[1] for key, _ in items})
+        return [
+            BalanceHistory(
+                snapshot=self,
+                place=places[place_id],
+                culture=cultures[culture_id],
+                balance_type=balance_type,
+                quantity=quantity,
+            )
+            for (place_id, culture_id, balance_type), quantity in items
+        ]
+
+    def delete(self, *args, **kwargs):
+        # Дельта-нащадки спираються на записи цього зліпка — спершу робимо їх повними
+        from .services import BalanceService
+        with transaction.atomic():
+            BalanceService.detach_delta_children(self)
+            return super().delete(*args, **kwargs)
+
 
 class BalanceHistory(models.Model):
     """Окремий запис в контексті зліпку. Зберігає FK на place/culture для простоти доступу."""
@@ -105,6 +209,8 @@ class BalanceHistory(models.Model):
         default=0,
         verbose_name='Кількість (тонн)'
     )
+    # Тільки в дельта-зліпках: ключ є в батьківському зліпку, але зник у цьому
+    is_removed = models.BooleanField(default=False, verbose_name='Видалено відносно базового')
 
     class Meta:
         verbose_name = 'Історія залишків'
@@ -113,3 +219,253 @@ class BalanceHistory(models.Model):
 
     def __str__(self):
         return f"{self.place} — {self.culture}: {self.quantity} т"
+
+    def _touch_snapshot(self):
+        # Нова версія — матеріалізація зліпка з кешу більше не використовується
+        BalanceSnapshot.objects.filter(pk=self.snapshot_id).update(version=F('version') + 1)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._touch_snapshot()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._touch_snapshot()
+        return result
+
+
+class BalanceMovement(models.Model):
+    """Рух залишку — незмінний запис про кожне проведення по (place, culture, balance_type).
+
+    Пишеться в тій самій транзакції, що й зміна `Balance`, тому сума `delta`
+    за період дорівнює зміні залишку за цей період.
+    """
+
+    SOURCE_MANUAL = 'manual'
+    SOURCE_SNAPSHOT = 'snapshot'
+    SOURCE_REBUILD = 'rebuild'
+
+    place = models.ForeignKey(
+        'directory.Place',
+        on_delete=models.CASCADE,
+        related_name='balance_movements',
+        verbose_name='Місце зберігання',
+    )
+    culture = models.ForeignKey(
+        'directory.Culture',
+        on_delete=models.CASCADE,
+        related_name='balance_movements',
+        verbose_name='Культура',
+    )
+    balance_type = models.CharField(
+        max_length=10,
+        choices=BalanceType.choices,
+        default=BalanceType.STOCK,
+        verbose_name='Тип балансу',
+    )
+    delta = models.DecimalField(
+        max_digits=12,
+        decimal_places=3,
+        verbose_name='Зміна (тонн)'
+    )
+
+    # Документ-джерело: label моделі ('logistics.weigherjournal') + id,
+    # або 'manual' / 'snapshot' / 'rebuild' для ручних змін, старту дня зі зліпка
+    # і виправлень після перерахунку з журналів.
+    source_type = models.CharField(max_length=50, default=SOURCE_MANUAL, verbose_name='Джерело')
+    source_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name='ID документа')
+
+    date_time = models.DateTimeField(default=timezone.now, verbose_name='Дата операції')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Час проведення')
+
+    class Meta:
+        verbose_name = 'Рух залишку'
+        verbose_name_plural = 'Рухи залишків'
+        ordering = ['-date_time', '-id']
+        indexes = [
+            models.Index(fields=['date_time'], name='balmove_date_idx'),
+            models.Index(fields=['place', 'culture', 'balance_type', 'date_time'], name='balmove_key_date_idx'),
+            models.Index(fields=['source_type', 'source_id'], name='balmove_source_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.place} - {self.culture} ({self.balance_type}): {self.delta:+} т"
+
+
+class DailyBalance(models.Model):
+    """Матеріалізований залишок на кінець дня по (place, culture, balance_type).
+
+    Рядок є лише для днів, коли по ключу були рухи: `delta` — чиста зміна за день,
+    `closing` — залишок на кінець дня. Залишок на дату X — це `closing`
+    останнього рядка з `day <= X` (один пошук по індексу на ключ).
+    Підтримується інкрементально з `BalanceService.record_movements`.
+
+    Таблиця достовірна лише від дня початкових залишків (`is_opening`), які
+    вирівнюють її по `Balance` (`rebuild_daily_balances`, міграція 0006);
+    для раніших дат звіти беруть зліпки.
+    """
+
+    day = models.DateField(verbose_name='День')
+    place = models.ForeignKey(
+        'directory.Place',
+        on_delete=models.CASCADE,
+        related_name='daily_balances',
+        verbose_name='Місце зберігання',
+    )
+    culture = models.ForeignKey(
+        'directory.Culture',
+        on_delete=models.CASCADE,
+        related_name='daily_balances',
+        verbose_name='Культура',
+    )
+    balance_type = models.CharField(
+        max_length=10,
+        choices=BalanceType.choices,
+        default=BalanceType.STOCK,
+        verbose_name='Тип балансу',
+    )
+    delta = models.DecimalField(max_digits=12, decimal_places=3, default=0, verbose_name='Зміна за день (тонн)')
+    closing = models.DecimalField(max_digits=12, decimal_places=3, default=0, verbose_name='Залишок на кінець дня (тонн)')
+    is_opening = models.BooleanField(default=False, verbose_name='Початковий залишок')
+
+    class Meta:
+        verbose_name = 'Залишок на кінець дня'
+        verbose_name_plural = 'Залишки на кінець дня'
+        ordering = ['-day', 'place__name', 'culture__name']
+        unique_together = ('place', 'culture', 'balance_type', 'day')
+        indexes = [
+            models.Index(fields=['day'], name='dailybal_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day:%d.%m.%Y} {self.place} - {self.culture} ({self.balance_type}): {self.closing} т"
+
+
+class AuditCheckpoint(models.Model):
+    """Позиція аудитора залишків по одній таблиці.
+
+    Для таблиць документів `last_id` — останній перевірений id, `baseline_id` —
+    максимальний id на момент першого запуску (старіші документи можуть не мати
+    повного журналу рухів, їхні непроведені в журнал частини — `AuditOpening`).
+    Для журналу рухів (`balances.balancemovement`) `last_id` — останній прочитаний
+    рух: нові рухи вказують на змінені документи.
+    """
+
+    source_type = models.CharField(max_length=50, unique=True, verbose_name='Таблиця')
+    baseline_id = models.PositiveBigIntegerField(default=0, verbose_name='Останній id до аудиту')
+    last_id = models.PositiveBigIntegerField(default=0, verbose_name='Останній перевірений id')
+    openings_recorded = models.BooleanField(default=False, verbose_name='Початкові проведення записано')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Оновлено')
+
+    class Meta:
+        verbose_name = 'Позиція аудиту'
+        verbose_name_plural = 'Позиції аудиту'
+        ordering = ['source_type']
+
+    def __str__(self):
+        return f"{self.source_type}: {self.last_id}"
+
+
+class AuditOpening(models.Model):
+    """Частина проведення старого документа, якої немає в журналі рухів.
+
+    Записується один раз для документів з id <= `AuditCheckpoint.baseline_id`:
+    різниця між очікуваним проведенням і сумою рухів на момент першого запуску
+    аудиту. Далі аудит порівнює такий документ з рухами плюс цією різницею, тобто
+    перевіряє лише рухи, записані після першого запуску.
+    """
+
+    source_type = models.CharField(max_length=50, verbose_name='Документ')
+    source_id = models.PositiveBigIntegerField(verbose_name='ID документа')
+    place = models.ForeignKey(
+        'directory.Place',
+        on_delete=models.CASCADE,
+        related_name='audit_openings',
+        verbose_name='Місце зберігання',
+    )
+    culture = models.ForeignKey(
+        'directory.Culture',
+        on_delete=models.CASCADE,
+        related_name='audit_openings',
+        verbose_name='Культура',
+    )
+    balance_type = models.CharField(
+        max_length=10,
+        choices=BalanceType.choices,
+        default=BalanceType.STOCK,
+        verbose_name='Тип балансу',
+    )
+    amount = models.DecimalField(max_digits=12, decimal_places=3, verbose_name='Поза журналом рухів (тонн)')
+
+    class Meta:
+        verbose_name = 'Початкове проведення аудиту'
+        verbose_name_plural = 'Початкові проведення аудиту'
+        ordering = ['source_type', 'source_id']
+        unique_together = ('source_type', 'source_id', 'place', 'culture', 'balance_type')
+
+    def __str__(self):
+        return f"{self.source_type}#{self.source_id} {self.place} - {self.culture}: {self.amount:+} т"
+
+
+class BalanceDrift(models.Model):
+    """Розбіжність між очікуваним проведенням документа і його рухами в `BalanceMovement`."""
+
+    source_type = models.CharField(max_length=50, verbose_name='Документ')
+    source_id = models.PositiveBigIntegerField(verbose_name='ID документа')
+    place = models.ForeignKey(
+        'directory.Place',
+        on_delete=models.CASCADE,
+        related_name='balance_drifts',
+        verbose_name='Місце зберігання',
+    )
+    culture = models.ForeignKey(
+        'directory.Culture',
+        on_delete=models.CASCADE,
+        related_name='balance_drifts',
+        verbose_name='Культура',
+    )
+    balance_type = models.CharField(
+        max_length=10,
+        choices=BalanceType.choices,
+        default=BalanceType.STOCK,
+        verbose_name='Тип балансу',
+    )
+    expected = models.DecimalField(max_digits=12, decimal_places=3, verbose_name='Очікувано (тонн)')
+    actual = models.DecimalField(max_digits=12, decimal_places=3, verbose_name='Проведено (тонн)')
+    detected_at = models.DateTimeField(auto_now_add=True, verbose_name='Виявлено')
+    resolved_at = models.DateTimeField(null=True, blank=True, verbose_name='Усунено')
+
+    class Meta:
+        verbose_name = 'Розбіжність залишку'
+        verbose_name_plural = 'Розбіжності залишків'
+        ordering = ['-detected_at', '-id']
+        indexes = [
+            models.Index(fields=['source_type', 'source_id'], name='baldrift_source_idx'),
+            models.Index(fields=['resolved_at'], name='baldrift_resolved_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source_type}#{self.source_id} {self.place} - {self.culture}: {self.difference:+} т"
+
+    @property
+    def difference(self):
+        return self.actual - self.expected
+
+
+class DataVersion(models.Model):
+    """Версія даних таблиці для інвалідації кешів (див. `balances.versions`).
+
+    Зберігається в БД, а не в кеші: кеш може витіснити ключ версії, і звіт
+    знову знайшов би результат, порахований до останнього запису.
+    """
+
+    table = models.CharField(max_length=100, unique=True, verbose_name='Таблиця')
+    version = models.BigIntegerField(verbose_name='Версія')
+
+    class Meta:
+        verbose_name = 'Версія даних'
+        verbose_name_plural = 'Версії даних'
+        ordering = ['table']
+
+    def __str__(self):
+        return f"{self.table}: {self.version}"
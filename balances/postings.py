@@ -0,0 +1,209 @@
+"""
+Правила проведення документів по залишках для агрегатних запитів.
+
+Кожна модель-документ (журнали, операції з відходами) описує через
+`balance_posting_rules()`, як вона змінює `Balance`. За цими правилами
+можна порахувати вплив цілої таблиці одним GROUP BY-запитом на правило,
+без завантаження і `save()` окремих записів.
+"""
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F, Sum, Value, CharField
+from django.db.models.functions import TruncDate
+
+from .models import BalanceType
+from .versions import bump
+
+
+class PostingRule:
+    """Одне проведення документа: з якого поля місця, яку кількість і з яким знаком.
+
+    - `place_field` — FK на Place ('to_place', 'place_from', ...)
+    - `amount` — назва поля або вираз (F('weight_gross') - F('weight_tare'))
+    - `sign` — +1 (прихід) або -1 (списання)
+    - `balance_type` — константа BalanceType або назва поля моделі з типом
+    - `when` — умова на поля документа, {'action_type': 'import'} (тільки ввезення)
+    - `attr` — атрибут документа з тією ж кількістю, якщо `amount` — вираз
+    - `clamp` — якщо залишку не вистачає на списання, обнулити його замість помилки
+    """
+
+    def __init__(self, place_field, amount, sign, balance_type=BalanceType.STOCK, when=None, attr=None, clamp=False):
+        self.place_field = place_field
+        self.amount = F(amount) if isinstance(amount, str) else amount
+        self.attr = attr or (amount if isinstance(amount, str) else None)
+        self.sign = sign
+        self.balance_type = balance_type
+        self.when = when or {}
+        self.clamp = clamp
+
+    def _balance_type_expression(self, model):
+        field_names = {f.name for f in model._meta.get_fields()}
+        if self.balance_type in field_names:
+            return F(self.balance_type)
+        return Value(self.balance_type, output_field=CharField())
+
+    def apply(self, queryset):
+        """Повертає queryset, відфільтрований і анотований під це правило."""
+        qs = queryset.filter(**{f'{self.place_field}__isnull': False, 'culture__isnull': False})
+        if self.when:
+            qs = qs.filter(**self.when)
+        return qs.annotate(
+            _place_id=F(f'{self.place_field}_id'),
+            _balance_type=self._balance_type_expression(queryset.model),
+            _amount=self.amount,
+        )
+
+    def posting_for(self, document):
+        """Те саме проведення для одного документа в пам'яті — `Posting` або None."""
+        from .services import Posting
+
+        place_id = getattr(document, f'{self.place_field}_id')
+        if place_id is None or document.culture_id is None:
+            return None
+        if any(getattr(document, field) != value for field, value in self.when.items()):
+            return None
+        amount = getattr(document, self.attr) or 0
+        if not amount:
+            return None
+        field_names = {f.name for f in type(document)._meta.get_fields()}
+        balance_type = getattr(document, self.balance_type) if self.balance_type in field_names else self.balance_type
+        return Posting(place_id, document.culture_id, balance_type, self.sign * amount)
+
+
+class BalancePostingMixin:
+    """Спільний шар проведень для журналів і операцій з відходами.
+
+    Документ описує вплив на залишки через `balance_posting_rules()`. Під час
+    завантаження з БД запам'ятовуються лише сирі значення полів; старі проведення
+    з них рахуються на початку `save()` / `delete()`, тож перегляд списків нічого
+    зайвого не робить. На `Balance` потрапляє лише чиста різниця старих і нових
+    проведень — збереження, яке не змінило ваги, місця чи культуру, нічого не проводить.
+    """
+
+    _loaded_values = None
+    _original_postings = ()
+    _original_date_time = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _remember_values(self):
+        # Відкладені поля, які так і не завантажили, в знімок не потрапляють
+        self._loaded_values = {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields if field.attname in self.__dict__
+        }
+
+    def _capture_original(self):
+        """Запам'ятовує проведення документа, яким він збережений у БД.
+
+        Викликається до запису в БД. Повертає екземпляр зі збереженими значеннями
+        полів або None для нового документа. Поля, яких немає в знімку (відкладені
+        або документ створено не з БД), дочитуються одним запитом.
+        """
+        original = None
+        if self.pk is not None:
+            values = dict(self._loaded_values or {})
+            missing = [field.attname for field in self._meta.concrete_fields if field.attname not in values]
+            if missing:
+                row = type(self)._default_manager.filter(pk=self.pk).values(*missing).first()
+                values = None if row is None else {**values, **row}
+            if values is not None:
+                original = type(self)(**values)
+        self._original_postings = original.get_balance_postings() if original else []
+        self._original_date_time = original.date_time if original else self.date_time
+        return original
+
+    def get_balance_postings(self):
+        """Проведення документа за поточними значеннями полів."""
+        postings = []
+        for rule in self.balance_posting_rules():
+            posting = rule.posting_for(self)
+            if posting is not None:
+                postings.append(posting)
+        return postings
+
+    def _clamp_keys(self):
+        # Обнулення замість помилки: відкат попереднього приходу на ключ
+        # (товар могли вже перемістити далі) і правила з clamp=True.
+        keys = {(p.place_id, p.culture_id, p.balance_type) for p in self._original_postings if p.delta > 0}
+        for rule in self.balance_posting_rules():
+            posting = rule.posting_for(self) if rule.clamp else None
+            if posting is not None:
+                keys.add((posting.place_id, posting.culture_id, posting.balance_type))
+        return keys
+
+    def _post_balance(self, new_postings, clamp_all=False):
+        from .services import BalanceService
+
+        BalanceService.repost(
+            self._original_postings,
+            new_postings,
+            source=self,
+            old_date_time=self._original_date_time,
+            date_time=self.date_time,
+            clamp_keys=self._clamp_keys(),
+            clamp=clamp_all,
+        )
+
+    def revert_balance(self):
+        """Повністю відкочує проведення документа (при видаленні)."""
+        self._post_balance([], clamp_all=True)
+
+    def update_balance(self):
+        """Проводить чисту різницю між збереженими і поточними значеннями."""
+        self._post_balance(self.get_balance_postings())
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            self._capture_original()
+            super().save(*args, **kwargs)
+            self.update_balance()
+            bump(self)
+        # Подальші save() того ж інстансу рахують різницю від актуальних значень
+        self._remember_values()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self._capture_original()
+            self.revert_balance()
+            bump(self)
+            return super().delete(*args, **kwargs)
+
+
+def posting_models():
+    """Усі моделі-документи, які проводять зміни по залишках."""
+    return [m for m in apps.get_models() if hasattr(m, 'balance_posting_rules')]
+
+
+def aggregate_postings(model, queryset=None, by_day=False, place_ids=None):
+    """Сумарний вплив документів моделі на залишки — один GROUP BY на правило.
+
+    Повертає генератор кортежів (place_id, culture_id, balance_type, delta)
+    або, якщо `by_day=True`, (place_id, culture_id, balance_type, day, delta).
+    `place_ids` обмежує результат проведеннями по цих місцях.
+    """
+    queryset = model._default_manager.all() if queryset is None else queryset
+    group_by = ['_place_id', 'culture_id', '_balance_type']
+
+    for rule in model.balance_posting_rules():
+        qs = rule.apply(queryset)
+        if place_ids is not None:
+            qs = qs.filter(_place_id__in=place_ids)
+        if by_day:
+            qs = qs.annotate(_day=TruncDate('date_time'))
+        rows = qs.values(*group_by, *(['_day'] if by_day else [])).annotate(
+            total=Sum('_amount')
+        ).order_by()
+
+        for row in rows:
+            if not row['total']:
+                continue
+            delta = rule.sign * row['total']
+            if by_day:
+                yield row['_place_id'], row['culture_id'], row['_balance_type'], row['_day'], delta
+            else:
+                yield row['_place_id'], row['culture_id'], row['_balance_type'], delta
@@ -1,9 +1,32 @@
+from collections import namedtuple
+from datetime import timedelta
 from decimal import Decimal
-from django.db import transaction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 from django.core.exceptions import ObjectDoesNotExist
 
-from .models import Balance, BalanceHistory, BalanceSnapshot, BalanceType
+from .models import Balance, BalanceHistory, BalanceMovement, BalanceSnapshot, BalanceType, DailyBalance
+from .versions import bump
+
+
+# Одне проведення по залишку: (place_id, culture_id, balance_type, delta)
+Posting = namedtuple('Posting', ['place_id', 'culture_id', 'balance_type', 'delta'])
+
+
+class BalanceChange(namedtuple('BalanceChange', [
+    'balance_id', 'place_id', 'culture_id', 'balance_type', 'old_quantity', 'new_quantity',
+])):
+    """Зміна одного `Balance` при звірці зі зліпком; `balance_id=None` — новий запис."""
+
+    __slots__ = ()
+
+    @property
+    def delta(self):
+        return self.new_quantity - (self.old_quantity or 0)
 
 
 class BalanceService:
@@ -11,30 +34,118 @@ class BalanceService:
 
     @staticmethod
     @transaction.atomic
-    def create_snapshot(description: str = '', created_by: str = 'система', at_time=None) -> BalanceSnapshot:
+    def create_snapshot(description: str = '', created_by: str = 'система', at_time=None, delta=None) -> BalanceSnapshot:
         """Створити зліпок поточних `Balance`.
 
         - `at_time` дозволяє вказати довільну дату для зліпка (ручне створення за минулу дату).
+        - `delta=True` зберігає лише ключі, що змінилися відносно останнього зліпка;
+          за замовчуванням береться `settings.BALANCE_SNAPSHOT_DELTA`. Якщо ланцюжок
+          дельт досяг `BALANCE_SNAPSHOT_MAX_CHAIN`, створюється повний зліпок.
         """
         if at_time is None:
             at_time = timezone.now()
+        if delta is None:
+            delta = getattr(settings, 'BALANCE_SNAPSHOT_DELTA', False)
 
-        snapshot = BalanceSnapshot.objects.create(snapshot_date=at_time, description=description, created_by=created_by)
+        parent = BalanceSnapshot.objects.order_by('-id').first() if delta else None
+        if parent is not None:
+            max_chain = getattr(settings, 'BALANCE_SNAPSHOT_MAX_CHAIN', 30)
+            if BalanceService._delta_chain_length(parent) >= max_chain:
+                parent = None
+
+        snapshot = BalanceSnapshot.objects.create(
+            snapshot_date=at_time,
+            description=description,
+            created_by=created_by,
+            parent=parent,
+            is_delta=parent is not None,
+        )
+
+        current = {
+            (place_id, culture_id, balance_type): quantity
+            for place_id, culture_id, balance_type, quantity in Balance.objects.values_list(
+                'place_id', 'culture_id', 'balance_type', 'quantity'
+            ).order_by()
+        }
+        base = parent.materialize() if parent is not None else {}
 
-        balances = Balance.objects.select_related('place', 'culture').all()
         history_objs = [
             BalanceHistory(
                 snapshot=snapshot,
-                place=b.place,
-                culture=b.culture,
-                balance_type=b.balance_type,
-                quantity=b.quantity,
+                place_id=place_id,
+                culture_id=culture_id,
+                balance_type=balance_type,
+                quantity=quantity,
+            )
+            for (place_id, culture_id, balance_type), quantity in current.items()
+            if base.get((place_id, culture_id, balance_type)) != quantity
+        ]
+        history_objs += [
+            BalanceHistory(
+                snapshot=snapshot,
+                place_id=place_id,
+                culture_id=culture_id,
+                balance_type=balance_type,
+                quantity=0,
+                is_removed=True,
             )
-            for b in balances
+            for (place_id, culture_id, balance_type) in base.keys() - current.keys()
         ]
-        BalanceHistory.objects.bulk_create(history_objs)
+        BalanceHistory.objects.bulk_create(history_objs, batch_size=1000)
+
+        # Стан щойно створеного зліпка вже відомий — кладемо його в кеш одразу
+        cache.set(snapshot._cache_key(), current, getattr(settings, 'BALANCE_SNAPSHOT_CACHE_TIMEOUT', 3600))
         return snapshot
 
+    @staticmethod
+    def _delta_chain_length(snapshot) -> int:
+        """Скільки дельта-зліпків треба пройти до найближчого повного."""
+        length = 0
+        while snapshot.is_delta and snapshot.parent_id:
+            length += 1
+            snapshot = snapshot.parent
+        return length
+
+    @staticmethod
+    @transaction.atomic
+    def flatten_snapshot(snapshot: BalanceSnapshot) -> BalanceSnapshot:
+        """Перетворює дельта-зліпок на повний. Вміст зліпка не змінюється."""
+        if not snapshot.is_delta:
+            return snapshot
+
+        data = snapshot.materialize()
+        snapshot.history_records.all().delete()
+        BalanceHistory.objects.bulk_create([
+            BalanceHistory(
+                snapshot=snapshot,
+                place_id=place_id,
+                culture_id=culture_id,
+                balance_type=balance_type,
+                quantity=quantity,
+            )
+            for (place_id, culture_id, balance_type), quantity in data.items()
+        ], batch_size=1000)
+
+        snapshot.is_delta = False
+        snapshot.parent = None
+        snapshot.version += 1
+        snapshot.save(update_fields=['is_delta', 'parent', 'version'])
+        cache.set(snapshot._cache_key(), data, getattr(settings, 'BALANCE_SNAPSHOT_CACHE_TIMEOUT', 3600))
+        return snapshot
+
+    @staticmethod
+    @transaction.atomic
+    def detach_delta_children(snapshot: BalanceSnapshot) -> int:
+        """Робить повними дельта-зліпки, що спираються на `snapshot`.
+
+        Викликати перед редагуванням або видаленням `snapshot`.
+        Повертає кількість перетворених зліпків.
+        """
+        children = list(snapshot.delta_children.all())
+        for child in children:
+            BalanceService.flatten_snapshot(child)
+        return len(children)
+
     @staticmethod
     @transaction.atomic
     def create_snapshot_from_iterable(rows, description: str = '', created_by: str = 'система', at_time=None) -> BalanceSnapshot:
@@ -57,33 +168,398 @@ class BalanceService:
         BalanceHistory.objects.bulk_create(objs)
         return snapshot
 
+    @staticmethod
+    def _pk(value):
+        """Приймає модель або її id — повертає id."""
+        return getattr(value, 'pk', value)
+
+    @staticmethod
+    def _post_delta(place_id, culture_id, balance_type, delta):
+        """Атомарно змінює один `Balance` на delta.
+
+        Дельта і перевірка на від'ємний залишок виконуються одним UPDATE
+        (`quantity = quantity + delta WHERE quantity + delta >= 0`), тому
+        паралельні проведення по тому ж ключу не перезаписують одне одного.
+        Рядок створюється лише коли його ще немає (і тільки для delta >= 0).
+        """
+        bump(Balance)
+        qs = Balance.objects.filter(place_id=place_id, culture_id=culture_id, balance_type=balance_type)
+        guarded = qs.filter(quantity__gte=-delta) if delta < 0 else qs
+        if guarded.update(quantity=F('quantity') + delta):
+            return
+
+        if delta < 0:
+            raise ValueError('Недостатньо залишку.')
+
+        # Запису ще немає — створюємо. Якщо інший процес встиг створити
+        # його раніше, повторюємо атомарний UPDATE.
+        try:
+            with transaction.atomic():
+                Balance.objects.create(
+                    place_id=place_id,
+                    culture_id=culture_id,
+                    balance_type=balance_type,
+                    quantity=delta,
+                )
+        except IntegrityError:
+            qs.update(quantity=F('quantity') + delta)
+
+    @staticmethod
+    def _movement_source(source):
+        """Повертає (source_type, source_id, date_time) для запису в журнал рухів.
+
+        `source` — документ (журнал / операція з відходами), рядок-мітка
+        ('manual', 'snapshot') або None (= ручна зміна).
+        """
+        if source is None or isinstance(source, str):
+            return source or BalanceMovement.SOURCE_MANUAL, None, timezone.now()
+        date_time = getattr(source, 'date_time', None) or timezone.now()
+        return source._meta.label_lower, source.pk, date_time
+
+    @staticmethod
+    def record_movements(postings, source=None, date_time=None):
+        """Пише рухи в `BalanceMovement` одним bulk_create (нульові дельти пропускаються).
+
+        Викликається в тій самій транзакції, що й зміна `Balance`.
+        `date_time` перекриває дату документа — потрібно, щоб відкат старого
+        проведення потрапив у той день, коли воно було зроблене.
+        Разом з рухами оновлюються матеріалізовані залишки `DailyBalance`.
+        """
+        source_type, source_id, source_date_time = BalanceService._movement_source(source)
+        date_time = date_time or source_date_time
+        movements = [
+            BalanceMovement(
+                place_id=BalanceService._pk(place),
+                culture_id=BalanceService._pk(culture),
+                balance_type=balance_type,
+                delta=delta,
+                source_type=source_type,
+                source_id=source_id,
+                date_time=date_time,
+            )
+            for place, culture, balance_type, delta in postings
+            if delta
+        ]
+        BalanceMovement.objects.bulk_create(movements)
+        BalanceService._update_daily_balances(movements)
+        return movements
+
+    @staticmethod
+    def _update_daily_balances(movements):
+        """Інкрементально переносить рухи у `DailyBalance`.
+
+        На кожен (ключ, день): зсув `closing` усіх пізніших днів одним UPDATE
+        (так коректно обробляються записи заднім числом) і UPDATE або INSERT
+        рядка самого дня.
+        """
+        grouped = {}
+        for m in movements:
+            key = (m.place_id, m.culture_id, m.balance_type, timezone.localdate(m.date_time))
+            grouped[key] = grouped.get(key, Decimal('0')) + m.delta
+
+        for (place_id, culture_id, balance_type, day), delta in sorted(grouped.items()):
+            if not delta:
+                continue
+            key_qs = DailyBalance.objects.filter(place_id=place_id, culture_id=culture_id, balance_type=balance_type)
+            key_qs.filter(day__gt=day).update(closing=F('closing') + delta)
+            if key_qs.filter(day=day).update(delta=F('delta') + delta, closing=F('closing') + delta):
+                continue
+
+            previous = key_qs.filter(day__lt=day).order_by('-day').values_list('closing', flat=True).first()
+            try:
+                with transaction.atomic():
+                    DailyBalance.objects.create(
+                        place_id=place_id,
+                        culture_id=culture_id,
+                        balance_type=balance_type,
+                        day=day,
+                        delta=delta,
+                        closing=(previous or Decimal('0')) + delta,
+                    )
+            except IntegrityError:
+                key_qs.filter(day=day).update(delta=F('delta') + delta, closing=F('closing') + delta)
+
+    @staticmethod
+    def daily_balances_valid_from():
+        """Перший день, з якого `DailyBalance` узгоджена з `Balance`, або None.
+
+        Це день початкових залишків (`is_opening`); без них таблиця містить лише
+        суми рухів від нуля і для звітів не годиться.
+        """
+        return DailyBalance.objects.filter(is_opening=True).aggregate(day=Min('day'))['day']
+
+    @staticmethod
+    def get_balances_on_date(date, filters=None):
+        """Залишки на кінець дня `date` з `DailyBalance`.
+
+        Для кожного ключа береться останній рядок з `day <= date` —
+        корельований підзапит по унікальному індексу (place, culture, balance_type, day).
+        """
+        latest_day = DailyBalance.objects.filter(
+            place=OuterRef('place'),
+            culture=OuterRef('culture'),
+            balance_type=OuterRef('balance_type'),
+            day__lte=date,
+        ).order_by('-day').values('day')[:1]
+
+        qs = DailyBalance.objects.filter(day__lte=date, day=Subquery(latest_day))
+        if filters:
+            if place_id := filters.get('place_id'):
+                qs = qs.filter(place_id=place_id)
+            if culture_id := filters.get('culture_id'):
+                qs = qs.filter(culture_id=culture_id)
+            if balance_type := filters.get('balance_type'):
+                qs = qs.filter(balance_type=balance_type)
+        return qs.select_related('place', 'culture').order_by('place__name', 'culture__name', 'balance_type')
+
+    @staticmethod
+    def _ledger_daily_deltas():
+        """Чисті зміни по (ключ, день) з журналу рухів, відсортовані за ключем і днем."""
+        rows = BalanceMovement.objects.annotate(day=TruncDate('date_time')).values(
+            'place_id', 'culture_id', 'balance_type', 'day'
+        ).annotate(total=Sum('delta')).order_by('place_id', 'culture_id', 'balance_type', 'day')
+        for row in rows.iterator(chunk_size=5000):
+            yield (row['place_id'], row['culture_id'], row['balance_type']), row['day'], row['total']
+
+    @staticmethod
+    def _journal_daily_deltas():
+        """Чисті зміни по (ключ, день), пораховані з журналів за `balance_posting_rules()`."""
+        from .postings import aggregate_postings, posting_models
+
+        grouped = {}
+        for model in posting_models():
+            for place_id, culture_id, balance_type, day, delta in aggregate_postings(model, by_day=True):
+                k = ((place_id, culture_id, balance_type), day)
+                grouped[k] = grouped.get(k, Decimal('0')) + delta
+        for (key, day), total in sorted(grouped.items()):
+            yield key, day, total
+
     @staticmethod
     @transaction.atomic
-    def adjust_balance(place, culture, balance_type, delta):
-        """Змінює поточний `Balance.quantity` на delta (Decimal)."""
-        balance, _ = Balance.objects.get_or_create(
-            place=place,
-            culture=culture,
-            balance_type=balance_type,
-            defaults={'quantity': 0}
+    def rebuild_daily_balances(from_journals: bool = False, anchor: bool = True, batch_size: int = 2000):
+        """Перебудовує `DailyBalance` з нуля.
+
+        - За замовчуванням — з журналу рухів `BalanceMovement`.
+        - `from_journals=True` — групованими запитами по журналах і операціях з відходами
+          (для бекфілу історії, що була до появи журналу рухів).
+        - `anchor=True` — зсуває кожен ключ так, щоб останній `closing` дорівнював поточному `Balance`;
+          різниця пишеться початковим залишком (`is_opening`) на день перед історією.
+          Без вирівнювання звіти таблицю не використовують (`daily_balances_valid_from`).
+        - Повертає кількість створених рядків.
+        """
+        deltas = BalanceService._journal_daily_deltas() if from_journals else BalanceService._ledger_daily_deltas()
+
+        DailyBalance.objects.all().delete()
+
+        rows = []
+        first_day = None
+        closing = {}
+        for key, day, total in deltas:
+            closing[key] = closing.get(key, Decimal('0')) + total
+            first_day = min(first_day, day) if first_day else day
+            rows.append(DailyBalance(
+                place_id=key[0], culture_id=key[1], balance_type=key[2],
+                day=day, delta=total, closing=closing[key],
+            ))
+
+        if anchor:
+            current = {
+                (b['place_id'], b['culture_id'], b['balance_type']): b['quantity']
+                for b in Balance.objects.values('place_id', 'culture_id', 'balance_type', 'quantity')
+            }
+            offsets = {
+                key: current.get(key, Decimal('0')) - closing.get(key, Decimal('0'))
+                for key in set(current) | set(closing)
+            }
+            for row in rows:
+                row.closing += offsets[(row.place_id, row.culture_id, row.balance_type)]
+            # Початкові залишки всіх ключів — на день перед першим рухом
+            opening_day = first_day - timedelta(days=1) if first_day else timezone.localdate()
+            rows.extend(
+                DailyBalance(place_id=key[0], culture_id=key[1], balance_type=key[2],
+                             day=opening_day, delta=0, closing=offset, is_opening=True)
+                for key, offset in offsets.items()
+            )
+
+        DailyBalance.objects.bulk_create(rows, batch_size=batch_size)
+        return len(rows)
+
+    @staticmethod
+    @transaction.atomic
+    def adjust_balance(place, culture, balance_type, delta, source=None, date_time=None):
+        """Змінює поточний `Balance.quantity` на delta (Decimal) одним атомарним запитом.
+
+        Рух записується в `BalanceMovement` з посиланням на `source`.
+        """
+        BalanceService._post_delta(
+            BalanceService._pk(place),
+            BalanceService._pk(culture),
+            balance_type,
+            delta,
         )
-        new_q = balance.quantity + delta
-        if new_q < 0:
-            raise ValueError('Недостатньо залишку.')
-        balance.quantity = new_q
-        balance.save()
-        return balance
+        BalanceService.record_movements([(place, culture, balance_type, delta)], source, date_time)
 
     @staticmethod
-    def set_balance(place, culture, balance_type, quantity):
-        balance, _ = Balance.objects.get_or_create(
+    @transaction.atomic
+    def apply_deltas(postings, source=None, date_time=None):
+        """Проводить пакет змін залишків в одній транзакції.
+
+        - `postings` — ітерабельне з `Posting` або кортежів (place, culture, balance_type, delta);
+          place/culture можуть бути як моделями, так і id.
+        - Дельти групуються по (place, culture, balance_type): на кожен ключ — один UPDATE.
+        - Ключі обробляються у стабільному порядку, щоб паралельні пакети блокували рядки
+          однаково і не впиралися в deadlock.
+        - Якщо хоч один ключ іде в мінус — `ValueError`, і весь пакет відкочується.
+        - Кожне ненульове проведення пишеться в `BalanceMovement` з посиланням на `source`.
+        - Повертає dict {(place_id, culture_id, balance_type): net_delta} з фактично проведеними змінами.
+        """
+        postings = [
+            Posting(BalanceService._pk(place), BalanceService._pk(culture), balance_type, delta)
+            for place, culture, balance_type, delta in postings
+        ]
+        grouped = {}
+        for p in postings:
+            key = (p.place_id, p.culture_id, p.balance_type)
+            grouped[key] = grouped.get(key, Decimal('0')) + p.delta
+
+        applied = {}
+        for key in sorted(grouped):
+            delta = grouped[key]
+            if not delta:
+                continue
+            BalanceService._post_delta(*key, delta)
+            applied[key] = delta
+
+        BalanceService.record_movements(postings, source, date_time)
+        return applied
+
+    @staticmethod
+    @transaction.atomic
+    def repost(old_postings, new_postings, source=None, old_date_time=None, date_time=None,
+               clamp_keys=(), clamp=False):
+        """Переводить проведення документа зі старих значень у нові.
+
+        - На `Balance` проводиться лише чиста різниця по кожному ключу; ключі з нульовою
+          різницею не чіпаються взагалі.
+        - Якщо на списання не вистачає залишку: для ключів з `clamp_keys` (або всіх, якщо
+          `clamp=True`) залишок обнуляється, інакше — `ValueError` і відкат транзакції.
+        - У `BalanceMovement` пишеться та сама чиста різниця на `date_time`. Якщо дата
+          документа змінилась — старі проведення сторнуються на `old_date_time`, а нові
+          пишуться на `date_time`, щоб денні залишки лягли на правильні дні.
+        - Повертає dict {(place_id, culture_id, balance_type): delta} з фактично проведеними змінами.
+        """
+        net = {}
+        for sign, postings in ((-1, old_postings), (1, new_postings)):
+            for p in postings:
+                key = (p.place_id, p.culture_id, p.balance_type)
+                net[key] = net.get(key, Decimal('0')) + sign * p.delta
+
+        applied = {}
+        for key in sorted(net):
+            delta = net[key]
+            if not delta:
+                continue
+            try:
+                BalanceService._post_delta(*key, delta)
+            except ValueError:
+                if not (clamp or key in clamp_keys):
+                    raise
+                balance = Balance.objects.select_for_update().filter(
+                    place_id=key[0], culture_id=key[1], balance_type=key[2]
+                ).first()
+                if balance is None or not balance.quantity:
+                    continue
+                delta = -balance.quantity
+                Balance.objects.filter(pk=balance.pk).update(quantity=0)
+            applied[key] = delta
+
+        date_time = date_time or timezone.now()
+        if old_date_time is None or old_date_time == date_time:
+            BalanceService.record_movements([(*key, delta) for key, delta in applied.items()], source, date_time)
+        else:
+            BalanceService.record_movements([(*p[:3], -p.delta) for p in old_postings], source, old_date_time)
+            BalanceService.record_movements(new_postings, source, date_time)
+        # Різниця між запитаним і проведеним (обнулення) — окремим рухом
+        clamped = [(*key, applied.get(key, Decimal('0')) - delta) for key, delta in net.items()
+                   if delta and applied.get(key, Decimal('0')) != delta]
+        if clamped and old_date_time is not None and old_date_time != date_time:
+            BalanceService.record_movements(clamped, source, date_time)
+        return applied
+
+    @staticmethod
+    @transaction.atomic
+    def repost_documents(items, clamp=False, batch_size=1000, clamp_keys=()):
+        """Пакетне проведення змін багатьох документів.
+
+        - `items` — ітерабельне з (document, old_postings, new_postings); для нового
+          документа old_postings порожні, для видаленого — порожні new_postings.
+        - На `Balance` — одна чиста зміна на ключ для всього пакета.
+        - У `BalanceMovement` — чиста зміна кожного документа з посиланням на нього.
+        - Якщо на списання не вистачає залишку: з `clamp=True` залишок обнуляється
+          (коригування пишеться рухом останнього документа по ключу), інакше — `ValueError`.
+          `clamp_keys` — ключі, які обнуляються навіть без `clamp=True`.
+        - Повертає dict {(place_id, culture_id, balance_type): delta} з фактично проведеними змінами.
+        """
+        grouped = {}
+        last_movement = {}
+        movements = []
+        for document, old_postings, new_postings in items:
+            source_type, source_id, date_time = BalanceService._movement_source(document)
+            net = {}
+            for sign, postings in ((-1, old_postings), (1, new_postings)):
+                for p in postings:
+                    key = (p.place_id, p.culture_id, p.balance_type)
+                    net[key] = net.get(key, Decimal('0')) + sign * p.delta
+            for key, delta in net.items():
+                if not delta:
+                    continue
+                grouped[key] = grouped.get(key, Decimal('0')) + delta
+                movement = BalanceMovement(
+                    place_id=key[0], culture_id=key[1], balance_type=key[2], delta=delta,
+                    source_type=source_type, source_id=source_id, date_time=date_time,
+                )
+                movements.append(movement)
+                last_movement[key] = movement
+
+        applied = {}
+        for key in sorted(grouped):
+            delta = grouped[key]
+            if not delta:
+                continue
+            try:
+                BalanceService._post_delta(*key, delta)
+            except ValueError:
+                if not (clamp or key in clamp_keys):
+                    raise
+                balance = Balance.objects.select_for_update().filter(
+                    place_id=key[0], culture_id=key[1], balance_type=key[2]
+                ).first()
+                current = balance.quantity if balance is not None else Decimal('0')
+                if balance is not None:
+                    Balance.objects.filter(pk=balance.pk).update(quantity=0)
+                last_movement[key].delta += -current - delta
+                delta = -current
+            applied[key] = delta
+
+        movements = [m for m in movements if m.delta]
+        BalanceMovement.objects.bulk_create(movements, batch_size=batch_size)
+        BalanceService._update_daily_balances(movements)
+        return applied
+
+    @staticmethod
+    @transaction.atomic
+    def set_balance(place, culture, balance_type, quantity, source=None, date_time=None):
+        """Встановлює абсолютне значення залишку; різниця пишеться в журнал рухів."""
+        balance, _ = Balance.objects.select_for_update().get_or_create(
             place=place,
             culture=culture,
             balance_type=balance_type,
             defaults={'quantity': 0}
         )
+        delta = quantity - balance.quantity
         balance.quantity = quantity
         balance.save()
+        BalanceService.record_movements([(place, culture, balance_type, delta)], source, date_time)
         return balance
 
     @staticmethod
@@ -93,11 +569,58 @@ class BalanceService:
         except ObjectDoesNotExist:
             return None
 
+    @staticmethod
+    def diff_with_snapshot(snapshot, copy_missing_as_zero: bool = False, lock: bool = False):
+        """Різниця між матеріалізованим зліпком і поточними `Balance` — список `BalanceChange`.
+
+        - `balance_id=None` — ключа немає в `Balance`, його треба створити.
+        - Якщо `copy_missing_as_zero=True`, ключі, яких немає в зліпку, обнуляються.
+        - `lock=True` блокує прочитані рядки `Balance` до кінця транзакції.
+        """
+        target = snapshot.materialize()
+        balances = Balance.objects.order_by()
+        if lock:
+            balances = balances.select_for_update()
+
+        changes = []
+        seen = set()
+        for balance_id, place_id, culture_id, balance_type, quantity in balances.values_list(
+            'id', 'place_id', 'culture_id', 'balance_type', 'quantity'
+        ):
+            key = (place_id, culture_id, balance_type)
+            if key in target:
+                seen.add(key)
+                new_quantity = target[key]
+            elif copy_missing_as_zero:
+                new_quantity = Decimal('0')
+            else:
+                continue
+            if quantity != new_quantity:
+                changes.append(BalanceChange(balance_id, place_id, culture_id, balance_type, quantity, new_quantity))
+
+        for key in sorted(target.keys() - seen):
+            changes.append(BalanceChange(None, *key, None, target[key]))
+        return changes
+
+    @staticmethod
+    def preview_start_day(copy_missing_as_zero: bool = False):
+        """Dry-run для `start_day_from_last_snapshot`: нічого не змінює.
+
+        Повертає кортеж (snapshot, changes) — що саме буде змінено.
+        """
+        last = BalanceSnapshot.objects.order_by('-snapshot_date').first()
+        if not last:
+            return None, []
+        return last, BalanceService.diff_with_snapshot(last, copy_missing_as_zero)
+
     @staticmethod
     @transaction.atomic
-    def start_day_from_last_snapshot(copy_missing_as_zero: bool = False):
+    def start_day_from_last_snapshot(copy_missing_as_zero: bool = False, batch_size: int = 1000):
         """Оновлює/створює поточні Balance на підставі останнього зліпка.
 
+        Одна різниця зліпка з `Balance`, далі `bulk_update`/`bulk_create` пачками
+        по `batch_size` і один `record_movements` на всі зміни.
+
         - Якщо `copy_missing_as_zero=True`, то для комбінацій, яких немає в зліпку, створюються записи з 0.
         - Повертає кортеж (snapshot, created_count, updated_count)
         """
@@ -105,39 +628,106 @@ class BalanceService:
         if not last:
             return None, 0, 0
 
-        # створимо тимчасну мапу (place_id, culture_id, balance_type) -> quantity
-        from django.db.models import Q
-        keys = {}
-        for h in last.history_records.all():
-            keys[(h.place_id, h.culture_id, h.balance_type)] = h.quantity
-
-        created = 0
-        updated = 0
-        # оновимо існуючі balances
-        balances = Balance.objects.all()
-        for b in balances:
-            k = (b.place_id, b.culture_id, b.balance_type)
-            if k in keys:
-                q = keys.pop(k)
-                if b.quantity != q:
-                    b.quantity = q
-                    b.save()
-                    updated += 1
-            else:
-                if copy_missing_as_zero:
-                    if b.quantity != 0:
-                        b.quantity = 0
-                        b.save()
-                        updated += 1
-
-        # створимо решту, які є у зліпку, але немає в поточних balance
-        for (place_id, culture_id, btype), qty in keys.items():
-            Balance.objects.create(
-                place_id=place_id,
-                culture_id=culture_id,
-                balance_type=btype,
-                quantity=qty
-            )
-            created += 1
+        changes = BalanceService.diff_with_snapshot(last, copy_missing_as_zero, lock=True)
+        created, updated = BalanceService.apply_balance_changes(changes, BalanceMovement.SOURCE_SNAPSHOT, batch_size)
+        return last, created, updated
+
+    @staticmethod
+    @transaction.atomic
+    def apply_balance_changes(changes, source=None, batch_size: int = 1000):
+        """Записує список `BalanceChange` пачками і фіксує рухи одним `record_movements`.
+
+        Повертає кортеж (created_count, updated_count).
+        """
+        bump(Balance)
+        to_update = [
+            Balance(id=c.balance_id, quantity=c.new_quantity)
+            for c in changes if c.balance_id is not None
+        ]
+        to_create = [
+            Balance(place_id=c.place_id, culture_id=c.culture_id, balance_type=c.balance_type, quantity=c.new_quantity)
+            for c in changes if c.balance_id is None
+        ]
+        Balance.objects.bulk_update(to_update, ['quantity'], batch_size=batch_size)
+        Balance.objects.bulk_create(to_create, batch_size=batch_size)
+
+        BalanceService.record_movements(
+            [(c.place_id, c.culture_id, c.balance_type, c.delta) for c in changes],
+            source,
+        )
+        return len(to_create), len(to_update)
+
+    @staticmethod
+    def expected_balances(place_ids=None, baseline=None):
+        """Очікувані залишки, пораховані з журналів і операцій з відходами.
+
+        - `place_ids` — рахувати лише ці місця (None — усі).
+        - `baseline` — зліпок, від якого рахувати: його стан + документи після `snapshot_date`.
+          Без нього рахується від нуля з усієї історії документів.
+        - Повертає {(place_id, culture_id, balance_type): quantity}; від'ємні суми
+          обнуляються, як це робить `repost` для списань, яким не вистачило залишку
+          (відкат приходу, clamp-правила, видалення).
+        """
+        from .postings import aggregate_postings, posting_models
+
+        place_set = set(place_ids) if place_ids is not None else None
+        expected = {}
+        if baseline is not None:
+            expected = {
+                key: quantity for key, quantity in baseline.materialize().items()
+                if place_set is None or key[0] in place_set
+            }
+
+        for model in posting_models():
+            queryset = model._default_manager.all()
+            if baseline is not None:
+                queryset = queryset.filter(date_time__gt=baseline.snapshot_date)
+            for place_id, culture_id, balance_type, delta in aggregate_postings(model, queryset, place_ids=place_ids):
+                key = (place_id, culture_id, balance_type)
+                expected[key] = expected.get(key, Decimal('0')) + delta
+        return {key: max(quantity, Decimal('0')) for key, quantity in expected.items()}
 
-        return last, created, updated
\ No newline at end of file
+    @staticmethod
+    def verify_balances(place_ids=None, baseline=None):
+        """Порівнює поточні `Balance` з `expected_balances` — список розбіжностей `BalanceChange`.
+
+        `old_quantity` — поточний залишок (None, якщо рядка немає), `new_quantity` — очікуваний.
+        """
+        expected = BalanceService.expected_balances(place_ids, baseline)
+
+        balances = Balance.objects.order_by()
+        if place_ids is not None:
+            balances = balances.filter(place_id__in=place_ids)
+
+        changes = []
+        for balance_id, place_id, culture_id, balance_type, quantity in balances.values_list(
+            'id', 'place_id', 'culture_id', 'balance_type', 'quantity'
+        ):
+            new_quantity = expected.pop((place_id, culture_id, balance_type), Decimal('0'))
+            if quantity != new_quantity:
+                changes.append(BalanceChange(balance_id, place_id, culture_id, balance_type, quantity, new_quantity))
+
+        for key, quantity in sorted(expected.items()):
+            if quantity:
+                changes.append(BalanceChange(None, *key, None, quantity))
+        return changes
+
+    @staticmethod
+    def fix_balances(place_ids, baseline=None, source=BalanceMovement.SOURCE_REBUILD, batch_size: int = 1000):
+        """Записує очікувані залишки по місцях `place_ids`.
+
+        Кожне місце — окрема транзакція: рядки його `Balance` блокуються
+        (`select_for_update`), розбіжності рахуються заново і записуються під
+        блокуванням, тож проведення, що прийшли після перевірки, не затираються.
+        Повертає кортеж (created_count, updated_count).
+        """
+        created = updated = 0
+        for place_id in sorted(place_ids):
+            with transaction.atomic():
+                list(Balance.objects.select_for_update().filter(place_id=place_id).order_by('pk').values_list('pk', flat=True))
+                changes = BalanceService.verify_balances([place_id], baseline)
+                if changes:
+                    place_created, place_updated = BalanceService.apply_balance_changes(changes, source, batch_size)
+                    created += place_created
+                    updated += place_updated
+        return created, updated
@@ -1,3 +1,210 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from directory.models import Culture, Place
+
+from .models import Balance, BalanceMovement, BalanceType, DailyBalance, DataVersion
+from .services import BalanceService, Posting
+from .versions import bump, get_versions
+
+
+STOCK = BalanceType.STOCK
+
+
+class BalanceTestMixin:
+    """Місця, культура і короткі помічники для тестів залишків."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.storage = Place.objects.create(name='Склад')
+        cls.dryer = Place.objects.create(name='Сушка', place_type='dryer')
+        cls.wheat = Culture.objects.create(name='Пшениця')
+
+    def quantity(self, place, balance_type=STOCK):
+        balance = Balance.objects.filter(place=place, culture=self.wheat, balance_type=balance_type).first()
+        return balance.quantity if balance else None
+
+    def posting(self, place, delta, balance_type=STOCK):
+        return Posting(place.pk, self.wheat.pk, balance_type, Decimal(delta))
+
+
+class PostDeltaTests(BalanceTestMixin, TestCase):
+    """Проведення однієї дельти — атомарний UPDATE з перевіркою залишку."""
+
+    def test_creates_missing_balance(self):
+        BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('5'))
+        self.assertEqual(self.quantity(self.storage), Decimal('5'))
+
+    def test_update_is_relative_to_the_database_value(self):
+        BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('5'))
+        stale = Balance.objects.get(place=self.storage)
+        BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('2'))
+        BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('-1'))
+        # Значення в пам'яті ні на що не впливає — рахує сама БД
+        self.assertEqual(stale.quantity, Decimal('5'))
+        self.assertEqual(self.quantity(self.storage), Decimal('6'))
+
+    def test_withdrawal_is_one_guarded_update(self):
+        BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('5'))
+        with CaptureQueriesContext(connection) as queries:
+            BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('-2'))
+        sql = [query['sql'] for query in queries if 'balances_balance' in query['sql']]
+        self.assertEqual(len(sql), 1)
+        self.assertTrue(sql[0].startswith('UPDATE'))
+        self.assertIn('"quantity" >=', sql[0])
+
+    def test_shortage_raises_and_keeps_quantity(self):
+        BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('3'))
+        with self.assertRaises(ValueError):
+            BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('-4'))
+        self.assertEqual(self.quantity(self.storage), Decimal('3'))
+
+    def test_withdrawal_without_balance_raises(self):
+        with self.assertRaises(ValueError):
+            BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('-1'))
+        self.assertIsNone(self.quantity(self.storage))
+
+    def test_exact_withdrawal_leaves_zero(self):
+        BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('3'))
+        BalanceService._post_delta(self.storage.pk, self.wheat.pk, STOCK, Decimal('-3'))
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+
+
+class ApplyDeltasTests(BalanceTestMixin, TestCase):
+
+    def test_groups_postings_per_key_and_records_each_movement(self):
+        applied = BalanceService.apply_deltas([
+            self.posting(self.storage, '10'),
+            self.posting(self.storage, '-4'),
+            self.posting(self.dryer, '2'),
+        ])
+        self.assertEqual(applied, {
+            (self.storage.pk, self.wheat.pk, STOCK): Decimal('6'),
+            (self.dryer.pk, self.wheat.pk, STOCK): Decimal('2'),
+        })
+        self.assertEqual(self.quantity(self.storage), Decimal('6'))
+        self.assertEqual(BalanceMovement.objects.count(), 3)
+
+    def test_shortage_rolls_back_the_whole_batch(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            BalanceService.apply_deltas([self.posting(self.dryer, '2'), self.posting(self.storage, '-1')])
+        self.assertIsNone(self.quantity(self.dryer))
+        self.assertFalse(BalanceMovement.objects.exists())
+
+
+class RepostClampTests(BalanceTestMixin, TestCase):
+    """Обнулення замість помилки, коли на списання не вистачає залишку."""
+
+    def setUp(self):
+        BalanceService.apply_deltas([self.posting(self.storage, '3')])
+
+    def test_repost_without_clamp_raises(self):
+        with self.assertRaises(ValueError), transaction.atomic():
+            BalanceService.repost([], [self.posting(self.storage, '-5')])
+        self.assertEqual(self.quantity(self.storage), Decimal('3'))
+
+    def test_repost_clamps_listed_keys_to_zero(self):
+        key = (self.storage.pk, self.wheat.pk, STOCK)
+        applied = BalanceService.repost([], [self.posting(self.storage, '-5')], clamp_keys={key})
+        self.assertEqual(applied, {key: Decimal('-3')})
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+        # Рух дорівнює фактично списаному, тож журнал рухів сходиться з залишком
+        total = sum(BalanceMovement.objects.values_list('delta', flat=True))
+        self.assertEqual(total, Decimal('0'))
+
+    def test_repost_nets_old_and_new_postings(self):
+        applied = BalanceService.repost([self.posting(self.storage, '3')], [self.posting(self.storage, '3')])
+        self.assertEqual(applied, {})
+        self.assertEqual(BalanceMovement.objects.count(), 1)
+
+    def test_repost_documents_clamp_corrects_last_movement(self):
+        # Відкат двох приходів (1 + 4 т), коли на складі лишилось 3 т
+        items = [
+            (None, [self.posting(self.storage, '1')], []),
+            (None, [self.posting(self.storage, '4')], []),
+        ]
+        applied = BalanceService.repost_documents(items, clamp=True)
+        self.assertEqual(applied, {(self.storage.pk, self.wheat.pk, STOCK): Decimal('-3')})
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+        total = sum(BalanceMovement.objects.values_list('delta', flat=True))
+        self.assertEqual(total, Decimal('0'))
+
+
+class DailyBalanceTests(BalanceTestMixin, TestCase):
+    """Денні залишки: інкрементальне ведення і вирівнювання по `Balance`."""
+
+    def day(self, days_ago):
+        return timezone.now() - timedelta(days=days_ago)
+
+    def closing_on(self, date):
+        row = BalanceService.get_balances_on_date(date).filter(place=self.storage).first()
+        return row.closing if row else None
+
+    def test_not_valid_without_opening_rows(self):
+        BalanceService.apply_deltas([self.posting(self.storage, '5')])
+        self.assertIsNone(BalanceService.daily_balances_valid_from())
+
+    def test_back_dated_movement_shifts_later_closings(self):
+        BalanceService.apply_deltas([self.posting(self.storage, '5')], date_time=self.day(1))
+        BalanceService.apply_deltas([self.posting(self.storage, '2')], date_time=self.day(3))
+        self.assertEqual(self.closing_on(timezone.localdate(self.day(3))), Decimal('2'))
+        self.assertEqual(self.closing_on(timezone.localdate(self.day(1))), Decimal('7'))
+        self.assertEqual(self.closing_on(timezone.localdate()), Decimal('7'))
+
+    def test_rebuild_anchors_last_closing_to_balance(self):
+        # 10 т були на складі ще до журналу рухів
+        Balance.objects.create(place=self.storage, culture=self.wheat, balance_type=STOCK, quantity=Decimal('10'))
+        BalanceService.apply_deltas([self.posting(self.storage, '-4')], date_time=self.day(2))
+
+        BalanceService.rebuild_daily_balances()
+
+        opening_day = timezone.localdate(self.day(2)) - timedelta(days=1)
+        self.assertEqual(BalanceService.daily_balances_valid_from(), opening_day)
+        self.assertEqual(self.closing_on(opening_day), Decimal('10'))
+        self.assertEqual(self.closing_on(timezone.localdate()), self.quantity(self.storage))
+
+    def test_rebuild_adds_opening_for_keys_without_movements(self):
+        Balance.objects.create(place=self.dryer, culture=self.wheat, balance_type=STOCK, quantity=Decimal('3'))
+        BalanceService.rebuild_daily_balances()
+        row = DailyBalance.objects.get(place=self.dryer)
+        self.assertTrue(row.is_opening)
+        self.assertEqual(row.closing, Decimal('3'))
+
+
+class DataVersionTests(TestCase):
+    """Версії таблиць у БД: збільшення одразу або після коміту транзакції."""
+
+    def version(self):
+        return get_versions(['balances.balance'])['balances.balance']
+
+    def test_bump_inside_transaction_waits_for_commit(self):
+        before = self.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump(Balance)
+            bump(Balance, 'logistics.weigherjournal')
+            self.assertEqual(self.version(), before)
+        # Кілька bump у транзакції — одне збільшення
+        self.assertEqual(self.version(), before + 1)
+
+    def test_rolled_back_bump_is_applied_with_the_next_commit(self):
+        before = self.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    bump('balances.balance')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.assertEqual(self.version(), before)
+            bump('logistics.weigherjournal')
+        self.assertEqual(self.version(), before + 1)
 
-# Create your tests here.
+    def test_missing_versions_are_created_once(self):
+        versions = get_versions(['x.new'])
+        self.assertEqual(get_versions(['x.new']), versions)
+        self.assertEqual(DataVersion.objects.filter(table='x.new').count(), 1)
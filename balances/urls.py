@@ -8,6 +8,7 @@ urlpatterns = [
     path('create/', views.BalanceCreateView.as_view(), name='balance_create'),
     path('<int:pk>/edit/', views.BalanceUpdateView.as_view(), name='balance_update'),
     path('<int:pk>/delete/', views.BalanceDeleteView.as_view(), name='balance_delete'),
+    path('drifts/', views.BalanceDriftListView.as_view(), name='balance_drift_list'),
     
     path('history/empty/create/', views.EmptySnapshotCreateView.as_view(), name='balance_snapshot_empty_create'),
     path('history/empty/quick-create/', views.QuickEmptySnapshotCreateView.as_view(), name='balance_snapshot_quick_create'),
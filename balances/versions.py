@@ -0,0 +1,88 @@
+"""
+Версії даних таблиць для інвалідації кешів.
+
+Кожен запис у журнали, операції з відходами і залишки збільшує версію своєї
+таблиці (`app_label.model_name`). Кеш, у ключ якого входять версії таблиць,
+після запису просто перестає знаходити старі значення — нічого не треба
+видаляти вручну.
+
+Версії зберігаються в БД (`DataVersion`), а не в самому кеші: кеш витісняє
+записи, і втрачена версія могла б повернути звіт, порахований до запису.
+Збільшення — один атомарний UPDATE.
+
+Усередині транзакції версія збільшується після коміту: читач, що встиг
+закешувати ще старі дані, кладе їх під стару версію, яку вже ніхто не читає.
+Таблиці транзакції, що відкотилась, збільшуються разом з наступним комітом —
+зайве збільшення лише рахує звіт заново.
+"""
+import threading
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+_local = threading.local()
+
+
+def _label(table):
+    """Модель, її екземпляр або готовий рядок 'app_label.model_name'."""
+    return table if isinstance(table, str) else table._meta.label_lower
+
+
+def _initial():
+    # Якщо таблицю версій створено заново (нова БД), версія не повинна повернутися
+    # до значення, під яким у кеші ще лежать старі результати
+    return int(time.time() * 1000)
+
+
+def _incr(labels):
+    from .models import DataVersion
+
+    for label in labels:
+        if DataVersion.objects.filter(table=label).update(version=F('version') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(table=label, version=_initial())
+        except IntegrityError:
+            DataVersion.objects.filter(table=label).update(version=F('version') + 1)
+
+
+def _pending():
+    if not hasattr(_local, 'pending'):
+        _local.pending = set()
+    return _local.pending
+
+
+def _flush_pending():
+    pending = _pending()
+    labels = sorted(pending)
+    pending.clear()
+    if labels:
+        _incr(labels)
+
+
+def bump(*tables):
+    """Збільшує версії таблиць — одразу або один раз після коміту поточної транзакції."""
+    labels = {_label(table) for table in tables}
+    if not transaction.get_connection().in_atomic_block:
+        _incr(sorted(labels))
+        return
+
+    # Перша з відкладених дій транзакції збільшує всі накопичені версії, решта — порожні
+    _pending().update(labels)
+    transaction.on_commit(_flush_pending)
+
+
+def get_versions(tables):
+    """{таблиця: версія} одним запитом; відсутні версії створюються."""
+    from .models import DataVersion
+
+    labels = sorted({_label(table) for table in tables})
+    versions = dict(DataVersion.objects.filter(table__in=labels).values_list('table', 'version'))
+    for label in labels:
+        if label not in versions:
+            version, _ = DataVersion.objects.get_or_create(table=label, defaults={'version': _initial()})
+            versions[label] = version.version
+    return versions
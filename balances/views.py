@@ -6,8 +6,10 @@ from django.forms import modelformset_factory
 from django.db.models import Count, Sum
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils import timezone
+from django.db import transaction
+from decimal import Decimal
 
-from .models import Balance, BalanceSnapshot, BalanceHistory
+from .models import Balance, BalanceDrift, BalanceSnapshot, BalanceHistory
 from .forms import BalanceForm, BalanceSnapshotForm, BalanceHistoryForm, EmptySnapshotForm
 from .services import BalanceService
 
@@ -29,7 +31,8 @@ class BalanceListView(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context.update({
-            "page": "balances"
+            "page": "balances",
+            "open_drifts_count": BalanceDrift.objects.filter(resolved_at__isnull=True).count(),
         })
         return context
 
@@ -40,9 +43,13 @@ class BalanceCreateView(CreateView):
     template_name = 'balances/form.html'
     success_url = reverse_lazy('balance_list')
 
+    @transaction.atomic
     def form_valid(self, form):
+        response = super().form_valid(form)
+        b = self.object
+        BalanceService.record_movements([(b.place_id, b.culture_id, b.balance_type, b.quantity)])
         messages.success(self.request, 'Запис створено')
-        return super().form_valid(form)
+        return response
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -59,9 +66,18 @@ class BalanceUpdateView(UpdateView):
     template_name = 'balances/form.html'
     success_url = reverse_lazy('balance_list')
 
+    @transaction.atomic
     def form_valid(self, form):
+        # Ручна зміна може змінити і ключ, і кількість — списуємо старий стан, проводимо новий
+        old = Balance.objects.select_for_update().get(pk=self.object.pk)
+        response = super().form_valid(form)
+        b = self.object
+        BalanceService.record_movements([
+            (old.place_id, old.culture_id, old.balance_type, -old.quantity),
+            (b.place_id, b.culture_id, b.balance_type, b.quantity),
+        ])
         messages.success(self.request, 'Запис оновлено')
-        return super().form_valid(form)
+        return response
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -77,6 +93,12 @@ class BalanceDeleteView(DeleteView):
     model = Balance
     template_name = 'confirm_delete.html'
     success_url = reverse_lazy('balance_list')
+
+    @transaction.atomic
+    def form_valid(self, form):
+        b = self.object
+        BalanceService.record_movements([(b.place_id, b.culture_id, b.balance_type, -b.quantity)])
+        return super().form_valid(form)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -94,6 +116,28 @@ class BalanceDeleteView(DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+class BalanceDriftListView(ListView):
+    """Розбіжності, знайдені аудитором (`manage.py audit_balances`)."""
+    model = BalanceDrift
+    template_name = 'balances/drift_list.html'
+    context_object_name = 'drifts'
+    paginate_by = 50
+
+    def get_queryset(self):
+        qs = super().get_queryset().select_related('place', 'culture')
+        if self.request.GET.get('all') != '1':
+            qs = qs.filter(resolved_at__isnull=True)
+        return qs
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            "page": "balances",
+            "show_all": self.request.GET.get('all') == '1',
+        })
+        return context
+
+
 # Snapshot views
 
 class BalanceSnapshotListView(ListView):
@@ -114,12 +158,30 @@ class BalanceSnapshotListView(ListView):
                          'total_records', '-total_records', 
                          'total_quantity', '-total_quantity']
         
-        if order in allowed_orders:
-            return qs.order_by(order)
-        return qs.order_by('-snapshot_date')
+        if order not in allowed_orders:
+            return qs.order_by('-snapshot_date')
+
+        if order.lstrip('-') in ('total_records', 'total_quantity') and qs.filter(is_delta=True).exists():
+            # Для дельта-зліпків підсумки рахуються з матеріалізованого стану — сортуємо в Python
+            snapshots = self._with_materialized_totals(qs)
+            field = order.lstrip('-')
+            return sorted(snapshots, key=lambda s: getattr(s, field) or 0, reverse=order.startswith('-'))
+        return qs.order_by(order)
+
+    @staticmethod
+    def _with_materialized_totals(snapshots):
+        snapshots = list(snapshots)
+        for snapshot in snapshots:
+            if snapshot.is_delta:
+                data = snapshot.materialize()
+                # Анотації total_records/total_quantity рахують лише записи дельти
+                snapshot.total_records = len(data)
+                snapshot.total_quantity = sum(data.values(), Decimal('0'))
+        return snapshots
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context[self.context_object_name] = self._with_materialized_totals(context['object_list'])
         # Отримуємо поточне сортування або використовуємо за замовчуванням
         context['current_order'] = self.request.GET.get('order', '-snapshot_date')
         context.update({
@@ -148,13 +210,25 @@ class BalanceSnapshotDetailView(ListView):
 
     def get_queryset(self):
         self.snapshot = get_object_or_404(BalanceSnapshot, pk=self.kwargs['pk'])
-        queryset = BalanceHistory.objects.filter(snapshot=self.snapshot).select_related('place', 'culture')
         
         # Додаємо сортування
         order = self.request.GET.get('order', 'place__name')
         allowed_orders = ['place__name', '-place__name', 'culture__name', '-culture__name', 
                          'balance_type', '-balance_type', 'quantity', '-quantity']
         
+        if self.snapshot.is_delta:
+            # Дельта-зліпок: записи відновлюються з ланцюжка батьків і сортуються в Python
+            records = self.snapshot.get_records()
+            sort_keys = {
+                'place__name': lambda r: (r.place.name, r.culture.name),
+                'culture__name': lambda r: (r.culture.name, r.place.name),
+                'balance_type': lambda r: r.balance_type,
+                'quantity': lambda r: r.quantity,
+            }
+            field = order.lstrip('-') if order in allowed_orders else 'place__name'
+            return sorted(records, key=sort_keys[field], reverse=order.startswith('-'))
+
+        queryset = BalanceHistory.objects.filter(snapshot=self.snapshot).select_related('place', 'culture')
         if order in allowed_orders:
             return queryset.order_by(order)
         return queryset.order_by('place__name', 'culture__name')
@@ -176,11 +250,8 @@ class BalanceSnapshotDetailView(ListView):
         context['current_order'] = self.request.GET.get('order', 'place__name')
         
         # Додаємо total_records та total_quantity
-        context['total_records_count'] = self.get_queryset().count()
-        
-        from django.db.models import Sum
-        total_qty = self.get_queryset().aggregate(total=Sum('quantity'))['total'] or 0
-        context['total_quantity'] = total_qty
+        context['total_records_count'] = self.snapshot.total_records()
+        context['total_quantity'] = self.snapshot.total_quantity()
 
         context.update({
             "page": "balanceshistory"
@@ -190,23 +261,51 @@ class BalanceSnapshotDetailView(ListView):
 
 
 class BalanceSnapshotUpdateView(View):
+    # Поле сортування -> значення запису (для рядків дельта-зліпка, що сортуються в пам'яті)
+    RECORD_ORDERS = {
+        'place__name': lambda record: record.place.name,
+        'culture__name': lambda record: record.culture.name,
+        'balance_type': lambda record: record.balance_type,
+        'quantity': lambda record: record.quantity,
+    }
+
     def get(self, request, pk):
         snapshot = get_object_or_404(BalanceSnapshot, pk=pk)
-        SnapshotFormSet = modelformset_factory(BalanceHistory, form=BalanceHistoryForm, extra=0, can_delete=True)
         
         # Отримуємо параметр сортування
         order = request.GET.get('order', 'place__name')
         allowed_orders = ['place__name', '-place__name', 'culture__name', '-culture__name', 
                          'balance_type', '-balance_type', 'quantity', '-quantity']
         
-        # Застосовуємо сортування до queryset
-        queryset = BalanceHistory.objects.filter(snapshot=snapshot).select_related('place', 'culture')
-        if order in allowed_orders:
-            queryset = queryset.order_by(order)
+        if snapshot.is_delta:
+            # Дельта-зліпок показується повним станом (materialize) без запису в БД: рядки
+            # форми — нові, і при збереженні вони замінюють записи зліпка (див. post)
+            records = snapshot.get_records()
+            if order in allowed_orders:
+                records.sort(key=self.RECORD_ORDERS[order.lstrip('-')], reverse=order.startswith('-'))
+            else:
+                records.sort(key=lambda record: (record.place.name, record.culture.name))
+            SnapshotFormSet = modelformset_factory(
+                BalanceHistory, form=BalanceHistoryForm, extra=len(records), can_delete=True
+            )
+            formset = SnapshotFormSet(
+                queryset=BalanceHistory.objects.none(),
+                initial=[
+                    {'place': r.place_id, 'culture': r.culture_id, 'balance_type': r.balance_type, 'quantity': r.quantity}
+                    for r in records
+                ],
+            )
         else:
-            queryset = queryset.order_by('place__name', 'culture__name')
-        
-        formset = SnapshotFormSet(queryset=queryset)
+            SnapshotFormSet = modelformset_factory(BalanceHistory, form=BalanceHistoryForm, extra=0, can_delete=True)
+
+            # Застосовуємо сортування до queryset
+            queryset = BalanceHistory.objects.filter(snapshot=snapshot).select_related('place', 'culture')
+            if order in allowed_orders:
+                queryset = queryset.order_by(order)
+            else:
+                queryset = queryset.order_by('place__name', 'culture__name')
+
+            formset = SnapshotFormSet(queryset=queryset)
         form = BalanceSnapshotForm(instance=snapshot)
         
         context = {
@@ -223,6 +322,7 @@ class BalanceSnapshotUpdateView(View):
 
         return render(request, 'balances/snapshot_edit_full.html', context)
 
+    @transaction.atomic
     def post(self, request, pk):
         snapshot = get_object_or_404(BalanceSnapshot, pk=pk)
         SnapshotFormSet = modelformset_factory(BalanceHistory, form=BalanceHistoryForm, extra=0, can_delete=True)
@@ -234,6 +334,14 @@ class BalanceSnapshotUpdateView(View):
         form = BalanceSnapshotForm(request.POST, instance=snapshot)
         
         if form.is_valid() and formset.is_valid():
+            BalanceService.detach_delta_children(snapshot)
+            if not formset.initial_form_count():
+                # Сторінка показувала повний стан зліпка новими рядками (дельта-зліпок) —
+                # вони замінюють записи зліпка, і він стає повним
+                snapshot.history_records.all().delete()
+                snapshot.is_delta = False
+                snapshot.parent = None
+                snapshot.version += 1
             form.save()
             instances = formset.save(commit=False)
             for inst in instances:
@@ -292,7 +400,10 @@ class BalanceHistoryCreateView(CreateView):
         context['model_name'] = f"Додати запис до зліпку"
         return context
 
+    @transaction.atomic
     def form_valid(self, form):
+        BalanceService.flatten_snapshot(self.snapshot)
+        BalanceService.detach_delta_children(self.snapshot)
         form.instance.snapshot = self.snapshot
         messages.success(self.request, 'Запис додано')
         return super().form_valid(form)
@@ -134,3 +134,78 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Report server settings
 REPORT_SERVER_URL = "http://127.0.0.1:5000"
+
+# Report jobs
+# PDF-звіти формує окремий процес: python manage.py run_report_worker. Його запускають
+# run_kolos.sh / run_kolos.bat, kolos_launcher.py, Dockerfile і docker-compose (сервіс worker).
+# False — звіт формується одразу в запиті (без воркера)
+REPORT_JOBS_ASYNC = True
+# Скільки звітів формується паралельно і скільки секунд може тривати один звіт
+REPORT_JOB_WORKERS = 2
+REPORT_JOB_TIMEOUT = 10 * 60
+
+
+# Caches
+# 'default' — LocMem, окремий у кожному процесі. Кеш звітів має бути спільним
+# для всіх процесів сервера і воркера, тому файловий; на кількох серверах —
+# Redis / Memcached. Версії даних і лічильники кешу зберігаються в БД
+# (balances.DataVersion, reports.ReportCacheCounter), а не в кеші.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reports': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'reports',
+        # При перевищенні MAX_ENTRIES бекенд видаляє випадкову 1/CULL_FREQUENCY
+        # частину записів (це не LRU; справжній LRU — Redis з allkeys-lru)
+        'OPTIONS': {'MAX_ENTRIES': 1000, 'CULL_FREQUENCY': 4},
+    },
+}
+
+# Report cache
+REPORT_CACHE_ALIAS = 'reports'
+# Скільки секунд тримати звіт за період, що включає сьогодні / закритий період
+REPORT_CACHE_TIMEOUT = 5 * 60
+REPORT_CACHE_CLOSED_TIMEOUT = 24 * 60 * 60
+# Звіти з більшою кількістю рядків не кешуються
+REPORT_CACHE_MAX_ROWS = 5000
+# Як часто (секунд) процес записує накопичені лічильники влучань у БД
+REPORT_CACHE_STATS_FLUSH_INTERVAL = 30
+
+# Charts
+# 'reportlab' — векторні графіки прямо в PDF (швидко, без matplotlib);
+# 'matplotlib' — растрові PNG (кешуються, див. нижче)
+REPORT_CHART_BACKEND = 'reportlab'
+
+# PDF tables
+# Таблиці від стількох рядків будуються у швидкому режимі (без Paragraph у кожній клітинці)
+REPORT_PDF_FAST_TABLE_ROWS = 500
+# Таблиці від стількох рядків (швидкі, з простих значень) формуються частинами по
+# REPORT_PDF_PARALLEL_CHUNK_ROWS рядків у REPORT_PDF_PARALLEL_WORKERS процесах
+# (на кожен процес воркера звітів; 0 або 1 — в одному процесі)
+REPORT_PDF_PARALLEL_WORKERS = 4
+REPORT_PDF_PARALLEL_ROWS = 20000
+REPORT_PDF_PARALLEL_CHUNK_ROWS = 4000
+
+# Chart cache
+# PNG графіків PDF-звітів; при перевищенні розміру видаляються найдавніше використані (0 — вимкнено)
+REPORT_CHART_CACHE_DIR = BASE_DIR / '.cache' / 'charts'
+REPORT_CHART_CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+
+# Balance snapshots
+# Дельта-зліпки зберігають лише ключі, що змінилися з попереднього зліпка
+BALANCE_SNAPSHOT_DELTA = True
+# Після стількох дельт поспіль наступний зліпок створюється повним
+BALANCE_SNAPSHOT_MAX_CHAIN = 30
+# Скільки секунд тримати матеріалізований стан зліпка в кеші
+BALANCE_SNAPSHOT_CACHE_TIMEOUT = 3600
+
+
+# Startup time
+# python manage.py check_startup_time: час django.setup() і завантаження URL-ів
+# (з усіма view), мс. Бібліотеки зі STARTUP_LAZY_MODULES мають імпортуватися
+# лише там, де вони використовуються, а не під час старту
+STARTUP_TIME_BUDGET_MS = {'setup': 400, 'urls': 150, 'total': 500}
+STARTUP_LAZY_MODULES = ('matplotlib', 'reportlab', 'xlsxwriter', 'openpyxl', 'requests', 'PyPDF2', 'pypdf')
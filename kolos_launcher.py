@@ -350,6 +350,7 @@ class KolosLauncher:
             pass
 
         self.server_process = None
+        self.worker_process = None
         self.start_time = None
         self.is_running = False
         self.first_web_open = True
@@ -619,11 +620,24 @@ class KolosLauncher:
                           capture_output=True)
             self.progress_var.set(90)
 
+            # PDF-звіти формуються у фоні: без воркера завдання лишаються "В черзі"
+            self.log("INFO: Запуск воркера звітів...")
+            self.worker_process = subprocess.Popen(
+                [python_exe, self.config["MANAGE_FILE"], "run_report_worker"],
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
+                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0,
+                # Власна група процесів: stop_server зупиняє її, не зачіпаючи лаунчер
+                start_new_session=os.name != "nt"
+            )
+            threading.Thread(target=self.pipe_log, args=(self.worker_process, "WORKER"), daemon=True).start()
+
             self.server_process = subprocess.Popen(
                 [python_exe, self.config["MANAGE_FILE"], "runserver", 
                  f"{self.config['SERVER_HOST']}:{self.config['SERVER_PORT']}", "--noreload"],
                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1,
-                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
+                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0,
+                # Власна група процесів: stop_server зупиняє її, не зачіпаючи лаунчер
+                start_new_session=os.name != "nt"
             )
 
             self.is_running = True
@@ -643,15 +657,27 @@ class KolosLauncher:
             self.log(f"ERROR: Критичний збій: {e}")
             self.stop_server()
 
+    def pipe_log(self, process, prefix):
+        for line in process.stdout:
+            if line.strip():
+                self.log(f"{prefix}: {line.strip()}")
+
+    @staticmethod
+    def kill_process(process):
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], 
+                          capture_output=True)
+        else:
+            os.killpg(os.getpgid(process.pid), signal.SIGTERM)
+
     def stop_server(self):
-        if self.server_process:
+        if self.server_process or self.worker_process:
             self.log("WARNING: Примусова зупинка процесів...")
-            if os.name == "nt":
-                subprocess.run(["taskkill", "/F", "/T", "/PID", str(self.server_process.pid)], 
-                              capture_output=True)
-            else:
-                os.killpg(os.getpgid(self.server_process.pid), signal.SIGTERM)
+            for process in (self.server_process, self.worker_process):
+                if process and process.poll() is None:
+                    self.kill_process(process)
             self.server_process = None
+            self.worker_process = None
 
         self.is_running = False
         self.start_time = None
@@ -1 +1,93 @@
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from directory.models import Culture, Place
+from .batch import JournalBatchService
+from .models import WeigherJournal, ShipmentJournal, FieldsIncome, OtherIncome, DailyMovementRollup
 
+
+class JournalActionForm(ActionForm):
+    """Додаткові поля панелі дій: нове значення для пакетної зміни."""
+    culture = forms.ModelChoiceField(queryset=Culture.objects.all(), required=False, label="Культура")
+    place_to = forms.ModelChoiceField(queryset=Place.objects.all(), required=False, label="До місця")
+
+
+class BaseJournalAdmin(admin.ModelAdmin):
+    """Пакетні дії журналів проводяться по залишках одним проведенням на весь вибір."""
+    action_form = JournalActionForm
+    actions = ("batch_delete", "batch_change_culture", "batch_change_place_to")
+    date_hierarchy = "date_time"
+    list_filter = ("culture",)
+    search_fields = ("document_number", "culture__name")
+
+    def get_actions(self, request):
+        # Стандартне delete_selected видаляє без відкату залишків
+        actions = super().get_actions(request)
+        actions.pop("delete_selected", None)
+        return actions
+
+    @staticmethod
+    def _chosen(request, model, field):
+        value = request.POST.get(field) or ""
+        return model.objects.filter(pk=value).first() if value.isdigit() else None
+
+    def _run_batch(self, request, queryset, operation, **changes):
+        ids = list(queryset.values_list("pk", flat=True))
+        try:
+            if operation == "delete":
+                count = JournalBatchService.delete(self.model, ids)
+            else:
+                count = JournalBatchService.update(self.model, ids, **changes)
+        except ValueError as e:
+            self.message_user(request, f"Зміни не збережено: {e}", messages.ERROR)
+            return
+        self.message_user(request, f"Оброблено записів: {count}.", messages.SUCCESS)
+
+    @admin.action(description="Видалити вибрані (з перерахунком залишків)")
+    def batch_delete(self, request, queryset):
+        self._run_batch(request, queryset, "delete")
+
+    @admin.action(description="Змінити культуру вибраних")
+    def batch_change_culture(self, request, queryset):
+        culture = self._chosen(request, Culture, "culture")
+        if culture is None:
+            self.message_user(request, "Оберіть нову культуру.", messages.WARNING)
+            return
+        self._run_batch(request, queryset, "update", culture_id=culture.pk)
+
+    @admin.action(description='Змінити місце "до" вибраних')
+    def batch_change_place_to(self, request, queryset):
+        place = self._chosen(request, Place, "place_to")
+        if place is None:
+            self.message_user(request, "Оберіть нове місце.", messages.WARNING)
+            return
+        self._run_batch(request, queryset, "update", place_to_id=place.pk)
+
+
+@admin.register(WeigherJournal)
+class WeigherJournalAdmin(BaseJournalAdmin):
+    list_display = ("document_number", "date_time", "culture", "from_place", "to_place", "to_balance_type", "weight_net")
+    list_filter = ("culture", "to_balance_type")
+
+
+@admin.register(ShipmentJournal)
+class ShipmentJournalAdmin(BaseJournalAdmin):
+    list_display = ("document_number", "date_time", "action_type", "culture", "place_from", "place_to", "weight_net")
+    list_filter = ("culture", "action_type")
+
+
+@admin.register(FieldsIncome)
+class FieldsIncomeAdmin(BaseJournalAdmin):
+    list_display = ("document_number", "date_time", "culture", "field", "place_to", "weight_net")
+
+
+@admin.register(OtherIncome)
+class OtherIncomeAdmin(BaseJournalAdmin):
+    list_display = ("document_number", "date_time", "culture", "seller", "place_to", "weight_net")
+
+
+@admin.register(DailyMovementRollup)
+class DailyMovementRollupAdmin(admin.ModelAdmin):
+    list_display = ("day", "kind", "action", "culture", "place", "count", "weight")
+    list_filter = ("kind", "action", "culture")
+    date_hierarchy = "day"
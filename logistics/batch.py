@@ -0,0 +1,88 @@
+"""
+Пакетні операції над журналами: видалення, зміна культури, зміна місця призначення.
+
+Замість сотні окремих save()/delete() (кожен зі своїм проведенням) документи
+блокуються одним запитом, чистий вплив усього пакета на залишки проводиться
+одним `BalanceService.repost_documents` (одна зміна на ключ), а самі документи
+пишуться одним UPDATE / DELETE.
+"""
+from django.db import transaction
+
+from balances.services import BalanceService
+from balances.versions import bump
+from .models import FieldsIncome, OtherIncome, ShipmentJournal, WeigherJournal
+from .rollup import RollupService
+
+
+class JournalBatchService:
+    """Пакетні зміни журналів з агрегованим проведенням по залишках."""
+
+    MODELS = {
+        model._meta.model_name: model
+        for model in (WeigherJournal, ShipmentJournal, FieldsIncome, OtherIncome)
+    }
+
+    # Поле місця призначення ("до місця") у кожному журналі
+    DESTINATION_FIELDS = {
+        WeigherJournal: 'to_place',
+        ShipmentJournal: 'place_to',
+        FieldsIncome: 'place_to',
+        OtherIncome: 'place_to',
+    }
+
+    @staticmethod
+    def _lock(model, ids):
+        return list(model.objects.select_for_update().filter(pk__in=ids).order_by('pk'))
+
+    @staticmethod
+    @transaction.atomic
+    def delete(model, ids):
+        """Видаляє документи і відкочує їхні проведення. Повертає кількість видалених."""
+        documents = JournalBatchService._lock(model, ids)
+        if not documents:
+            return 0
+        # Як і revert_balance(): якщо товар уже перемістили далі, залишок обнуляється
+        BalanceService.repost_documents(
+            ((document, document.get_balance_postings(), []) for document in documents),
+            clamp=True,
+        )
+        RollupService.apply((RollupService.entry_for(document), -1) for document in documents)
+        bump(model)
+        model.objects.filter(pk__in=[document.pk for document in documents]).delete()
+        return len(documents)
+
+    @staticmethod
+    @transaction.atomic
+    def update(model, ids, **changes):
+        """Змінює поля документів (`culture_id=...`, `place_to_id=...`) і проводить різницю.
+
+        `place_to_id` перекладається на поле місця призначення журналу.
+        Повертає кількість змінених документів; `ValueError` — якщо зміна некоректна
+        або на списання не вистачає залишку.
+        """
+        if 'place_to_id' in changes:
+            field = JournalBatchService.DESTINATION_FIELDS[model]
+            changes[f'{field}_id'] = changes.pop('place_to_id')
+
+        documents = JournalBatchService._lock(model, ids)
+        if model is WeigherJournal and 'to_place_id' in changes:
+            if any(document.from_place_id == changes['to_place_id'] for document in documents):
+                raise ValueError("Місця 'з' і 'до' не можуть бути однаковими.")
+
+        items = []
+        clamp_keys = set()
+        rollup = []
+        for document in documents:
+            document._capture_original()
+            for name, value in changes.items():
+                setattr(document, name, value)
+            items.append((document, document._original_postings, document.get_balance_postings()))
+            rollup += [(document._original_rollup, -1), (RollupService.entry_for(document), 1)]
+            # Ті самі правила обнулення, що й при збереженні одного документа
+            clamp_keys |= document._clamp_keys()
+
+        BalanceService.repost_documents(items, clamp_keys=clamp_keys)
+        RollupService.apply(rollup)
+        bump(model)
+        model.objects.filter(pk__in=[document.pk for document in documents]).update(**changes)
+        return len(documents)
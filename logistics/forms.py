@@ -5,6 +5,7 @@ from django.core.exceptions import ValidationError
 # Припустимо, що моделі імпортовані з відповідних місць
 from .models import WeigherJournal, ShipmentJournal, FieldsIncome, OtherIncome
 from balances.models import Balance
+from directory.models import Culture, Place
 
 
 # Додано вибір одиниць (повні назви)
@@ -404,4 +405,81 @@ class OtherIncomeForm(BaseJournalForm):
         if not place_to:
             self.add_error('place_to', ValidationError("Необхідно вказати місце прийому."))
 
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+
+class JournalImportForm(forms.Form):
+    """ Форма завантаження файлу для пакетного імпорту журналу. """
+
+    JOURNAL_CHOICES = (
+        ('weigher', 'Журнал внутрішніх переміщень'),
+        ('fields', 'Журнал надходжень з полів'),
+        ('shipment', 'Журнал відвантажень'),
+        ('other', 'Журнал інших надходжень'),
+    )
+
+    journal = forms.ChoiceField(
+        choices=JOURNAL_CHOICES,
+        label="Журнал",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    file = forms.FileField(
+        label="Файл (.csv або .xlsx)",
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv,.xlsx"}),
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label="Лише перевірити, нічого не записувати",
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        if not file.name.lower().endswith((".csv", ".xlsx")):
+            raise ValidationError("Підтримуються лише файли .csv та .xlsx.")
+        return file
+
+
+class JournalBatchForm(forms.Form):
+    """ Пакетна дія над вибраними записами журналу. """
+
+    ACTION_CHOICES = (
+        ('delete', 'Видалити'),
+        ('culture', 'Змінити культуру'),
+        ('place_to', 'Змінити місце "до"'),
+    )
+
+    action = forms.ChoiceField(
+        choices=ACTION_CHOICES,
+        label="Дія",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    ids = forms.ModelMultipleChoiceField(queryset=None, label="Записи")
+    culture = forms.ModelChoiceField(
+        queryset=Culture.objects.all(),
+        required=False,
+        label="Культура",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    place_to = forms.ModelChoiceField(
+        queryset=Place.objects.all(),
+        required=False,
+        label="До місця",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+
+    def __init__(self, *args, model=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["ids"].queryset = model.objects.all()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get("action")
+
+        if action == "culture" and not cleaned_data.get("culture"):
+            self.add_error("culture", ValidationError("Оберіть нову культуру."))
+
+        if action == "place_to" and not cleaned_data.get("place_to"):
+            self.add_error("place_to", ValidationError("Оберіть нове місце."))
+
+        return cleaned_data
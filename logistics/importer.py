@@ -0,0 +1,406 @@
+"""
+Пакетний імпорт журналів з CSV / XLSX.
+
+Файл читається потоково, рядки перевіряються пачками: назви з довідників
+(культури, місця, водії, авто...) розв'язуються одним запитом на пачку і
+кешуються між пачками. Документи вставляються `bulk_create`, а залишки
+проводяться один раз на ключ для всього файлу (`BalanceService.repost_documents`),
+так само пачкою оновлюються денні підсумки (`RollupService.apply`).
+Увесь імпорт — одна транзакція: якщо є хоч одна помилка, нічого не записується.
+"""
+import codecs
+import csv
+import zipfile
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from balances.models import Balance, BalanceType
+from balances.services import BalanceService
+from balances.versions import bump
+from directory.models import Car, Culture, Driver, Field, Place, Trailer
+from .models import FieldsIncome, OtherIncome, ShipmentAction, ShipmentJournal, WeigherJournal
+from .rollup import RollupService
+
+
+# Помилка імпорту: номер рядка у файлі (None — помилка всього файлу) і текст
+RowError = namedtuple('RowError', ['row', 'message'])
+
+
+class InvalidRow(Exception):
+    """Рядок файлу не пройшов перевірку."""
+
+
+class InvalidFile(Exception):
+    """Файл не вдалося прочитати; `row` — рядок, на якому читання зупинилось (якщо відомо)."""
+
+    def __init__(self, message, row=None):
+        super().__init__(message)
+        self.row = row
+
+
+class _Rollback(Exception):
+    pass
+
+
+class ImportResult:
+    """Підсумок імпорту: скільки документів створено (або буде створено для dry-run) і помилки."""
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+class JournalImporter:
+    """Імпорт одного типу журналу з CSV або XLSX."""
+
+    JOURNALS = {
+        'weigher': WeigherJournal,
+        'fields': FieldsIncome,
+        'shipment': ShipmentJournal,
+        'other': OtherIncome,
+    }
+
+    # Поле моделі -> (модель довідника, поле для пошуку за назвою)
+    LOOKUPS = {
+        'driver': (Driver, 'full_name'),
+        'car': (Car, 'number'),
+        'trailer': (Trailer, 'number'),
+        'culture': (Culture, 'name'),
+        'field': (Field, 'name'),
+        'from_place': (Place, 'name'),
+        'to_place': (Place, 'name'),
+        'place_from': (Place, 'name'),
+        'place_to': (Place, 'name'),
+    }
+
+    DATE_FORMATS = ('%d.%m.%Y %H:%M', '%d.%m.%Y %H:%M:%S', '%d.%m.%Y', '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d')
+
+    def __init__(self, journal, chunk_size=500):
+        self.model = self.JOURNALS[journal]
+        self.chunk_size = chunk_size
+        self._cache = {}
+        self._headers = self._header_map()
+
+    # --- читання файлу ---
+
+    def _header_map(self):
+        """Заголовок колонки (назва поля або verbose_name, без регістру) -> назва поля."""
+        headers = {}
+        for field in self.model._meta.concrete_fields:
+            if field.primary_key or not field.editable:
+                continue
+            headers[field.name.lower()] = field.name
+            headers[str(field.verbose_name).lower()] = field.name
+        return headers
+
+    def read_rows(self, file, filename):
+        """Генератор (номер рядка, dict поле -> значення) з CSV або XLSX.
+
+        `file` — бінарний файловий об'єкт; перший рядок — заголовки колонок.
+        """
+        if filename.lower().endswith('.xlsx'):
+            rows = self._read_xlsx(file)
+        else:
+            rows = self._read_csv(file)
+
+        header = None
+        for number, values in rows:
+            if header is None:
+                header = [self._headers.get(str(v or '').strip().lower()) for v in values]
+                continue
+            if not any(v not in (None, '') for v in values):
+                continue
+            yield number, {name: value for name, value in zip(header, values) if name}
+
+    @staticmethod
+    def _csv_encoding(head):
+        """UTF-8, якщо початок файлу в ньому читається, інакше — Windows-1251 (Excel без "UTF-8")."""
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        except UnicodeDecodeError:
+            return 'cp1251'
+        # Excel зберігає CSV з BOM — utf-8-sig його прибирає
+        return 'utf-8-sig'
+
+    @staticmethod
+    def _decode_lines(file, encoding):
+        """Рядки файлу як текст; рядок, що не декодується, — `InvalidFile` з його номером."""
+        decoder = codecs.getincrementaldecoder(encoding)()
+        for number, line in enumerate(file, start=1):
+            try:
+                yield decoder.decode(line)
+            except UnicodeDecodeError:
+                name = 'UTF-8' if encoding == 'utf-8-sig' else 'Windows-1251'
+                raise InvalidFile(
+                    f'Рядок не читається в кодуванні {name}. Збережіть файл як CSV UTF-8.', row=number
+                )
+
+    @classmethod
+    def _read_csv(cls, file):
+        head = file.read(65536)
+        file.seek(0)
+        encoding = cls._csv_encoding(head)
+        try:
+            dialect = csv.Sniffer().sniff(head[:4096].decode(encoding, errors='ignore'), delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        for number, values in enumerate(csv.reader(cls._decode_lines(file, encoding), dialect), start=1):
+            yield number, values
+
+    @staticmethod
+    def _read_xlsx(file):
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+
+        try:
+            workbook = load_workbook(file, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, InvalidFileException, KeyError, ValueError):
+            raise InvalidFile('Файл не є книгою Excel (.xlsx) або пошкоджений.')
+        try:
+            for number, values in enumerate(workbook.active.iter_rows(values_only=True), start=1):
+                yield number, list(values)
+        finally:
+            workbook.close()
+
+    # --- довідники ---
+
+    def _prefetch(self, chunk):
+        """Один запит на довідник на пачку — тільки для назв, яких ще немає в кеші."""
+        wanted = {}
+        for _, row in chunk:
+            for field, (model, lookup) in self.LOOKUPS.items():
+                value = self._text(row.get(field))
+                if value and (model, value.lower()) not in self._cache:
+                    wanted.setdefault((model, lookup), set()).add(value)
+
+        for (model, lookup), names in wanted.items():
+            found = {}
+            for pk, name in model.objects.filter(**{f'{lookup}__in': names}).values_list('pk', lookup):
+                found.setdefault(name.lower(), []).append(pk)
+            for name in names:
+                self._cache[(model, name.lower())] = found.get(name.lower(), [])
+
+    def _resolve(self, row, field, required=False):
+        value = self._text(row.get(field))
+        label = self.model._meta.get_field(field).verbose_name
+        if not value:
+            if required:
+                raise InvalidRow(f'Не вказано "{label}".')
+            return None
+        model, _ = self.LOOKUPS[field]
+        ids = self._cache.get((model, value.lower()), [])
+        if not ids:
+            raise InvalidRow(f'"{label}": "{value}" не знайдено в довіднику.')
+        if len(ids) > 1:
+            raise InvalidRow(f'"{label}": назва "{value}" неоднозначна ({len(ids)} записів).')
+        return ids[0]
+
+    # --- розбір значень ---
+
+    @staticmethod
+    def _text(value):
+        if value is None:
+            return ''
+        return str(value).strip()
+
+    def _decimal(self, row, field, required=True):
+        value = row.get(field)
+        label = self.model._meta.get_field(field).verbose_name
+        if value in (None, ''):
+            if required:
+                raise InvalidRow(f'Не вказано "{label}".')
+            return None
+        try:
+            number = Decimal(str(value).strip().replace(' ', '').replace(',', '.'))
+        except InvalidOperation:
+            raise InvalidRow(f'"{label}": "{value}" не є числом.')
+        if number < 0:
+            raise InvalidRow(f'"{label}" не може бути від\'ємною.')
+        return number.quantize(Decimal('0.001'))
+
+    def _datetime(self, row):
+        value = row.get('date_time')
+        if value in (None, ''):
+            return timezone.now()
+        if isinstance(value, datetime):
+            parsed = value
+        elif isinstance(value, date):
+            parsed = datetime(value.year, value.month, value.day)
+        else:
+            for fmt in self.DATE_FORMATS:
+                try:
+                    parsed = datetime.strptime(str(value).strip(), fmt)
+                    break
+                except ValueError:
+                    continue
+            else:
+                raise InvalidRow(f'"Дата і час": "{value}" — невідомий формат дати.')
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
+
+    @staticmethod
+    def _choice(value, choices, label, default=None):
+        text = JournalImporter._text(value).lower()
+        if not text:
+            if default is None:
+                raise InvalidRow(f'Не вказано "{label}".')
+            return default
+        for key, verbose in choices:
+            if text in (str(key).lower(), str(verbose).lower()):
+                return key
+        raise InvalidRow(f'"{label}": невідоме значення "{value}".')
+
+    # --- побудова документа ---
+
+    def build(self, row):
+        """Неперевірений рядок -> незбережений документ (з порахованою weight_net)."""
+        document_number = self._text(row.get('document_number'))
+        if not document_number:
+            raise InvalidRow('Не вказано "№ документа / накладної".')
+
+        gross = self._decimal(row, 'weight_gross')
+        tare = self._decimal(row, 'weight_tare')
+        loss = self._decimal(row, 'weight_loss', required=False)
+        net = gross - tare - (loss or 0)
+        if tare > gross:
+            raise InvalidRow('Вага тари більша за вагу брутто.')
+        if net < 0:
+            raise InvalidRow('Вага нетто від\'ємна.')
+
+        values = dict(
+            document_number=document_number,
+            date_time=self._datetime(row),
+            culture_id=self._resolve(row, 'culture', required=True),
+            driver_id=self._resolve(row, 'driver', required=self.model is ShipmentJournal),
+            car_id=self._resolve(row, 'car', required=self.model is ShipmentJournal),
+            trailer_id=self._resolve(row, 'trailer'),
+            weight_gross=gross,
+            weight_tare=tare,
+            weight_loss=loss,
+            # bulk_create не викликає save() — нетто рахуємо тут, як BaseJournal.save()
+            weight_net=net,
+            note=self._text(row.get('note')) or None,
+        )
+
+        if self.model is WeigherJournal:
+            values['from_place_id'] = self._resolve(row, 'from_place', required=True)
+            values['to_place_id'] = self._resolve(row, 'to_place', required=True)
+            if values['from_place_id'] == values['to_place_id']:
+                raise InvalidRow("Місця 'з' і 'до' не можуть бути однаковими.")
+            values['to_balance_type'] = self._choice(
+                row.get('to_balance_type'), BalanceType.choices, 'Приймається як', default=BalanceType.STOCK
+            )
+        elif self.model is FieldsIncome:
+            values['field_id'] = self._resolve(row, 'field')
+            values['place_to_id'] = self._resolve(row, 'place_to', required=True)
+        elif self.model is OtherIncome:
+            values['seller'] = self._text(row.get('seller'))
+            if not values['seller']:
+                raise InvalidRow('Не вказано "Продавець".')
+            values['place_to_id'] = self._resolve(row, 'place_to', required=True)
+        elif self.model is ShipmentJournal:
+            action = self._choice(row.get('action_type'), ShipmentAction.choices, 'Тип операції')
+            values['action_type'] = action
+            values['place_from_id'] = self._resolve(row, 'place_from', required=action == ShipmentAction.EXPORT)
+            values['place_to_id'] = self._resolve(row, 'place_to', required=action == ShipmentAction.IMPORT)
+            values['place_from_text'] = self._text(row.get('place_from_text')) or None
+            values['place_to_text'] = self._text(row.get('place_to_text')) or None
+
+        return self.model(**values)
+
+    def _chunks(self, rows):
+        chunk = []
+        for item in rows:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    @staticmethod
+    def _shortage_errors(documents):
+        """
+        Помилки для ключів, по яких імпорт списує більше, ніж є на залишку: рядок,
+        після якого залишок ключа (з урахуванням попередніх рядків файлу) стає
+        від'ємним і вже не відновлюється.
+        """
+        postings = [
+            (number, (p.place_id, p.culture_id, p.balance_type), p.delta)
+            for number, document in documents for p in document.get_balance_postings()
+        ]
+        keys = {key for _, key, _ in postings}
+        running = {
+            (b.place_id, b.culture_id, b.balance_type): b.quantity
+            for b in Balance.objects.filter(
+                place_id__in={key[0] for key in keys}, culture_id__in={key[1] for key in keys}
+            )
+        }
+        crossed = {}
+        for number, key, delta in postings:
+            before = running.get(key, Decimal('0'))
+            running[key] = before + delta
+            if before >= 0 > running[key]:
+                crossed[key] = number
+        return [
+            RowError(number, f'Проведення по залишках: недостатньо залишку (бракує {-running[key]} т).')
+            for key, number in sorted(crossed.items(), key=lambda item: item[1])
+            if running[key] < 0
+        ]
+
+    def run(self, rows, dry_run=False):
+        """Імпортує рядки з `read_rows`. Повертає `ImportResult`.
+
+        З помилками (або з `dry_run=True`) транзакція відкочується.
+        """
+        result = ImportResult()
+        documents = []
+        try:
+            with transaction.atomic():
+                try:
+                    for chunk in self._chunks(rows):
+                        self._prefetch(chunk)
+                        valid, numbers = [], []
+                        for number, row in chunk:
+                            try:
+                                valid.append(self.build(row))
+                                numbers.append(number)
+                            except InvalidRow as e:
+                                result.errors.append(RowError(number, str(e)))
+                        if not result.errors:
+                            created = self.model.objects.bulk_create(valid, batch_size=self.chunk_size)
+                            documents.extend(zip(numbers, created))
+                except InvalidFile as e:
+                    result.errors.append(RowError(e.row, str(e)))
+
+                if not result.errors:
+                    try:
+                        # Точка збереження: після невдалого проведення залишки ще потрібні
+                        # до імпорту, щоб знайти рядки, на яких їх забракло
+                        with transaction.atomic():
+                            BalanceService.repost_documents(
+                                (document, [], document.get_balance_postings()) for _, document in documents
+                            )
+                    except ValueError as e:
+                        result.errors.extend(
+                            self._shortage_errors(documents) or [RowError(None, f'Проведення по залишках: {e}')]
+                        )
+                    else:
+                        RollupService.apply((RollupService.entry_for(document), 1) for _, document in documents)
+                        bump(self.model)
+
+                if result.errors or dry_run:
+                    raise _Rollback
+        except _Rollback:
+            pass
+
+        if result.ok:
+            result.created = len(documents)
+        return result
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from logistics.importer import JournalImporter
+
+
+class Command(BaseCommand):
+    help = 'Імпорт журналу з CSV або XLSX (перший рядок — заголовки: назви полів або їхні підписи).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('journal', choices=sorted(JournalImporter.JOURNALS), help='Тип журналу')
+        parser.add_argument('path', help='Шлях до .csv або .xlsx')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Скільки рядків перевіряти за раз')
+        parser.add_argument('--dry-run', action='store_true', help='Лише перевірити файл, нічого не записувати')
+
+    def handle(self, *args, **options):
+        importer = JournalImporter(options['journal'], chunk_size=options['chunk_size'])
+        try:
+            with open(options['path'], 'rb') as file:
+                result = importer.run(importer.read_rows(file, options['path']), dry_run=options['dry_run'])
+        except OSError as e:
+            raise CommandError(f'Не вдалося відкрити файл: {e}')
+
+        for error in result.errors:
+            where = f'Рядок {error.row}' if error.row else 'Файл'
+            self.stderr.write(f'{where}: {error.message}')
+
+        if not result.ok:
+            raise CommandError(f'Імпорт скасовано: помилок {len(result.errors)}.')
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Перевірено: {result.created} документів готові до імпорту.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Імпортовано документів: {result.created}.'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from balances.versions import bump
+from logistics.models import DailyMovementRollup
+from logistics.rollup import RollupService
+
+
+class Command(BaseCommand):
+    help = 'Перебудувати денні підсумки журналів (DailyMovementRollup) з усіх журналів.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Розмір пакета для bulk_create')
+
+    def handle(self, *args, **options):
+        count = RollupService.rebuild(batch_size=options['batch_size'])
+        # Закешовані звіти, пораховані з попередніх підсумків, стають застарілими
+        bump(DailyMovementRollup)
+        self.stdout.write(self.style.SUCCESS(f'DailyMovementRollup перебудовано: {count} рядків.'))
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0001_initial'),
+        ('logistics', '0003_weigherjournal_to_balance_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fieldsincome',
+            index=models.Index(fields=['date_time'], name='fields_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fieldsincome',
+            index=models.Index(fields=['culture', 'date_time'], name='fields_cult_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fieldsincome',
+            index=models.Index(fields=['field', 'date_time'], name='fields_field_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fieldsincome',
+            index=models.Index(fields=['place_to', 'date_time'], name='fields_to_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otherincome',
+            index=models.Index(fields=['date_time'], name='otherinc_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otherincome',
+            index=models.Index(fields=['culture', 'date_time'], name='otherinc_cult_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='otherincome',
+            index=models.Index(fields=['place_to', 'date_time'], name='otherinc_to_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipmentjournal',
+            index=models.Index(fields=['date_time'], name='shipment_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipmentjournal',
+            index=models.Index(fields=['culture', 'date_time'], name='shipment_cult_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipmentjournal',
+            index=models.Index(fields=['place_from', 'date_time'], name='shipment_from_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipmentjournal',
+            index=models.Index(fields=['place_to', 'date_time'], name='shipment_to_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shipmentjournal',
+            index=models.Index(fields=['action_type', 'date_time'], name='shipment_action_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weigherjournal',
+            index=models.Index(fields=['date_time'], name='weigher_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weigherjournal',
+            index=models.Index(fields=['culture', 'date_time'], name='weigher_cult_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weigherjournal',
+            index=models.Index(fields=['from_place', 'date_time'], name='weigher_from_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weigherjournal',
+            index=models.Index(fields=['to_place', 'date_time'], name='weigher_to_date_idx'),
+        ),
+    ]
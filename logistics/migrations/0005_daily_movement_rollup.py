@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_rollup(apps, schema_editor):
+    from logistics.rollup import RollupService
+
+    RollupService.rebuild(
+        journal_models={
+            'weigher': apps.get_model('logistics', 'WeigherJournal'),
+            'shipment': apps.get_model('logistics', 'ShipmentJournal'),
+            'fields': apps.get_model('logistics', 'FieldsIncome'),
+            'other': apps.get_model('logistics', 'OtherIncome'),
+        },
+        rollup_model=apps.get_model('logistics', 'DailyMovementRollup'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0001_initial'),
+        ('logistics', '0004_journal_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMovementRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('kind', models.CharField(choices=[('weigher', 'Внутрішні переміщення'), ('shipment', 'Відвантаження'), ('fields', 'Надходження з полів'), ('other', 'Інші надходження')], max_length=10, verbose_name='Журнал')),
+                ('action', models.CharField(blank=True, default='', max_length=10, verbose_name='Дія')),
+                ('count', models.IntegerField(default=0, verbose_name='Кількість документів')),
+                ('weight', models.DecimalField(decimal_places=3, default=0, max_digits=14, verbose_name='Вага нетто (тонн)')),
+                ('culture', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movement_rollups', to='directory.culture', verbose_name='Культура')),
+                ('place', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movement_rollups', to='directory.place', verbose_name='Місце')),
+            ],
+            options={
+                'verbose_name': 'Денний підсумок журналів',
+                'verbose_name_plural': 'Денні підсумки журналів',
+                'ordering': ['-day', 'kind'],
+                'indexes': [models.Index(fields=['kind', 'day'], name='rollup_kind_day_idx')],
+                'unique_together': {('day', 'kind', 'action', 'culture', 'place')},
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def rebuild_rollup(apps, schema_editor):
+    # Відвантаження без типу операції раніше не потрапляли в підсумки
+    from logistics.rollup import RollupService
+
+    RollupService.rebuild(
+        journal_models={
+            'weigher': apps.get_model('logistics', 'WeigherJournal'),
+            'shipment': apps.get_model('logistics', 'ShipmentJournal'),
+            'fields': apps.get_model('logistics', 'FieldsIncome'),
+            'other': apps.get_model('logistics', 'OtherIncome'),
+        },
+        rollup_model=apps.get_model('logistics', 'DailyMovementRollup'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0005_daily_movement_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollup, migrations.RunPython.noop),
+    ]
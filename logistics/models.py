@@ -1,11 +1,21 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 from directory.models import Car, Trailer, Driver, Culture, Place, Field
-from balances.services import BalanceService, BalanceType
+from balances.services import BalanceType
+from balances.postings import BalancePostingMixin, PostingRule
+from .rollup import RollupService
 
 
+class JournalKind(models.TextChoices):
+    WEIGHER = "weigher", "Внутрішні переміщення"
+    SHIPMENT = "shipment", "Відвантаження"
+    FIELDS = "fields", "Надходження з полів"
+    OTHER = "other", "Інші надходження"
 
-class BaseJournal(models.Model):
+
+
+class BaseJournal(BalancePostingMixin, models.Model):
     """ Базова модель для операцій зважування """
 
     document_number = models.CharField(max_length=50, verbose_name="№ документа / накладної")
@@ -23,37 +33,41 @@ class BaseJournal(models.Model):
     weight_net = models.DecimalField(max_digits=12, decimal_places=3, editable=False, verbose_name="Вага нетто (тонн)")
     note = models.TextField(blank=True, null=True, verbose_name="Примітка")
 
-    _original_values = None
-    
     class Meta:
         abstract = True  # це важливо — Django не створюватиме таблицю для базового класу
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        if self.pk:
-            self._original_values = self._get_operation_values()
-            
-    def _get_operation_values(self):
-        return {
-            'weight_net': self.weight_net,
-        }
-    
-    def get_original_value(self, field_name, default=None):
-        if self._original_values and field_name in self._original_values:
-            return self._original_values[field_name]
-        return default
-    
+    # Вид журналу в DailyMovementRollup
+    rollup_kind = None
+
+    _original_rollup = None
+
+    def _capture_original(self):
+        original = super()._capture_original()
+        self._original_rollup = RollupService.entry_for(original) if original else None
+        return original
+
     def save(self, *args, **kwargs):
         if self.weight_loss:
             self.weight_net = self.weight_gross - self.weight_tare - self.weight_loss
         else:
             self.weight_net = self.weight_gross - self.weight_tare
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            # _original_rollup заповнює _capture_original() у save() проведень
+            super().save(*args, **kwargs)
+            RollupService.repost(self._original_rollup, RollupService.entry_for(self))
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            RollupService.repost(self._original_rollup, None)
+            return result
 
 
 class WeigherJournal(BaseJournal):
     """ Внутрішні переміщення """
 
+    rollup_kind = JournalKind.WEIGHER
+
     from_place = models.ForeignKey(
         Place,
         on_delete=models.SET_NULL,
@@ -85,6 +99,12 @@ class WeigherJournal(BaseJournal):
         verbose_name = "Журнал внутрішніх переміщень"
         verbose_name_plural = "Журнали внутрішніх переміщень"
         ordering = ['-date_time']
+        indexes = [
+            models.Index(fields=['date_time'], name='weigher_date_idx'),
+            models.Index(fields=['culture', 'date_time'], name='weigher_cult_date_idx'),
+            models.Index(fields=['from_place', 'date_time'], name='weigher_from_date_idx'),
+            models.Index(fields=['to_place', 'date_time'], name='weigher_to_date_idx'),
+        ]
 
     def __str__(self):
         return f"Внутрішнє переміщення {self.document_number} ({self.culture.name}): {self.weight_net} тонн"
@@ -101,104 +121,13 @@ class WeigherJournal(BaseJournal):
         tare = self.weight_tare or 0
         return gross - tare
 
-    # ------------------------------------------------------------------
-    # Зберігаємо "знімок" значень на момент завантаження з БД.
-    # Потрібен, щоб revert_balance() міг коректно відкотити старий запис,
-    # навіть якщо форма змінила culture / place / to_balance_type / вагу.
-    # ------------------------------------------------------------------
-    def _get_operation_values(self):
-        values = super()._get_operation_values()
-        values.update({
-            'from_place_id': self.from_place_id,
-            'to_place_id': self.to_place_id,
-            'culture_id': self.culture_id,
-            'to_balance_type': self.to_balance_type,
-            'departed_weight': self.departed_weight,
-        })
-        return values
-
-    def revert_balance(self):
-        """Відкочує баланси за СТАРИМИ (на момент завантаження) значеннями."""
-        original_weight_net = self.get_original_value('weight_net')
-        if original_weight_net is None:
-            return
-
-        original_from_place_id = self.get_original_value('from_place_id')
-        original_to_place_id = self.get_original_value('to_place_id')
-        original_culture_id = self.get_original_value('culture_id')
-        original_to_balance_type = self.get_original_value('to_balance_type', BalanceType.STOCK)
-        # Фолбек для старих записів, у яких ще немає 'departed_weight' у знімку
-        original_departed = self.get_original_value('departed_weight', original_weight_net)
-
-        original_from_place = Place.objects.filter(pk=original_from_place_id).first() if original_from_place_id else None
-        original_to_place = Place.objects.filter(pk=original_to_place_id).first() if original_to_place_id else None
-        original_culture = Culture.objects.filter(pk=original_culture_id).first() if original_culture_id else None
-
-        # На відправлення повертаємо ПОВНУ вагу, що виїхала (gross - tare),
-        # бо саме її було списано в update_balance() — а не "нетто".
-        if original_from_place and original_culture:
-            BalanceService.adjust_balance(
-                place=original_from_place,
-                culture=original_culture,
-                balance_type=BalanceType.STOCK,
-                delta=original_departed
-            )
-
-        # На прийманні відкочуємо саме той тип балансу і ту "нетто"-суму
-        # (gross - tare - loss), яку було нараховано.
-        if original_to_place and original_culture:
-            try:
-                BalanceService.adjust_balance(
-                    place=original_to_place,
-                    culture=original_culture,
-                    balance_type=original_to_balance_type,
-                    delta=-original_weight_net
-                )
-            except ValueError:
-                BalanceService.set_balance(
-                    place=original_to_place,
-                    culture=original_culture,
-                    balance_type=original_to_balance_type,
-                    quantity=0
-                )
-
-    def update_balance(self):
-        """Нараховує баланси за НОВИМИ (поточними) значеннями."""
-        if self.from_place:
-            # З місця відправлення списується ПОВНА вага, що виїхала
-            # (gross - tare), незалежно від втрат у дорозі.
-            BalanceService.adjust_balance(
-                place=self.from_place,
-                culture=self.culture,
-                balance_type=BalanceType.STOCK,
-                delta=-self.departed_weight
-            )
-        if self.to_place:
-            # На місце призначення приходить "нетто" (gross - tare - loss)
-            # у вигляді зерна або відходів — залежно від перемикача.
-            BalanceService.adjust_balance(
-                place=self.to_place,
-                culture=self.culture,
-                balance_type=self.to_balance_type,
-                delta=self.weight_net
-            )
-
-    def save(self, *args, **kwargs):
-        is_new = self._state.adding
-        if not is_new:
-            self.revert_balance()
-
-        super().save(*args, **kwargs)
-
-        self.update_balance()
-
-        # Оновлюємо "знімок" — щоб подальші save() в межах того ж інстансу
-        # відкочували вже актуальні значення.
-        self._original_values = self._get_operation_values()
-
-    def delete(self, *args, **kwargs):
-        self.revert_balance()
-        super().delete(*args, **kwargs)
+    @classmethod
+    def balance_posting_rules(cls):
+        """Списання повної ваги з from_place, нарахування нетто на to_place."""
+        return [
+            PostingRule('from_place', F('weight_gross') - F('weight_tare'), -1, attr='departed_weight'),
+            PostingRule('to_place', 'weight_net', +1, balance_type='to_balance_type'),
+        ]
 
 
 class ShipmentAction(models.TextChoices):
@@ -207,6 +136,8 @@ class ShipmentAction(models.TextChoices):
 
 class ShipmentJournal(BaseJournal):
     """ Зовнішні операції - відвантаження """
+
+    rollup_kind = JournalKind.SHIPMENT
     
     action_type = models.CharField(
         max_length=10,
@@ -238,7 +169,22 @@ class ShipmentJournal(BaseJournal):
         verbose_name = "Журнал відвантажень"
         verbose_name_plural = "Журнали відвантажень"
         ordering = ['-date_time']
+        indexes = [
+            models.Index(fields=['date_time'], name='shipment_date_idx'),
+            models.Index(fields=['culture', 'date_time'], name='shipment_cult_date_idx'),
+            models.Index(fields=['place_from', 'date_time'], name='shipment_from_date_idx'),
+            models.Index(fields=['place_to', 'date_time'], name='shipment_to_date_idx'),
+            models.Index(fields=['action_type', 'date_time'], name='shipment_action_date_idx'),
+        ]
     
+    @classmethod
+    def balance_posting_rules(cls):
+        """Ввезення — прихід на place_to, вивезення — списання з place_from."""
+        return [
+            PostingRule('place_to', 'weight_net', +1, when={'action_type': ShipmentAction.IMPORT}),
+            PostingRule('place_from', 'weight_net', -1, when={'action_type': ShipmentAction.EXPORT}, clamp=True),
+        ]
+
     @property
     def display_place_from(self):
         if self.action_type == ShipmentAction.EXPORT:
@@ -259,61 +205,6 @@ class ShipmentJournal(BaseJournal):
         )
         
     
-    def revert_balance(self):
-        original_weight_net = self.get_original_value('weight_net')
-
-        if self.action_type == ShipmentAction.IMPORT and self.place_to:
-            try:
-                BalanceService.adjust_balance(
-                    place=self.place_to,
-                    culture=self.culture,
-                    balance_type=BalanceType.STOCK,
-                    delta=-original_weight_net,
-                )
-            except ValueError as e:
-                BalanceService.set_balance(
-                    place=self.place_to,
-                    culture=self.culture,
-                    balance_type=BalanceType.STOCK,
-                    quantity=0
-                )
-        elif self.action_type == ShipmentAction.EXPORT and self.place_from:
-            BalanceService.adjust_balance(
-                place=self.place_from,
-                culture=self.culture,
-                balance_type=BalanceType.STOCK,
-                delta=original_weight_net,
-            )
-
-        
-    def update_balance(self):
-        """Делегує бізнес-логіку в BalanceService."""
-        if not self.culture or not self.weight_net:
-            return
-
-        if self.action_type == ShipmentAction.IMPORT and self.place_to:
-            BalanceService.adjust_balance(
-                place=self.place_to,
-                culture=self.culture,
-                balance_type=BalanceType.STOCK,
-                delta=self.weight_net,
-            )
-        elif self.action_type == ShipmentAction.EXPORT and self.place_from:
-            try:
-                BalanceService.adjust_balance(
-                    place=self.place_from,
-                    culture=self.culture,
-                    balance_type=BalanceType.STOCK,
-                    delta=-self.weight_net,
-                )
-            except ValueError as e:
-                BalanceService.set_balance(
-                    place=self.place_from,
-                    culture=self.culture,
-                    balance_type=BalanceType.STOCK,
-                    quantity=0
-                )
-            
     def clean(self):
         """Валідація залежно від типу дії."""
         from django.core.exceptions import ValidationError
@@ -327,30 +218,14 @@ class ShipmentJournal(BaseJournal):
             
         
     def save(self, *args, **kwargs):
-        """Збереження з коректним оновленням балансу"""
         self.full_clean()
-        is_new = self._state.adding
-
-        if not is_new:
-            # Для існуючого запису - спочатку відкатуємо старі зміни
-            self.revert_balance()
-
         super().save(*args, **kwargs)
-
-        # Застосовуємо нові зміни балансу
-        self.update_balance()
-
-        # Оновлюємо початкові значення
-        self._original_values = self._get_operation_values()
-
-    def delete(self, *args, **kwargs):
-        """Видалення з поверненням балансу"""
-        self.revert_balance()
-        super().delete(*args, **kwargs)
         
 
 class FieldsIncome(BaseJournal):
     """ Журнал надходжень з полів """
+
+    rollup_kind = JournalKind.FIELDS
     
     field = models.ForeignKey(
         Field,
@@ -372,56 +247,26 @@ class FieldsIncome(BaseJournal):
         verbose_name = "Журнал надходжень з полів"
         verbose_name_plural = "Журнали надходжень з полів"
         ordering = ['-date_time']
+        indexes = [
+            models.Index(fields=['date_time'], name='fields_date_idx'),
+            models.Index(fields=['culture', 'date_time'], name='fields_cult_date_idx'),
+            models.Index(fields=['field', 'date_time'], name='fields_field_date_idx'),
+            models.Index(fields=['place_to', 'date_time'], name='fields_to_date_idx'),
+        ]
         
     def __str__(self):
         return f"Надходження {self.document_number} ({self.culture.name}) з поля {self.field.name} до {self.place_to.name}: {self.weight_net} тонн"
     
-    def revert_balance(self):
-        """Відкат змін балансу (для видалення або редагування)"""
-        original_weight_net = self.get_original_value('weight_net')
-        if original_weight_net is not None and self.place_to:
-            try:
-                BalanceService.adjust_balance(
-                    place=self.place_to,
-                    culture=self.culture,
-                    balance_type=BalanceType.STOCK,
-                    delta=-original_weight_net,
-                )
-            except ValueError:
-                BalanceService.set_balance(
-                    place=self.place_to,
-                    culture=self.culture,
-                    balance_type=BalanceType.STOCK,
-                    quantity=0,
-                )
-            
-    def update_balance(self):
-        weight_net = self.weight_net
-        if self.place_to:
-            BalanceService.adjust_balance(
-                place=self.place_to,
-                culture=self.culture,
-                balance_type=BalanceType.STOCK,
-                delta=weight_net,
-            )
-    
-    def save(self, *args, **kwargs):
-        is_new = self._state.adding
+    @classmethod
+    def balance_posting_rules(cls):
+        return [PostingRule('place_to', 'weight_net', +1)]
 
-        if not is_new:
-            self.revert_balance()
-
-        super().save(*args, **kwargs)
-
-        self.update_balance()
-        
-    def delete(self, *args, **kwargs):
-        self.revert_balance()
-        super().delete(*args, **kwargs)
         
 
 class OtherIncome(BaseJournal):
     """ Журнал інгорних надходжень (від людей, продавців) """
+
+    rollup_kind = JournalKind.OTHER
     
     seller = models.CharField(max_length=255, verbose_name="Продавець")
     
@@ -437,51 +282,57 @@ class OtherIncome(BaseJournal):
         verbose_name = "Журнал інших надходжень"
         verbose_name_plural = "Журнали інших надходжень"
         ordering = ['-date_time']
+        indexes = [
+            models.Index(fields=['date_time'], name='otherinc_date_idx'),
+            models.Index(fields=['culture', 'date_time'], name='otherinc_cult_date_idx'),
+            models.Index(fields=['place_to', 'date_time'], name='otherinc_to_date_idx'),
+        ]
         
     def __str__(self):
         return f"Надходження {self.document_number} ({self.culture.name}) від {self.seller} до {self.place_to.name}: {self.weight_net} тонн"
     
-    def revert_balance(self):
-        """Відкат змін балансу (для видалення або редагування)"""
-        original_weight_net = self.get_original_value('weight_net')
-        if original_weight_net is not None and self.place_to:
-            try:
-                BalanceService.adjust_balance(
-                    place=self.place_to,
-                    culture=self.culture,
-                    balance_type=BalanceType.STOCK,
-                    delta=-original_weight_net,
-                )
-            except ValueError:
-                BalanceService.set_balance(
-                    place=self.place_to,
-                    culture=self.culture,
-                    balance_type=BalanceType.STOCK,
-                    quantity=0,
-                )
-            
-    def update_balance(self):
-        weight_net = self.weight_net
-        if self.place_to:
-            BalanceService.adjust_balance(
-                place=self.place_to,
-                culture=self.culture,
-                balance_type=BalanceType.STOCK,
-                delta=weight_net,
-            )
-    
-    def save(self, *args, **kwargs):
-        is_new = self._state.adding
-
-        if not is_new:
-            self.revert_balance()
-
-        super().save(*args, **kwargs)
+    @classmethod
+    def balance_posting_rules(cls):
+        return [PostingRule('place_to', 'weight_net', +1)]
+
+class DailyMovementRollup(models.Model):
+    """Денні підсумки журналів: кількість документів і тоннаж (нетто).
+
+    Ключ — (день, вид журналу, дія, культура, місце). Місце — те, якого стосується
+    документ: місце прийому для надходжень і переміщень, для відвантажень —
+    місце ввезення або вивезення. Підтримується в тій самій транзакції, що й
+    створення, зміна і видалення журналів (`RollupService`); повна перебудова —
+    команда `rebuild_movement_rollup`.
+    """
+
+    day = models.DateField(verbose_name="День")
+    kind = models.CharField(max_length=10, choices=JournalKind.choices, verbose_name="Журнал")
+    action = models.CharField(max_length=10, blank=True, default="", verbose_name="Дія")
+    culture = models.ForeignKey(
+        Culture,
+        on_delete=models.SET_NULL,
+        related_name="movement_rollups",
+        verbose_name="Культура",
+        null=True
+    )
+    place = models.ForeignKey(
+        Place,
+        on_delete=models.SET_NULL,
+        related_name="movement_rollups",
+        verbose_name="Місце",
+        null=True
+    )
+    count = models.IntegerField(default=0, verbose_name="Кількість документів")
+    weight = models.DecimalField(max_digits=14, decimal_places=3, default=0, verbose_name="Вага нетто (тонн)")
 
-        self.update_balance()
-        
-    def delete(self, *args, **kwargs):
-        self.revert_balance()
-        super().delete(*args, **kwargs)
-        
+    class Meta:
+        verbose_name = "Денний підсумок журналів"
+        verbose_name_plural = "Денні підсумки журналів"
+        ordering = ['-day', 'kind']
+        unique_together = ('day', 'kind', 'action', 'culture', 'place')
+        indexes = [
+            models.Index(fields=['kind', 'day'], name='rollup_kind_day_idx'),
+        ]
 
+    def __str__(self):
+        return f"{self.day:%d.%m.%Y} {self.get_kind_display()} {self.action}: {self.count} док., {self.weight} т"
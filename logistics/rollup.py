@@ -0,0 +1,133 @@
+"""
+Денні підсумки журналів (`DailyMovementRollup`).
+
+Документ потрапляє в один рядок (день, вид журналу, дія, культура, місце) з
+кількістю і вагою нетто. При створенні, зміні та видаленні журналу рядок
+оновлюється в тій самій транзакції, тож дашборд і підсумки за місяць / сезон
+читають кілька рядків на день замість сканування журналів.
+"""
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+# Ключ рядка підсумків і вага документа
+RollupEntry = namedtuple('RollupEntry', ['day', 'kind', 'action', 'culture_id', 'place_id', 'weight'])
+
+# Вид журналу -> [(умова на документ, поле місця)]: до якого місця відноситься документ.
+# Умови одного журналу не перетинаються, і кожен документ підпадає під одну з них —
+# інакше підсумки розійдуться з журналом.
+ROLLUP_PLACES = {
+    'weigher': [({}, 'to_place')],
+    'shipment': [
+        ({'action_type': 'import'}, 'place_to'),
+        ({'action_type': 'export'}, 'place_from'),
+        # Старі документи без типу операції: у звітах дія '—', на дашборді — вивезення
+        ({'action_type': None}, 'place_to'),
+    ],
+    'fields': [({}, 'place_to')],
+    'other': [({}, 'place_to')],
+}
+
+
+def _sort_key(key):
+    return tuple('' if value is None else str(value) for value in key)
+
+
+class RollupService:
+    """Інкрементальне ведення і перебудова денних підсумків журналів."""
+
+    @staticmethod
+    def entry_for(document):
+        """`RollupEntry` документа за поточними значеннями полів або None."""
+        for when, place_field in ROLLUP_PLACES[document.rollup_kind]:
+            if all(getattr(document, field) == value for field, value in when.items()):
+                return RollupEntry(
+                    day=timezone.localdate(document.date_time),
+                    kind=document.rollup_kind,
+                    action=getattr(document, 'action_type', '') or '',
+                    culture_id=document.culture_id,
+                    place_id=getattr(document, f'{place_field}_id'),
+                    weight=document.weight_net or Decimal('0'),
+                )
+        return None
+
+    @staticmethod
+    def repost(old, new):
+        """Переносить документ зі старого рядка підсумків у новий."""
+        RollupService.apply([(old, -1), (new, 1)])
+
+    @staticmethod
+    def apply(changes):
+        """Застосовує пачку змін: ітерабельне з (RollupEntry або None, знак +1 / -1).
+
+        Зміни групуються по ключу — на ключ один UPDATE (або INSERT для нового рядка).
+        """
+        from .models import DailyMovementRollup
+
+        grouped = {}
+        for entry, sign in changes:
+            if entry is None:
+                continue
+            key = entry[:5]
+            count, weight = grouped.get(key, (0, Decimal('0')))
+            grouped[key] = (count + sign, weight + sign * entry.weight)
+
+        for key in sorted(grouped, key=_sort_key):
+            count, weight = grouped[key]
+            if not count and not weight:
+                continue
+            day, kind, action, culture_id, place_id = key
+            lookup = dict(day=day, kind=kind, action=action, culture_id=culture_id, place_id=place_id)
+            # NULL у ключі не захищений unique_together — оновлюємо один рядок за pk
+            pk = DailyMovementRollup.objects.filter(**lookup).values_list('pk', flat=True).first()
+            if pk is None:
+                try:
+                    with transaction.atomic():
+                        DailyMovementRollup.objects.create(**lookup, count=count, weight=weight)
+                    continue
+                except IntegrityError:
+                    pk = DailyMovementRollup.objects.filter(**lookup).values_list('pk', flat=True).first()
+            DailyMovementRollup.objects.filter(pk=pk).update(count=F('count') + count, weight=F('weight') + weight)
+
+    @staticmethod
+    def rebuild(journal_models=None, rollup_model=None, batch_size=2000):
+        """Перебудовує підсумки з журналів: один GROUP BY на (журнал, правило місця).
+
+        Моделі можна передати явно (історичні моделі в міграції). Повертає кількість рядків.
+        """
+        if rollup_model is None:
+            from .models import DailyMovementRollup as rollup_model
+        if journal_models is None:
+            from .models import FieldsIncome, OtherIncome, ShipmentJournal, WeigherJournal
+            journal_models = {
+                model.rollup_kind: model for model in (WeigherJournal, ShipmentJournal, FieldsIncome, OtherIncome)
+            }
+
+        rows = []
+        for kind, model in journal_models.items():
+            has_action = any(f.name == 'action_type' for f in model._meta.get_fields())
+            for when, place_field in ROLLUP_PLACES[kind]:
+                group_by = ['_day', 'culture_id', '_place_id'] + (['action_type'] if has_action else [])
+                queryset = model._default_manager.filter(**when).annotate(
+                    _day=TruncDate('date_time'), _place_id=F(f'{place_field}_id')
+                ).values(*group_by).annotate(_count=Count('pk'), _weight=Sum('weight_net')).order_by()
+                for row in queryset:
+                    rows.append(rollup_model(
+                        day=row['_day'],
+                        kind=kind,
+                        action=row.get('action_type') or '',
+                        culture_id=row['culture_id'],
+                        place_id=row['_place_id'],
+                        count=row['_count'],
+                        weight=row['_weight'] or Decimal('0'),
+                    ))
+
+        with transaction.atomic():
+            rollup_model._default_manager.all().delete()
+            rollup_model._default_manager.bulk_create(rows, batch_size=batch_size)
+        return len(rows)
@@ -1,3 +1,313 @@
+import io
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from balances.audit import BalanceAuditService
+from balances.models import AuditOpening, Balance, BalanceDrift, BalanceMovement, BalanceType
+from directory.models import Car, Culture, Driver, Place
+
+from .batch import JournalBatchService
+from .importer import JournalImporter
+from .models import DailyMovementRollup, JournalKind, ShipmentAction, ShipmentJournal, WeigherJournal
+
+
+class JournalTestMixin:
+    """Місця, культура і швидке створення журналів для тестів."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.field_store = Place.objects.create(name='Тік')
+        cls.storage = Place.objects.create(name='Склад')
+        cls.wheat = Culture.objects.create(name='Пшениця')
+        cls.corn = Culture.objects.create(name='Кукурудза')
+        cls.driver = Driver.objects.create(full_name='Водій')
+        cls.car = Car.objects.create(number='AA0000AA')
+
+    def weigher(self, gross='10', tare='2', **kwargs):
+        kwargs = {
+            'document_number': 'В-1', 'culture': self.wheat,
+            'from_place': self.field_store, 'to_place': self.storage, **kwargs,
+        }
+        document = WeigherJournal(weight_gross=Decimal(gross), weight_tare=Decimal(tare), **kwargs)
+        document.save()
+        return document
+
+    def shipment(self, action, gross='10', tare='2', **kwargs):
+        kwargs = {
+            'document_number': 'Н-1', 'culture': self.wheat, 'action_type': action,
+            'driver': self.driver, 'car': self.car,
+            'place_from': self.storage, 'place_to': self.storage, **kwargs,
+        }
+        document = ShipmentJournal(weight_gross=Decimal(gross), weight_tare=Decimal(tare), **kwargs)
+        document.save()
+        return document
+
+    def quantity(self, place, culture=None):
+        balance = Balance.objects.filter(
+            place=place, culture=culture or self.wheat, balance_type=BalanceType.STOCK,
+        ).first()
+        return balance.quantity if balance else Decimal('0')
+
+    def stock(self, place, quantity, culture=None):
+        Balance.objects.update_or_create(
+            place=place, culture=culture or self.wheat, balance_type=BalanceType.STOCK,
+            defaults={'quantity': Decimal(quantity)},
+        )
+
+
+class NetDeltaPostingTests(JournalTestMixin, TestCase):
+    """Збереження журналу проводить лише чисту різницю старих і нових проведень."""
+
+    def setUp(self):
+        self.stock(self.field_store, '100')
+
+    def test_create_posts_departed_and_net_weight(self):
+        self.weigher(gross='10', tare='2', weight_loss=Decimal('1'))
+        self.assertEqual(self.quantity(self.field_store), Decimal('92'))
+        self.assertEqual(self.quantity(self.storage), Decimal('7'))
+
+    def test_save_without_weight_changes_posts_nothing(self):
+        document = WeigherJournal.objects.get(pk=self.weigher().pk)
+        movements = BalanceMovement.objects.count()
+        document.note = 'лише примітка'
+        document.save()
+        self.assertEqual(BalanceMovement.objects.count(), movements)
+
+    def test_edit_posts_only_the_difference(self):
+        document = WeigherJournal.objects.get(pk=self.weigher(gross='10', tare='2').pk)
+        document.weight_gross = Decimal('12')
+        document.save()
+        self.assertEqual(self.quantity(self.field_store), Decimal('90'))
+        self.assertEqual(self.quantity(self.storage), Decimal('10'))
+        latest = BalanceMovement.objects.filter(place=self.storage).order_by('-id').first()
+        self.assertEqual(latest.delta, Decimal('2'))
+
+    def test_culture_change_moves_postings_between_keys(self):
+        self.stock(self.field_store, '50', culture=self.corn)
+        document = WeigherJournal.objects.get(pk=self.weigher().pk)
+        document.culture = self.corn
+        document.save()
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+        self.assertEqual(self.quantity(self.storage, culture=self.corn), Decimal('8'))
+        self.assertEqual(self.quantity(self.field_store), Decimal('100'))
+
+    def test_second_save_of_the_same_instance_uses_saved_values(self):
+        document = self.weigher(gross='10', tare='2')
+        document.weight_gross = Decimal('11')
+        document.save()
+        document.weight_gross = Decimal('12')
+        document.save()
+        self.assertEqual(self.quantity(self.storage), Decimal('10'))
+
+    def test_edit_of_deferred_instance_reads_old_values_before_write(self):
+        document = WeigherJournal.objects.only('id', 'weight_gross').get(pk=self.weigher().pk)
+        document.weight_tare = Decimal('1')
+        document.save()
+        self.assertEqual(self.quantity(self.storage), Decimal('9'))
+        self.assertEqual(self.quantity(self.field_store), Decimal('91'))
+
+    def test_delete_reverts_postings(self):
+        WeigherJournal.objects.get(pk=self.weigher().pk).delete()
+        self.assertEqual(self.quantity(self.field_store), Decimal('100'))
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+
+    def test_loading_documents_runs_no_extra_queries(self):
+        for _ in range(3):
+            self.weigher()
+        with CaptureQueriesContext(connection) as queries:
+            documents = list(WeigherJournal.objects.only('id', 'date_time'))
+        self.assertEqual(len(documents), 3)
+        self.assertEqual(len(queries), 1)
+
+    def test_export_over_stock_clamps_to_zero(self):
+        # Правило вивезення з clamp=True: нестача обнуляє залишок замість помилки
+        self.stock(self.storage, '3')
+        self.shipment(ShipmentAction.EXPORT, place_from=self.storage)
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+
+    def test_withdrawal_over_stock_raises(self):
+        with self.assertRaises(ValueError):
+            self.weigher(gross='10', tare='2', from_place=self.storage, to_place=self.field_store)
+        self.assertFalse(WeigherJournal.objects.exists())
+
+    def test_import_then_export_edit_nets_across_rules(self):
+        document = ShipmentJournal.objects.get(pk=self.shipment(ShipmentAction.IMPORT).pk)
+        self.assertEqual(self.quantity(self.storage), Decimal('8'))
+        document.action_type = ShipmentAction.EXPORT
+        # Відкат ввезення (-8) і вивезення (-8) зі складу, де всього 8 т: обнулення замість помилки
+        document.save()
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+
+
+class JournalImporterTests(JournalTestMixin, TestCase):
+    """Імпорт журналів з CSV / XLSX: документи, проведення і номери рядків у помилках."""
+
+    HEADER = 'document_number;date_time;culture;from_place;to_place;weight_gross;weight_tare\n'
+
+    def csv(self, *lines, encoding='utf-8'):
+        return io.BytesIO((self.HEADER + ''.join(f'{line}\n' for line in lines)).encode(encoding))
+
+    def run_import(self, file, filename='journal.csv', dry_run=False):
+        importer = JournalImporter('weigher')
+        return importer.run(importer.read_rows(file, filename), dry_run=dry_run)
+
+    def setUp(self):
+        self.stock(self.field_store, '100')
+
+    def test_imports_documents_and_posts_balances(self):
+        result = self.run_import(self.csv(
+            'В-1;01.09.2026 08:00;Пшениця;Тік;Склад;10;2',
+            'В-2;01.09.2026 09:00;пшениця;тік;склад;5,5;0,5',
+        ))
+        self.assertTrue(result.ok, result.errors)
+        self.assertEqual(result.created, 2)
+        self.assertEqual(WeigherJournal.objects.count(), 2)
+        self.assertEqual(self.quantity(self.storage), Decimal('13'))
+        self.assertEqual(self.quantity(self.field_store), Decimal('87'))
+        rollup = DailyMovementRollup.objects.get(kind=JournalKind.WEIGHER)
+        self.assertEqual((rollup.count, rollup.weight), (2, Decimal('13')))
+
+    def test_dry_run_creates_nothing(self):
+        result = self.run_import(self.csv('В-1;01.09.2026;Пшениця;Тік;Склад;10;2'), dry_run=True)
+        self.assertTrue(result.ok)
+        self.assertEqual(result.created, 1)
+        self.assertFalse(WeigherJournal.objects.exists())
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+
+    def test_invalid_rows_are_reported_with_file_row_numbers(self):
+        result = self.run_import(self.csv(
+            'В-1;01.09.2026;Пшениця;Тік;Склад;10;2',
+            'В-2;01.09.2026;Жито;Тік;Склад;10;2',
+            'В-3;01.09.2026;Пшениця;Тік;Склад;2;10',
+        ))
+        self.assertEqual([error.row for error in result.errors], [3, 4])
+        self.assertIn('Культура', result.errors[0].message)
+        self.assertIn('тари', result.errors[1].message)
+        self.assertFalse(WeigherJournal.objects.exists())
+
+    def test_shortage_is_reported_on_the_row_that_overdraws(self):
+        result = self.run_import(self.csv(
+            'В-1;01.09.2026;Пшениця;Тік;Склад;60;0',
+            'В-2;01.09.2026;Пшениця;Тік;Склад;30;0',
+            'В-3;01.09.2026;Пшениця;Тік;Склад;20;0',
+        ))
+        self.assertEqual(len(result.errors), 1)
+        self.assertEqual(result.errors[0].row, 4)
+        self.assertIn('бракує 10', result.errors[0].message)
+        self.assertEqual(self.quantity(self.field_store), Decimal('100'))
+
+    def test_windows_1251_file_is_decoded(self):
+        result = self.run_import(self.csv('В-1;01.09.2026;Пшениця;Тік;Склад;10;2', encoding='cp1251'))
+        self.assertTrue(result.ok, result.errors)
+        self.assertEqual(WeigherJournal.objects.get().document_number, 'В-1')
+
+    def test_undecodable_line_is_reported_with_its_row(self):
+        lines = ''.join(f'В-{n};01.09.2026;Пшениця;Тік;Склад;0,01;0\n' for n in range(3000))
+        data = (self.HEADER + lines).encode('utf-8') + 'В-х;01.09.2026;Пшениця;Тік;Склад;1;0\n'.encode('cp1251')
+        result = self.run_import(io.BytesIO(data))
+        self.assertEqual([error.row for error in result.errors], [3002])
+        self.assertFalse(WeigherJournal.objects.exists())
+
+    def test_broken_xlsx_is_a_file_level_error(self):
+        result = self.run_import(io.BytesIO(b'not a workbook'), filename='journal.xlsx')
+        self.assertEqual(len(result.errors), 1)
+        self.assertIsNone(result.errors[0].row)
+        self.assertIn('Excel', result.errors[0].message)
+
+
+class JournalBatchTests(JournalTestMixin, TestCase):
+    """Пакетні зміни журналів дають ті самі залишки і підсумки, що й поодинокі save()/delete()."""
+
+    def setUp(self):
+        self.stock(self.field_store, '100')
+        self.stock(self.field_store, '100', culture=self.corn)
+        self.dryer = Place.objects.create(name='Сушка', place_type='dryer')
+        self.documents = [self.weigher(gross='10', tare='2'), self.weigher(gross='6', tare='1')]
+        self.ids = [document.pk for document in self.documents]
+
+    def rollup(self, **lookups):
+        return {
+            (row.culture_id, row.place_id): (row.count, row.weight)
+            for row in DailyMovementRollup.objects.filter(kind=JournalKind.WEIGHER, count__gt=0, **lookups)
+        }
+
+    def test_delete_reverts_postings_and_rollup(self):
+        self.assertEqual(JournalBatchService.delete(WeigherJournal, self.ids), 2)
+        self.assertFalse(WeigherJournal.objects.exists())
+        self.assertEqual(self.quantity(self.field_store), Decimal('100'))
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+        self.assertEqual(self.rollup(), {})
+
+    def test_delete_clamps_when_stock_was_moved_on(self):
+        self.stock(self.storage, '5')
+        JournalBatchService.delete(WeigherJournal, self.ids)
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+
+    def test_culture_change_moves_postings_and_rollup(self):
+        self.assertEqual(JournalBatchService.update(WeigherJournal, self.ids, culture_id=self.corn.pk), 2)
+        self.assertEqual(set(WeigherJournal.objects.values_list('culture_id', flat=True)), {self.corn.pk})
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+        self.assertEqual(self.quantity(self.storage, culture=self.corn), Decimal('13'))
+        self.assertEqual(self.quantity(self.field_store), Decimal('100'))
+        self.assertEqual(self.quantity(self.field_store, culture=self.corn), Decimal('87'))
+        self.assertEqual(self.rollup(), {(self.corn.pk, self.storage.pk): (2, Decimal('13'))})
+
+    def test_destination_change_matches_single_saves(self):
+        JournalBatchService.update(WeigherJournal, self.ids, place_to_id=self.dryer.pk)
+        self.assertEqual(self.quantity(self.storage), Decimal('0'))
+        self.assertEqual(self.quantity(self.dryer), Decimal('13'))
+        self.assertEqual(self.rollup(), {(self.wheat.pk, self.dryer.pk): (2, Decimal('13'))})
+
+    def test_destination_equal_to_source_is_rejected(self):
+        with self.assertRaises(ValueError):
+            JournalBatchService.update(WeigherJournal, self.ids, place_to_id=self.field_store.pk)
+        self.assertEqual(self.quantity(self.storage), Decimal('13'))
+        self.assertEqual(set(WeigherJournal.objects.values_list('to_place_id', flat=True)), {self.storage.pk})
+
+
+class BalanceAuditTests(JournalTestMixin, TestCase):
+    """Аудит журналів проти руху залишків, зокрема документів, старших за перший запуск."""
+
+    def setUp(self):
+        self.stock(self.field_store, '100')
+
+    def corrupt(self, document, delta='1'):
+        BalanceMovement.objects.create(
+            place=self.storage, culture=self.wheat, balance_type=BalanceType.STOCK, delta=Decimal(delta),
+            source_type=WeigherJournal._meta.label_lower, source_id=document.pk,
+        )
+
+    def test_new_document_drift_is_detected(self):
+        BalanceAuditService.run()
+        document = self.weigher()
+        self.corrupt(document)
+        self.assertEqual(BalanceAuditService.run(), (1, 1))
+
+    def test_old_document_posted_before_movements_is_audited_after_edit(self):
+        document = self.weigher()
+        # Документ проведено ще до журналу рухів
+        BalanceMovement.objects.filter(source_id=document.pk).delete()
+        BalanceAuditService.run()
+        self.assertTrue(AuditOpening.objects.filter(source_id=document.pk).exists())
+
+        document = WeigherJournal.objects.get(pk=document.pk)
+        document.weight_tare = Decimal('3')
+        document.save()
+        self.assertEqual(BalanceAuditService.run(), (1, 0))
+
+        self.corrupt(document)
+        checked, drifts = BalanceAuditService.run()
+        self.assertEqual((checked, drifts), (1, 1))
+        drift = BalanceDrift.objects.get(source_id=document.pk)
+        self.assertEqual(drift.difference, Decimal('1'))
 
-# Create your tests here.
+    def test_deleted_old_document_leaves_no_drift(self):
+        document = self.weigher()
+        BalanceMovement.objects.filter(source_id=document.pk).delete()
+        BalanceAuditService.run()
+        WeigherJournal.objects.get(pk=document.pk).delete()
+        self.assertEqual(BalanceAuditService.run(), (1, 0))
+        self.assertFalse(BalanceDrift.objects.exists())
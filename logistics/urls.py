@@ -25,4 +25,10 @@ urlpatterns = [
     path('other_income/create/', views.OtherIncomeCreateView.as_view(), name='other_income_create'),
     path('other_income/<int:pk>/edit/', views.OtherIncomeUpdateView.as_view(), name='other_income_update'),
     path('other_income/<int:pk>/delete/', views.OtherIncomeDeleteView.as_view(), name='other_income_delete'),
+
+    # Batch actions
+    path('batch/<str:model_name>/', views.JournalBatchView.as_view(), name='journal_batch'),
+
+    # Import
+    path('import/', views.JournalImportView.as_view(), name='journal_import'),
 ]
@@ -1,7 +1,16 @@
-from django.urls import reverse_lazy
-from django.views.generic import CreateView, UpdateView, ListView, DeleteView
+from django.contrib import messages
+from django.http import Http404
+from django.shortcuts import redirect
+from django.urls import reverse, reverse_lazy
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views import View
+from django.views.generic import CreateView, UpdateView, ListView, DeleteView, FormView
 from .models import WeigherJournal, ShipmentJournal, FieldsIncome, OtherIncome
-from .forms import WeigherJournalForm, ShipmentJournalForm, FieldsIncomeForm, OtherIncomeForm
+from .forms import (
+    WeigherJournalForm, ShipmentJournalForm, FieldsIncomeForm, OtherIncomeForm, JournalImportForm, JournalBatchForm,
+)
+from .batch import JournalBatchService
+from .importer import JournalImporter
 
 
 # --- Базовий клас для всіх журналів ---
@@ -70,6 +79,11 @@ class BaseJournalListView(BaseJournalViewMixin, ListView):
             qs = qs.order_by("-id")
         return qs
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["batch_form"] = JournalBatchForm(model=self.model)
+        return context
+
 
 # --- Базові Create / Update для журналів ---
 class BaseJournalCreateView(BaseJournalViewMixin, CreateView):
@@ -232,3 +246,73 @@ class OtherIncomeDeleteView(DeleteView):
         context["cancel_url"] = reverse_lazy("otherincome_list")
         return context
     
+
+
+# --- Пакетний імпорт з CSV / XLSX ---
+class JournalImportView(FormView):
+    form_class = JournalImportForm
+    template_name = "logistics/import.html"
+
+    def get_initial(self):
+        initial = super().get_initial()
+        if self.request.GET.get("journal") in JournalImporter.JOURNALS:
+            initial["journal"] = self.request.GET["journal"]
+        return initial
+
+    def form_valid(self, form):
+        importer = JournalImporter(form.cleaned_data["journal"])
+        upload = form.cleaned_data["file"]
+        dry_run = form.cleaned_data["dry_run"]
+        result = importer.run(importer.read_rows(upload.file, upload.name), dry_run=dry_run)
+
+        if not result.ok:
+            messages.error(self.request, f"Імпорт скасовано: помилок {len(result.errors)}. Нічого не записано.")
+        elif dry_run:
+            messages.success(self.request, f"Файл коректний: {result.created} документів готові до імпорту.")
+        else:
+            messages.success(self.request, f"Імпортовано документів: {result.created}.")
+
+        return self.render_to_response(self.get_context_data(form=form, result=result, model=importer.model))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["page"] = "journal_import"
+        return context
+
+
+# --- Пакетні дії над вибраними записами ---
+class JournalBatchView(View):
+    """Видалення / зміна культури / зміна місця "до" для вибраних записів журналу."""
+
+    def post(self, request, model_name):
+        model = JournalBatchService.MODELS.get(model_name)
+        if model is None:
+            raise Http404
+        # Повертаємось на ту саму сторінку списку (з сортуванням і пагінацією)
+        next_url = request.POST.get("next")
+        if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+            next_url = reverse(f"{model_name}_list")
+
+        form = JournalBatchForm(request.POST, model=model)
+        if not form.is_valid():
+            for errors in form.errors.values():
+                for error in errors:
+                    messages.error(request, error)
+            return redirect(next_url)
+
+        ids = [journal.pk for journal in form.cleaned_data["ids"]]
+        action = form.cleaned_data["action"]
+        try:
+            if action == "delete":
+                count = JournalBatchService.delete(model, ids)
+                messages.success(request, f"Видалено записів: {count}.")
+            elif action == "culture":
+                count = JournalBatchService.update(model, ids, culture_id=form.cleaned_data["culture"].pk)
+                messages.success(request, f"Культуру змінено для записів: {count}.")
+            else:
+                count = JournalBatchService.update(model, ids, place_to_id=form.cleaned_data["place_to"].pk)
+                messages.success(request, f"Місце змінено для записів: {count}.")
+        except ValueError as e:
+            messages.error(request, f"Зміни не збережено: {e}")
+
+        return redirect(next_url)
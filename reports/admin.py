@@ -13,11 +13,11 @@ class ReportTemplateAdmin(admin.ModelAdmin):
 
 @admin.register(ReportExecution)
 class ReportExecutionAdmin(admin.ModelAdmin):
-    list_display = ('template', 'executed_by', 'executed_at', 'date_from', 'date_to', 'row_count')
-    list_filter = ('executed_at', 'template')
+    list_display = ('template', 'report_type', 'executed_by', 'executed_at', 'status', 'progress', 'date_from', 'date_to', 'row_count')
+    list_filter = ('status', 'executed_at', 'template')
     search_fields = ('template__name', 'executed_by__username')
     ordering = ('-executed_at',)
-    readonly_fields = ('executed_at',)
+    readonly_fields = ('executed_at', 'started_at', 'finished_at')
 
 
 @admin.register(SavedReport)
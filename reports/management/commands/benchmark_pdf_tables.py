@@ -0,0 +1,91 @@
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from reportlab.lib.units import cm
+
+from reports.services.pdf_generator import PDFReportGenerator, warm_up
+from reports.services.pdf_parallel import parallel_workers
+
+
+HEADERS = ['№', 'Дата', 'Документ', 'Звідки', 'Куди', 'Культура', 'Вага (т)', 'Водій', 'Авто']
+COL_WIDTHS = [1.2*cm, 2.2*cm, 2.5*cm, 3.5*cm, 3.5*cm, 3*cm, 2.5*cm, 4*cm, 2.5*cm]
+
+
+class Command(BaseCommand):
+    help = (
+        'Порівняти швидкість побудови великої PDF-таблиці (як журнал вагової) у швидкому '
+        'режимі, у швидкому режимі частинами в пулі процесів і зі звичайними Paragraph-клітинками: '
+        'рядків за секунду, сторінок, розмір файлу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Рядків для швидкого режиму')
+        parser.add_argument(
+            '--compare-rows', type=int, default=2000,
+            help='Рядків для звичайного режиму (він повільний; 0 — не запускати)',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'REPORT_PDF_PARALLEL_WORKERS', 0),
+            help='Процесів для паралельного формування (не більше ядер процесора; 0 — не запускати)',
+        )
+        parser.add_argument('--orientation', default='landscape', choices=['portrait', 'landscape'])
+
+    @staticmethod
+    def _rows(count):
+        """Синтетичні рядки журналу вагової з повторюваними довідниковими значеннями."""
+        rng = random.Random(1)
+        places = ['Склад №%d' % i for i in range(1, 8)] + ['Елеватор "Північний" (силос 12, секція Б)']
+        cultures = ['Пшениця', 'Кукурудза', 'Соняшник', 'Ячмінь', 'Ріпак']
+        drivers = ['Іваненко І.І.', 'Петренко П.П.', 'Коваленко О.В.', 'Шевченко Т.Г.']
+        start = date(2026, 1, 1)
+        return [
+            [
+                i,
+                (start + timedelta(days=i % 365)).strftime('%d.%m.%Y'),
+                f'ВЗ-{i:06d}',
+                rng.choice(places),
+                rng.choice(places),
+                rng.choice(cultures),
+                round(rng.uniform(5, 40), 3),
+                rng.choice(drivers),
+                f'АА{i % 9000:04d}ВВ',
+            ]
+            for i in range(1, count + 1)
+        ]
+
+    def _run(self, rows, fast, orientation, workers=0):
+        # Паралельне формування — для будь-якої кількості рядків, але лише в запуску з workers
+        with override_settings(REPORT_PDF_PARALLEL_WORKERS=workers, REPORT_PDF_PARALLEL_ROWS=1):
+            generator = PDFReportGenerator('Журнал вагової', orientation=orientation)
+            generator.add_header(subtitle='Тест швидкості таблиць')
+            started = time.perf_counter()
+            generator.add_table(HEADERS, rows, col_widths=COL_WIDTHS, fast=fast)
+            size = len(generator.build().getvalue())
+            elapsed = time.perf_counter() - started
+        return elapsed, generator.page_count, size
+
+    def handle(self, *args, **options):
+        warm_up()
+        runs = [('швидкий', True, options['rows'], 0)]
+        with override_settings(REPORT_PDF_PARALLEL_WORKERS=options['workers']):
+            workers = parallel_workers()
+        if workers > 1:
+            # Перший запуск стартує пул процесів — він не враховується
+            self._run(self._rows(1000), True, options['orientation'], workers)
+            runs.append((f'{workers} проц.', True, options['rows'], workers))
+        elif options['workers'] > 1:
+            self.stdout.write(f'Паралельний режим пропущено: ядер процесора — {os.cpu_count() or 1}')
+        if options['compare_rows']:
+            runs.append(('Paragraph', False, options['compare_rows'], 0))
+
+        for label, fast, count, run_workers in runs:
+            elapsed, pages, size = self._run(self._rows(count), fast, options['orientation'], run_workers)
+            self.stdout.write(
+                f'{label:<10} {count:>7} рядків  {elapsed:7.2f} с  {count / elapsed:8.0f} рядків/с  '
+                f'{pages:>5} стор.  {size / 1024:8.0f} КБ'
+            )
@@ -0,0 +1,119 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Виконується в окремому інтерпретаторі: поточний процес уже все імпортував
+PROBE = r'''
+import json, sys, time
+from importlib import import_module
+
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+
+from django.apps import apps
+from django.conf import settings
+from django.urls import get_resolver
+
+
+def walk(patterns):
+    # include(...) завантажує модулі URL-ів (і view) лише при першому зверненні
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            walk(pattern.url_patterns)
+
+
+walk(get_resolver().url_patterns)
+# ROOT_URLCONF може підключати не всі застосунки — їхні urls імпортуються явно
+for config in apps.get_app_configs():
+    if not config.path.startswith(str(settings.BASE_DIR)):
+        continue
+    try:
+        module = import_module(config.name + '.urls')
+    except ModuleNotFoundError as e:
+        if e.name != config.name + '.urls':
+            raise
+        continue
+    walk(getattr(module, 'urlpatterns', []))
+urls_done = time.perf_counter()
+
+print(json.dumps({
+    'setup': (setup_done - started) * 1000,
+    'urls': (urls_done - setup_done) * 1000,
+    'modules': sorted({name.split('.')[0] for name in sys.modules}),
+}))
+'''
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Виміряти час старту Django (django.setup() і завантаження URL-ів з усіма view) '
+        'в окремому процесі, показати найдорожчі імпорти і перевірити бюджет '
+        'STARTUP_TIME_BUDGET_MS та відсутність важких бібліотек STARTUP_LAZY_MODULES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Скільки запусків (береться найкращий)')
+        parser.add_argument('--top', type=int, default=15, help='Скільки найдорожчих пакетів показати')
+
+    def _probe(self):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'kolos.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'Процес перевірки завершився з помилкою:\n{result.stderr[-2000:]}')
+
+        # Власний час імпорту, зведений по пакетах верхнього рівня
+        packages = defaultdict(int)
+        for line in result.stderr.splitlines():
+            match = IMPORT_LINE.match(line)
+            if match:
+                packages[match.group(4).split('.')[0]] += int(match.group(1))
+        return json.loads(result.stdout.strip().splitlines()[-1]), packages
+
+    def handle(self, *args, **options):
+        runs = [self._probe() for _ in range(max(1, options['repeat']))]
+        timings = {
+            stage: min(run[stage] for run, _ in runs)
+            for stage in ('setup', 'urls')
+        }
+        timings['total'] = timings['setup'] + timings['urls']
+        best, packages = min(runs, key=lambda run: run[0]['setup'] + run[0]['urls'])
+
+        self.stdout.write('Найдорожчі імпорти (власний час, мс):')
+        for name, micros in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f'  {name:<24} {micros / 1000:8.1f}')
+
+        failed = []
+        budget = getattr(settings, 'STARTUP_TIME_BUDGET_MS', {})
+        for stage, label in (('setup', 'django.setup()'), ('urls', 'URL-и і view'), ('total', 'разом')):
+            limit = budget.get(stage)
+            line = f'{label:<16} {timings[stage]:8.1f} мс'
+            if limit is None:
+                self.stdout.write(line)
+            elif timings[stage] > limit:
+                failed.append(f'{label}: {timings[stage]:.0f} мс > {limit} мс')
+                self.stdout.write(self.style.ERROR(f'{line}  (бюджет {limit} мс)'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{line}  (бюджет {limit} мс)'))
+
+        loaded = sorted(set(getattr(settings, 'STARTUP_LAZY_MODULES', ())) & set(best['modules']))
+        if loaded:
+            failed.append(f'імпортовано під час старту: {", ".join(loaded)}')
+            self.stdout.write(self.style.ERROR(f'Важкі бібліотеки під час старту: {", ".join(loaded)}'))
+
+        if failed:
+            raise CommandError('Бюджет старту перевищено: ' + '; '.join(failed))
+        self.stdout.write(self.style.SUCCESS('Старт Django вкладається в бюджет.'))
@@ -0,0 +1,126 @@
+import multiprocessing
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+# Процес пулу (spawn) імпортує цей модуль ще до django.setup(), тому моделі
+# і сервіси імпортуються всередині функцій, а не на рівні модуля
+
+
+def _init_worker():
+    # Процес пулу запускається "з нуля" (spawn) — Django треба налаштувати в ньому
+    import django
+    django.setup()
+
+    # Шрифти і стилі PDF будуються зараз, а не під час першого звіту
+    from reports.services.pdf_generator import warm_up
+    warm_up()
+    connections.close_all()
+
+
+def _timeout_handler(signum, frame):
+    from reports.services.jobs import JobError
+    raise JobError('Перевищено час формування звіту')
+
+
+def _run_job(execution_id, timeout):
+    """Формує один звіт у процесі пулу; повертає (id, підсумковий статус)."""
+    from reports.services.jobs import ReportJobService
+
+    # SIGALRM є не на всіх платформах (Windows) — там завислий звіт зніме fail_stale
+    if hasattr(signal, 'SIGALRM'):
+        signal.signal(signal.SIGALRM, _timeout_handler)
+        signal.alarm(timeout)
+    try:
+        close_old_connections()
+        return execution_id, ReportJobService.run(execution_id)
+    finally:
+        if hasattr(signal, 'SIGALRM'):
+            signal.alarm(0)
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер фонового формування PDF-звітів: забирає завдання з черги ReportExecution '
+        'і формує їх у пулі процесів.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'REPORT_JOB_WORKERS', 2),
+            help='Скільки звітів формувати паралельно',
+        )
+        parser.add_argument('--poll', type=float, default=1.0, help='Інтервал опитування черги, секунд')
+        parser.add_argument('--timeout', type=int, default=None, help='Максимальний час формування звіту, секунд')
+        parser.add_argument('--once', action='store_true', help='Сформувати все, що є в черзі, і завершитись')
+
+    @staticmethod
+    def _executor(workers):
+        # spawn однаково поводиться на Linux і Windows і не успадковує з'єднань з БД
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+
+    def handle(self, *args, **options):
+        from reports.models import ReportExecution, ReportExecutionStatus
+        from reports.services.jobs import ReportJobService
+
+        workers = max(1, options['workers'])
+        timeout = options['timeout'] or ReportJobService.timeout()
+        poll = options['poll']
+
+        self.stdout.write(f'Воркер звітів: {workers} процес(и), таймаут {timeout} с')
+
+        executor = self._executor(workers)
+        running = {}
+        try:
+            while True:
+                stale = ReportJobService.fail_stale(timeout)
+                if stale:
+                    self.stderr.write(f'Знято за таймаутом: {stale}')
+
+                for future in [future for future in running if future.done()]:
+                    execution_id = running.pop(future)
+                    try:
+                        _, status = future.result()
+                    except Exception as e:
+                        # Процес пулу впав — завдання лишилось "Формується", його зніме fail_stale
+                        self.stderr.write(f'Звіт #{execution_id}: {e}')
+                    else:
+                        self.stdout.write(f'Звіт #{execution_id}: {status}')
+
+                free = workers - len(running)
+                queued = []
+                if free > 0:
+                    queued = list(
+                        ReportExecution.objects.filter(status=ReportExecutionStatus.QUEUED)
+                        .exclude(pk__in=running.values())
+                        .order_by('executed_at', 'pk')
+                        .values_list('pk', flat=True)[:free]
+                    )
+                    try:
+                        for execution_id in queued:
+                            running[executor.submit(_run_job, execution_id, timeout)] = execution_id
+                    except BrokenProcessPool:
+                        # Непередані завдання лишились у черзі — їх забере новий пул
+                        self.stderr.write('Пул процесів зупинився, перезапуск')
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = self._executor(workers)
+                        running = {}
+
+                if options['once'] and not running and not queued:
+                    break
+                close_old_connections()
+                time.sleep(poll)
+        except KeyboardInterrupt:
+            self.stdout.write('Зупинка воркера...')
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
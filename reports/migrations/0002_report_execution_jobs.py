@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportexecution',
+            name='error',
+            field=models.TextField(blank=True, verbose_name='Помилка'),
+        ),
+        migrations.AddField(
+            model_name='reportexecution',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Завершено'),
+        ),
+        migrations.AddField(
+            model_name='reportexecution',
+            name='message',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Повідомлення'),
+        ),
+        migrations.AddField(
+            model_name='reportexecution',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Прогрес, %'),
+        ),
+        migrations.AddField(
+            model_name='reportexecution',
+            name='send_to_report_server',
+            field=models.BooleanField(default=False, verbose_name='Відправити на Report Server'),
+        ),
+        migrations.AddField(
+            model_name='reportexecution',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Початок формування'),
+        ),
+        migrations.AddField(
+            model_name='reportexecution',
+            name='status',
+            field=models.CharField(choices=[('queued', 'В черзі'), ('running', 'Формується'), ('done', 'Готовий'), ('failed', 'Помилка'), ('cancelled', 'Скасовано')], default='done', max_length=10, verbose_name='Статус'),
+        ),
+        migrations.AddIndex(
+            model_name='reportexecution',
+            index=models.Index(fields=['status', 'executed_at'], name='report_exec_status_idx'),
+        ),
+    ]
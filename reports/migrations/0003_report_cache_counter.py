@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_report_execution_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCacheCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(max_length=50, verbose_name='Тип звіту')),
+                ('counter', models.CharField(max_length=20, verbose_name='Лічильник')),
+                ('value', models.PositiveBigIntegerField(default=0, verbose_name='Значення')),
+            ],
+            options={
+                'verbose_name': 'Лічильник кешу звітів',
+                'verbose_name_plural': 'Лічильники кешу звітів',
+                'constraints': [models.UniqueConstraint(fields=('report_type', 'counter'), name='report_cache_counter_uniq')],
+            },
+        ),
+    ]
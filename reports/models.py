@@ -83,9 +83,20 @@ class ReportTemplate(models.Model):
         return self.name
 
 
+class ReportExecutionStatus(models.TextChoices):
+    QUEUED = "queued", "В черзі"
+    RUNNING = "running", "Формується"
+    DONE = "done", "Готовий"
+    FAILED = "failed", "Помилка"
+    CANCELLED = "cancelled", "Скасовано"
+
+
 class ReportExecution(models.Model):
-    """Історія виконання звітів"""
+    """Історія виконання звітів (і черга фонового формування PDF)"""
     
+    # Статуси, з яких завдання ще може завершитись
+    ACTIVE_STATUSES = (ReportExecutionStatus.QUEUED, ReportExecutionStatus.RUNNING)
+
     template = models.ForeignKey(
         ReportTemplate,
         on_delete=models.CASCADE,
@@ -123,16 +134,44 @@ class ReportExecution(models.Model):
         default='pdf',
         verbose_name="Формат файлу"
     )
+
+    # Фонове формування
+    status = models.CharField(
+        max_length=10,
+        choices=ReportExecutionStatus.choices,
+        default=ReportExecutionStatus.DONE,
+        verbose_name="Статус"
+    )
+    progress = models.PositiveSmallIntegerField(default=0, verbose_name="Прогрес, %")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Початок формування")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершено")
+    error = models.TextField(blank=True, verbose_name="Помилка")
+    message = models.CharField(max_length=255, blank=True, verbose_name="Повідомлення")
+    send_to_report_server = models.BooleanField(default=False, verbose_name="Відправити на Report Server")
     
     class Meta:
         verbose_name = "Виконання звіту"
         verbose_name_plural = "Історія виконань звітів"
         ordering = ['-executed_at']
+        indexes = [
+            models.Index(fields=['status', 'executed_at'], name='report_exec_status_idx'),
+        ]
     
     def __str__(self):
         template_name = self.template.name if self.template else self.report_type
         return f"{template_name} - {self.executed_at:%d.%m.%Y %H:%M}"
 
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    @property
+    def duration(self):
+        """Тривалість формування (timedelta) або None."""
+        if self.started_at and self.finished_at:
+            return self.finished_at - self.started_at
+        return None
+
 
 class SavedReport(models.Model):
     """Збережені звіти користувача"""
@@ -168,4 +207,22 @@ class SavedReport(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.user.username} - {self.name}"
\ No newline at end of file
+        return f"{self.user.username} - {self.name}"
+
+
+class ReportCacheCounter(models.Model):
+    """Лічильник кешу звітів (влучання / промахи / не закешовано) по типу звіту."""
+
+    report_type = models.CharField(max_length=50, verbose_name="Тип звіту")
+    counter = models.CharField(max_length=20, verbose_name="Лічильник")
+    value = models.PositiveBigIntegerField(default=0, verbose_name="Значення")
+
+    class Meta:
+        verbose_name = "Лічильник кешу звітів"
+        verbose_name_plural = "Лічильники кешу звітів"
+        constraints = [
+            models.UniqueConstraint(fields=['report_type', 'counter'], name='report_cache_counter_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.report_type}.{self.counter}: {self.value}"
@@ -0,0 +1,205 @@
+"""
+Кеш результатів звітів.
+
+Ключ — тип звіту, нормалізовані параметри (період і фільтри) і версії таблиць,
+з яких звіт читає (`balances.versions`). Запис у журнал, операцію з відходами
+чи залишок збільшує версію своєї таблиці, і наступне відкриття звіту рахує
+його заново; звіти по інших таблицях лишаються в кеші.
+
+Закриті періоди (date_to у минулому) тримаються довше. Результати з надто
+великою кількістю рядків не кешуються, а кількість записів обмежує сам бекенд
+кешу, див. CACHES['reports'] у налаштуваннях. Це не LRU: файловий кеш при
+переповненні видаляє випадкову частину записів. Витіснений звіт просто
+рахується заново — версії таблиць і лічильники зберігаються в БД і не
+витісняються.
+
+Лічильники накопичуються в пам'яті процесу і записуються в БД
+(`ReportCacheCounter`) не частіше ніж раз на REPORT_CACHE_STATS_FLUSH_INTERVAL
+секунд, тож читання з кешу нічого не записує.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from balances.versions import get_versions
+
+from .services import ReportService
+
+
+JOURNAL_TABLES = (
+    'logistics.weigherjournal',
+    'logistics.shipmentjournal',
+    'logistics.fieldsincome',
+    'logistics.otherincome',
+)
+# Денні підсумки журналів: агрегатні звіти і дашборд читають їх замість журналів
+ROLLUP_TABLE = 'logistics.dailymovementrollup'
+
+# Тип звіту -> таблиці, зміна яких робить закешований результат застарілим
+REPORT_TABLES = {
+    'balance': ('balances.balance',),
+    'waste': ('balances.balance',),
+    'weigher': ('logistics.weigherjournal', ROLLUP_TABLE),
+    'shipment': ('logistics.shipmentjournal', ROLLUP_TABLE),
+    'fields': ('logistics.fieldsincome', ROLLUP_TABLE),
+    'other_income': ('logistics.otherincome', ROLLUP_TABLE),
+    'daily': JOURNAL_TABLES + (ROLLUP_TABLE, 'balances.balance'),
+    'summary': JOURNAL_TABLES + (ROLLUP_TABLE, 'balances.balance'),
+}
+
+KEY_PREFIX = 'report_cache:'
+STATS_COUNTERS = ('hits', 'misses', 'skipped')
+
+# Ще не записані в БД лічильники цього процесу: {(тип звіту, лічильник): кількість}
+_pending_counts = Counter()
+_pending_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def _cache():
+    return caches[getattr(settings, 'REPORT_CACHE_ALIAS', 'default')]
+
+
+def _normalize(value):
+    if isinstance(value, (list, tuple, set)):
+        return sorted(str(item) for item in value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class ReportCache:
+    """Версіонований кеш результатів `ReportService` з лічильниками влучань."""
+
+    @staticmethod
+    def normalize_filters(filters):
+        """Фільтри без порожніх значень, з рядковими значеннями — однаковий ключ для однакового запиту."""
+        return {
+            name: _normalize(value)
+            for name, value in sorted((filters or {}).items())
+            if value not in (None, '', [], ())
+        }
+
+    @staticmethod
+    def make_key(report_type, params, versions):
+        payload = json.dumps([report_type, params, versions], sort_keys=True, default=str)
+        return KEY_PREFIX + report_type + ':' + hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _count(report_type, counter):
+        global _flushed_at
+        with _pending_lock:
+            _pending_counts[(report_type, counter)] += 1
+            due = time.monotonic() - _flushed_at >= getattr(settings, 'REPORT_CACHE_STATS_FLUSH_INTERVAL', 30)
+            if due:
+                _flushed_at = time.monotonic()
+        if due:
+            ReportCache.flush_stats()
+
+    @staticmethod
+    def flush_stats():
+        """Записує накопичені в процесі лічильники в БД (атомарне UPDATE на лічильник)."""
+        from reports.models import ReportCacheCounter
+
+        with _pending_lock:
+            counts = dict(_pending_counts)
+            _pending_counts.clear()
+        for (report_type, counter), count in counts.items():
+            lookup = ReportCacheCounter.objects.filter(report_type=report_type, counter=counter)
+            if lookup.update(value=F('value') + count):
+                continue
+            try:
+                with transaction.atomic():
+                    ReportCacheCounter.objects.create(report_type=report_type, counter=counter, value=count)
+            except IntegrityError:
+                lookup.update(value=F('value') + count)
+
+    @staticmethod
+    def _rows(result):
+        data = result.get('data') if isinstance(result, dict) else None
+        return len(data) if isinstance(data, list) else 0
+
+    @staticmethod
+    def get_or_run(report_type, params, compute, closed=False):
+        """
+        Результат `compute()` з кешу або обчислений і збережений.
+
+        `closed=True` — дані за закритий період, зберігаються на
+        REPORT_CACHE_CLOSED_TIMEOUT замість REPORT_CACHE_TIMEOUT.
+        """
+        cache = _cache()
+        key = ReportCache.make_key(report_type, params, get_versions(REPORT_TABLES[report_type]))
+        result = cache.get(key)
+        if result is not None:
+            ReportCache._count(report_type, 'hits')
+            return result
+
+        ReportCache._count(report_type, 'misses')
+        result = compute()
+        if ReportCache._rows(result) > getattr(settings, 'REPORT_CACHE_MAX_ROWS', 5000):
+            ReportCache._count(report_type, 'skipped')
+            return result
+
+        timeout = (
+            getattr(settings, 'REPORT_CACHE_CLOSED_TIMEOUT', 24 * 60 * 60) if closed
+            else getattr(settings, 'REPORT_CACHE_TIMEOUT', 5 * 60)
+        )
+        cache.set(key, result, timeout)
+        return result
+
+    @staticmethod
+    def run_report(report_type, date_from=None, date_to=None, filters=None):
+        """Кешований `ReportService.run_report`."""
+        params = {
+            'from': _normalize(date_from) if date_from else None,
+            'to': _normalize(date_to) if date_to else None,
+            'filters': ReportCache.normalize_filters(filters),
+        }
+        return ReportCache.get_or_run(
+            report_type,
+            params,
+            lambda: ReportService.run_report(report_type, date_from, date_to, filters),
+            closed=bool(date_to) and date_to < timezone.localdate(),
+        )
+
+    @staticmethod
+    def daily_summary(date=None, days=7):
+        """Кешований `ReportService.get_daily_summary`."""
+        date = date or timezone.localdate()
+        return ReportCache.get_or_run(
+            'summary',
+            {'date': date.isoformat(), 'days': days},
+            lambda: ReportService.get_daily_summary(date, days=days),
+            closed=date < timezone.localdate(),
+        )
+
+    @staticmethod
+    def stats():
+        """Лічильники влучань / промахів по типах звітів і поточні версії таблиць."""
+        from reports.models import ReportCacheCounter
+
+        ReportCache.flush_stats()
+        values = {
+            (report_type, counter): value
+            for report_type, counter, value in ReportCacheCounter.objects.values_list('report_type', 'counter', 'value')
+        }
+        reports = {}
+        for report_type in REPORT_TABLES:
+            counters = {counter: values.get((report_type, counter), 0) for counter in STATS_COUNTERS}
+            lookups = counters['hits'] + counters['misses']
+            counters['hit_ratio'] = round(counters['hits'] / lookups, 3) if lookups else None
+            reports[report_type] = counters
+
+        tables = sorted({table for tables in REPORT_TABLES.values() for table in tables})
+        return {
+            'reports': reports,
+            'versions': get_versions(tables),
+        }
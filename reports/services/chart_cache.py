@@ -0,0 +1,133 @@
+"""
+Дисковий кеш PNG-зображень графіків PDF-звітів.
+
+Графік — найповільніша частина PDF: matplotlib будує фігуру і растеризує її
+у 150 dpi. Однакові агрегати (той самий закритий місяць, запитаний кількома
+людьми) дають однаковий графік, тому готовий PNG зберігається у файл з іменем
+— хешем типу графіка, підписів, значень, розміру і решти параметрів, що
+впливають на зображення.
+
+Розмір каталогу обмежений (REPORT_CHART_CACHE_MAX_BYTES): при перевищенні
+видаляються файли, які найдовше не використовувались (час зміни файлу
+оновлюється при кожному влучанні).
+
+Використовується лише растровим бекендом графіків (REPORT_CHART_BACKEND =
+'matplotlib'); векторні графіки reportlab будуються швидше, ніж читається файл.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+
+# Змінюється разом з оформленням графіків, щоб старі зображення не використовувались
+CHART_CACHE_VERSION = 2
+
+
+def _normalize(value):
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, float):
+        # Однакові значення, пораховані різними шляхами, не повинні давати різні ключі
+        return round(value, 6)
+    if isinstance(value, (int, str, bool)) or value is None:
+        return value
+    return str(value)
+
+
+class ChartCache:
+    """PNG графіків на диску з LRU-витісненням за загальним розміром."""
+
+    @staticmethod
+    def directory():
+        return Path(getattr(settings, 'REPORT_CHART_CACHE_DIR', settings.BASE_DIR / '.cache' / 'charts'))
+
+    @staticmethod
+    def max_bytes():
+        return getattr(settings, 'REPORT_CHART_CACHE_MAX_BYTES', 50 * 1024 * 1024)
+
+    @staticmethod
+    def enabled():
+        return ChartCache.max_bytes() > 0
+
+    @staticmethod
+    def make_key(chart_type, labels, values, size, **params):
+        """Хеш усього, що визначає вигляд графіка."""
+        payload = json.dumps(
+            [CHART_CACHE_VERSION, chart_type, _normalize(labels), _normalize(values), _normalize(size),
+             {name: _normalize(value) for name, value in sorted(params.items())}],
+            ensure_ascii=False,
+        )
+        return f'{chart_type}-{hashlib.sha256(payload.encode("utf-8")).hexdigest()}'
+
+    @staticmethod
+    def _path(key):
+        return ChartCache.directory() / f'{key}.png'
+
+    @staticmethod
+    def get(key):
+        """PNG-байти графіка або None."""
+        path = ChartCache._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    @staticmethod
+    def put(key, data):
+        """Зберігає PNG (атомарно: тимчасовий файл + перейменування) і за потреби витісняє старі."""
+        if not ChartCache.enabled():
+            return
+        directory = ChartCache.directory()
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, ChartCache._path(key))
+        except OSError:
+            # Кеш — лише прискорення: звіт формується і без нього
+            return
+        ChartCache.evict()
+
+    @staticmethod
+    def evict(max_bytes=None):
+        """Видаляє найдавніше використані зображення, поки каталог більший за ліміт."""
+        max_bytes = ChartCache.max_bytes() if max_bytes is None else max_bytes
+        entries = []
+        total = 0
+        try:
+            with os.scandir(ChartCache.directory()) as it:
+                for entry in it:
+                    if not entry.name.endswith('.png'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError:
+            return 0
+
+        removed = 0
+        if total <= max_bytes:
+            return removed
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+            total -= size
+            if total <= max_bytes:
+                break
+        return removed
@@ -0,0 +1,250 @@
+"""
+Графіки PDF-звітів: два бекенди з однаковим набором типів (ReportTemplate.CHART_TYPES).
+
+- ``reportlab`` — векторні графіки `reportlab.graphics`, що вставляються в PDF
+  як звичайний flowable: будуються за мілісекунди, не збільшують PDF растром і
+  не потребують matplotlib;
+- ``matplotlib`` — растрові PNG (150 dpi), кешуються в `ChartCache`.
+
+Бекенд обирає REPORT_CHART_BACKEND; якщо matplotlib не встановлено, завжди
+використовується reportlab.
+"""
+from importlib.util import find_spec
+
+from django.conf import settings
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.charts.linecharts import HorizontalLineChart
+from reportlab.graphics.charts.piecharts import Pie
+from reportlab.graphics.shapes import Drawing, Group, Line, String
+from reportlab.lib import colors
+from reportlab.lib.colors import HexColor
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+
+CHART_TYPES = ('bar', 'line', 'pie', 'area')
+
+# Стовпчиків / точок на графіку, більше — лише перші (як у звітах до цього)
+MAX_CATEGORIES = 15
+
+PRIMARY = '#2563eb'
+PIE_COLORS = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#14b8a6', '#f97316', '#64748b']
+GRID_COLOR = HexColor('#cbd5e1')
+TEXT_COLOR = HexColor('#1e293b')
+
+
+def chart_backend():
+    """'reportlab' або 'matplotlib' (лише якщо matplotlib встановлено)."""
+    backend = getattr(settings, 'REPORT_CHART_BACKEND', 'reportlab')
+    if backend == 'matplotlib' and find_spec('matplotlib') is None:
+        return 'reportlab'
+    return backend
+
+
+def limit_categories(chart_type, labels, values, title):
+    """Обрізає довгі ряди до MAX_CATEGORIES з позначкою в заголовку (крім кругової)."""
+    if chart_type != 'pie' and len(labels) > MAX_CATEGORIES:
+        return labels[:MAX_CATEGORIES], values[:MAX_CATEGORIES], f"{title} (Топ {MAX_CATEGORIES})"
+    return labels, values, title
+
+
+def _value_label(value, signed):
+    return f'{value:+.1f}' if signed else f'{value:.1f}'
+
+
+# ============================================================
+# reportlab.graphics
+# ============================================================
+
+def _fit(text, font_name, font_size, max_width):
+    """Обрізає підпис з "…", щоб він вміщувався в max_width."""
+    text = str(text)
+    if stringWidth(text, font_name, font_size) <= max_width:
+        return text
+    while text and stringWidth(text + '…', font_name, font_size) > max_width:
+        text = text[:-1]
+    return text + '…'
+
+
+def _category_chart(chart_type, labels, values, width, height, font_name, bar_colors, signed):
+    font_size = 7
+    right, top = 10, 30
+
+    # Підписи повернуті на 45°: під них іде не більше 40% висоти, довші обрізаються
+    max_label = (height * 0.4 - font_size - 4) / 0.71
+    labels = [_fit(label, font_name, font_size, max_label) for label in labels]
+    widest = max((stringWidth(label, font_name, font_size) for label in labels), default=0)
+    bottom = 20 + widest * 0.71 + font_size + 4
+
+    # Перший підпис тягнеться вліво від своєї категорії — ліве поле має його вмістити
+    step = (width - 60) / max(len(labels), 1)
+    first = stringWidth(labels[0], font_name, font_size) * 0.71 if labels else 0
+    left = max(50, first - step / 2 + 6)
+
+    if chart_type == 'bar':
+        chart = VerticalBarChart()
+        chart.bars[0].fillColor = HexColor(PRIMARY)
+        chart.bars[0].strokeColor = None
+        for index, color in enumerate(bar_colors or []):
+            chart.bars[(0, index)].fillColor = HexColor(color)
+        chart.barLabelFormat = lambda value: _value_label(value, signed)
+        chart.barLabels.fontName = font_name
+        chart.barLabels.fontSize = font_size
+        chart.barLabels.nudge = 6
+        chart.groupSpacing = 6
+    else:
+        chart = HorizontalLineChart()
+        chart.lines[0].strokeColor = HexColor(PRIMARY)
+        chart.lines[0].strokeWidth = 1.5
+        chart.joinedLines = 1
+        if chart_type == 'area':
+            chart.inFill = 1
+            chart.lines[0].fillColor = HexColor(PRIMARY).clone(alpha=0.35)
+
+    chart.x, chart.y = left, bottom
+    chart.width, chart.height = width - left - right, height - bottom - top
+    chart.data = [list(values)]
+
+    chart.categoryAxis.categoryNames = labels
+    chart.categoryAxis.labels.angle = 45
+    chart.categoryAxis.labels.boxAnchor = 'ne'
+    chart.categoryAxis.labels.dx = 3
+    chart.categoryAxis.labels.dy = -2
+    chart.categoryAxis.labels.fontName = font_name
+    chart.categoryAxis.labels.fontSize = font_size
+
+    chart.valueAxis.labels.fontName = font_name
+    chart.valueAxis.labels.fontSize = font_size
+    chart.valueAxis.visibleGrid = 1
+    chart.valueAxis.gridStrokeColor = GRID_COLOR
+    chart.valueAxis.gridStrokeDashArray = (2, 2)
+    chart.valueAxis.forceZero = 1
+    return chart
+
+
+def _pie_chart(labels, values, width, height, font_name):
+    """Кругова діаграма зліва і легенда з частками справа."""
+    font_size = 8
+    items = [(str(label), float(value)) for label, value in zip(labels, values) if value and value > 0]
+    total = sum(value for _, value in items) or 1
+    slice_colors = [HexColor(PIE_COLORS[index % len(PIE_COLORS)]) for index in range(len(items))]
+
+    pie = Pie()
+    pie.width = pie.height = min(width * 0.4, height - 50)
+    pie.x = width * 0.25 - pie.width / 2
+    pie.y = (height - 30 - pie.height) / 2
+    pie.data = [value for _, value in items] or [1]
+    pie.startAngle = 90
+    pie.direction = 'anticlockwise'
+    pie.slices.strokeColor = colors.white
+    pie.slices.strokeWidth = 0.5
+    for index, color in enumerate(slice_colors):
+        pie.slices[index].fillColor = color
+
+    legend = Legend()
+    legend.x = width * 0.5
+    legend.y = height - 40
+    legend.alignment = 'right'
+    legend.fontName = font_name
+    legend.fontSize = font_size
+    legend.dx = legend.dy = 8
+    legend.deltay = 12
+    legend.columnMaximum = max(1, int((height - 50) // 12))
+    legend.colorNamePairs = [
+        (color, _fit(f'{label} — {value / total * 100:.1f}%', font_name, font_size, width * 0.45))
+        for color, (label, value) in zip(slice_colors, items)
+    ]
+
+    group = Group(pie)
+    if items:
+        group.add(legend)
+    return group
+
+
+def vector_chart(chart_type, labels, values, width, height, font_name,
+                 title='', xlabel='', ylabel='', bar_colors=None, signed=False):
+    """Графік як `Drawing` розміром width x height (pt) для вставки в PDF."""
+    values = [float(value or 0) for value in values]
+    drawing = Drawing(width, height)
+
+    if chart_type == 'pie':
+        drawing.add(_pie_chart(labels, values, width, height, font_name))
+    else:
+        chart = _category_chart(chart_type, labels, values, width, height, font_name, bar_colors, signed)
+        drawing.add(chart)
+        if signed:
+            # Нульова лінія для рядів зі змінами (+/-)
+            # (вісь налаштовується так само, як під час малювання графіка)
+            chart.valueAxis.setPosition(chart.x, chart.y, chart.height)
+            chart.valueAxis.configure(chart.data)
+            zero = chart.valueAxis.scale(0)
+            drawing.add(Line(chart.x, zero, chart.x + chart.width, zero, strokeColor=colors.black, strokeWidth=0.8))
+        if xlabel:
+            drawing.add(String(chart.x + chart.width / 2, 4, xlabel, fontName=font_name, fontSize=8,
+                               fillColor=TEXT_COLOR, textAnchor='middle'))
+        if ylabel:
+            label = Group(String(0, 0, ylabel, fontName=font_name, fontSize=8, fillColor=TEXT_COLOR, textAnchor='middle'))
+            label.translate(10, chart.y + chart.height / 2)
+            label.rotate(90)
+            drawing.add(label)
+
+    if title:
+        drawing.add(String(width / 2, height - 16, title, fontName=font_name, fontSize=11,
+                           fillColor=TEXT_COLOR, textAnchor='middle'))
+    return drawing
+
+
+# ============================================================
+# matplotlib
+# ============================================================
+
+def matplotlib_chart(plt, chart_type, labels, values, title='', xlabel='', ylabel='',
+                     bar_colors=None, signed=False):
+    """Графік як matplotlib figure (розмір 10x5, кругова — 8x4)."""
+    if chart_type == 'pie':
+        # Кругова діаграма показує лише додатні частки
+        items = [(label, value) for label, value in zip(labels, values) if value > 0]
+        fig, ax = plt.subplots(figsize=(8, 4))
+        ax.pie([value for _, value in items], labels=[label for label, _ in items],
+               autopct='%1.1f%%', startangle=90,
+               colors=PIE_COLORS,
+               textprops={'fontsize': 10})
+        ax.set_title(title)
+        return fig
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    if chart_type == 'bar':
+        bars = ax.bar(labels, values, color=bar_colors or PRIMARY, alpha=0.8)
+    elif chart_type == 'area':
+        ax.fill_between(range(len(values)), values, color=PRIMARY, alpha=0.35)
+        ax.plot(labels, values, color=PRIMARY)
+        bars = []
+    else:
+        ax.plot(labels, values, color=PRIMARY, marker='o')
+        bars = []
+
+    ax.set_title(title, pad=20)
+    if xlabel:
+        ax.set_xlabel(xlabel)
+    if ylabel:
+        ax.set_ylabel(ylabel)
+    if signed:
+        ax.axhline(0, color='black', linewidth=0.8)
+
+    # Сітка
+    ax.grid(axis='y', linestyle='--', alpha=0.5 if signed else 0.7)
+    ax.set_axisbelow(True)
+
+    # Поворот підписів
+    plt.xticks(rotation=45, ha='right')
+
+    # Додавання значень над стовпчиками
+    for bar in bars:
+        height = bar.get_height()
+        ax.annotate(_value_label(height, signed),
+                    xy=(bar.get_x() + bar.get_width() / 2, height),
+                    xytext=(0, 3 if height >= 0 or not signed else -12),
+                    textcoords="offset points",
+                    ha='center', va='bottom', fontsize=8)
+
+    return fig
@@ -0,0 +1,37 @@
+"""
+Фільтрація за датами для звітів.
+
+`date_time__date__gte=...` перетворюється у SQL на виклик функції (з переведенням
+часового поясу) для кожного рядка, і жоден індекс по `date_time` його не обслуговує.
+Тут дати перетворюються на межі доби в поточному часовому поясі, і фільтр стає
+напіввідкритим діапазоном `date_time >= початок AND date_time < кінець`,
+який іде по індексу.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+
+def day_start(day):
+    """Початок доби `day` (00:00) у поточному часовому поясі — tz-aware datetime."""
+    if isinstance(day, datetime):
+        day = timezone.localtime(day).date() if timezone.is_aware(day) else day.date()
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def date_range(date_from=None, date_to=None, field='date_time'):
+    """Лукапи для `filter(**date_range(...))`: [date_from 00:00, date_to + 1 день 00:00).
+
+    Обидві межі необов'язкові; дати включні, як і у формах звітів.
+    """
+    lookups = {}
+    if date_from:
+        lookups[f'{field}__gte'] = day_start(date_from)
+    if date_to:
+        lookups[f'{field}__lt'] = day_start(date_to + timedelta(days=1))
+    return lookups
+
+
+def on_day(day, field='date_time'):
+    """Лукапи для записів однієї доби (замість `date_time__date=day`)."""
+    return date_range(day, day, field)
@@ -0,0 +1,189 @@
+"""
+Потоковий експорт звітів.
+
+Звичайний звіт спершу будує список словників з усіма рядками, а експорт потім
+збирає з нього весь файл у пам'яті. Тут рядки читаються з queryset звіту
+через `values_list(...).iterator(chunk_size=...)` (лише потрібні стовпці, без
+моделей) і одразу пишуться у відповідь шматками (CSV) або в тимчасовий файл
+книги (XLSX), тож пам'ять не залежить від кількості рядків.
+"""
+import codecs
+import csv
+
+from balances.models import BalanceType
+from logistics.models import ShipmentAction
+
+from .services import ReportService
+
+
+# Скільки рядків читати з БД за раз і скільки рядків CSV віддавати одним шматком
+CHUNK_SIZE = 2000
+
+
+def _dash(value):
+    return value or '—'
+
+
+def _weight(value):
+    return float(value or 0)
+
+
+def _date(value):
+    return value.strftime('%d.%m.%Y')
+
+
+def _time(value):
+    return value.strftime('%H:%M')
+
+
+def _place(name, text=None):
+    # Як ReportService._resolve_place: FK → назва, інакше текст, інакше '—'
+    return name or text or '—'
+
+
+def _typed_date(value):
+    return value.date()
+
+
+def _typed_time(value):
+    return value.time().replace(second=0, microsecond=0)
+
+
+def _balance_type(value):
+    return dict(BalanceType.choices).get(value, value)
+
+
+def _action(value):
+    return ShipmentAction(value).label if value else '—'
+
+
+# Тип звіту -> [(ключ стовпця, поля values_list, перетворення значень)].
+# Ключі і значення збігаються з рядками `data` відповідних звітів ReportService.
+EXPORT_COLUMNS = {
+    'balance': [
+        ('place', ['place__name'], str),
+        ('culture', ['culture__name'], str),
+        ('type', ['balance_type'], _balance_type),
+        ('quantity', ['quantity'], float),
+    ],
+    'waste': [
+        ('place', ['place__name'], str),
+        ('culture', ['culture__name'], str),
+        ('quantity', ['quantity'], float),
+    ],
+    'weigher': [
+        ('date', ['date_time'], _date),
+        ('document', ['document_number'], _dash),
+        ('from_place', ['from_place__name'], _dash),
+        ('to_place', ['to_place__name'], _dash),
+        ('culture', ['culture__name'], _dash),
+        ('weight_net', ['weight_net'], _weight),
+        ('driver', ['driver__full_name'], _dash),
+        ('car', ['car__number'], _dash),
+    ],
+    'shipment': [
+        ('date', ['date_time'], _date),
+        ('time', ['date_time'], _time),
+        ('document', ['document_number'], _dash),
+        ('action_type', ['action_type'], _action),
+        ('place_from', ['place_from__name', 'place_from_text'], _place),
+        ('place_to', ['place_to__name', 'place_to_text'], _place),
+        ('culture', ['culture__name'], _dash),
+        ('weight_net', ['weight_net'], _weight),
+    ],
+    'fields': [
+        ('date', ['date_time'], _date),
+        ('time', ['date_time'], _time),
+        ('document', ['document_number'], _dash),
+        ('field', ['field__name'], _dash),
+        ('place_to', ['place_to__name'], _place),
+        ('culture', ['culture__name'], _dash),
+        ('weight_net', ['weight_net'], _weight),
+        ('place_from', ['field__name'], _dash),
+    ],
+    'other_income': [
+        ('date', ['date_time'], _date),
+        ('time', ['date_time'], _time),
+        ('document', ['document_number'], _dash),
+        ('seller', ['seller'], _dash),
+        ('place_to', ['place_to__name'], _place),
+        ('culture', ['culture__name'], _dash),
+        ('weight_net', ['weight_net'], _weight),
+    ],
+}
+
+
+# Для XLSX дата і час пишуться типізованими клітинками, а не рядками
+TYPED_CONVERTERS = {
+    _date: _typed_date,
+    _time: _typed_time,
+}
+
+
+def export_columns(report_type):
+    """Ключі стовпців потокового експорту або None, якщо звіт не має queryset."""
+    columns = EXPORT_COLUMNS.get(report_type)
+    return [key for key, _, _ in columns] if columns else None
+
+
+def iter_report_rows(report_type, date_from=None, date_to=None, filters=None, chunk_size=CHUNK_SIZE, typed=False):
+    """
+    Рядки звіту (списки значень у порядку `export_columns`) прямо з БД.
+
+    `typed=True` — дата і час як `date` / `time` замість відформатованих рядків.
+    """
+    columns = EXPORT_COLUMNS[report_type]
+    if typed:
+        columns = [(key, sources, TYPED_CONVERTERS.get(convert, convert)) for key, sources, convert in columns]
+
+    # Кожне поле вибирається один раз, навіть якщо з нього будуються кілька стовпців
+    fields = []
+    for _, sources, _ in columns:
+        fields += [field for field in sources if field not in fields]
+    plan = [([fields.index(field) for field in sources], convert) for _, sources, convert in columns]
+
+    queryset = ReportService.report_queryset(report_type, date_from, date_to, filters)
+    for values in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        yield [convert(*(values[i] for i in positions)) for positions, convert in plan]
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: writerow повертає готовий рядок замість запису."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(header, rows, chunk_size=CHUNK_SIZE):
+    """
+    Байти CSV-файлу: BOM (щоб Excel розпізнав UTF-8), рядок заголовків і рядки
+    даних, склеєні по `chunk_size` рядків у шматок.
+    """
+    writer = csv.writer(_Echo())
+    yield codecs.BOM_UTF8
+    chunk = [writer.writerow(header)]
+    for row in rows:
+        chunk.append(writer.writerow(row))
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk).encode('utf-8')
+            chunk = []
+    if chunk:
+        yield ''.join(chunk).encode('utf-8')
+
+
+def stream_report_csv(report_type, date_from=None, date_to=None, filters=None):
+    """Потоковий CSV звіту з локалізованими заголовками стовпців."""
+    columns = export_columns(report_type)
+    labels = ReportService.get_report_column_labels(report_type, columns)
+    rows = iter_report_rows(report_type, date_from, date_to, filters)
+    return iter_csv([labels.get(key, key) for key in columns], rows)
+
+
+def write_report_xlsx(output, report_type, date_from=None, date_to=None, filters=None, sheet_name=None):
+    """Пише XLSX звіту в `output` рядок за рядком. Повертає кількість рядків даних."""
+    from .xlsx import write_xlsx
+
+    columns = export_columns(report_type)
+    labels = ReportService.get_report_column_labels(report_type, columns)
+    rows = iter_report_rows(report_type, date_from, date_to, filters, typed=True)
+    return write_xlsx(output, [labels.get(key, key) for key in columns], rows, sheet_name=sheet_name or report_type)
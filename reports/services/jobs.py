@@ -0,0 +1,312 @@
+"""
+Фонове формування PDF-звітів.
+
+Форма звіту лише ставить завдання в чергу — запис `ReportExecution` зі
+статусом "В черзі" і параметрами звіту. Окремий процес
+(`manage.py run_report_worker`) забирає завдання, рахує дані, будує PDF,
+зберігає файл і за потреби відправляє його на Report Server, оновлюючи
+статус і прогрес. Сторінка завдання опитує статус і віддає файл, щойно він
+готовий; завдання можна скасувати, а завислі — знімаються за таймаутом.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Model
+from django.utils import timezone
+
+from balances.models import BalanceSnapshot
+from balances.services import BalanceService
+from reports.models import ReportExecution, ReportExecutionStatus
+from .dates import date_range
+from .services import ReportService
+
+
+class JobCancelled(Exception):
+    """Завдання скасоване або зняте за таймаутом, поки формувалось."""
+
+
+class JobError(Exception):
+    """Помилка, текст якої показується користувачу як є."""
+
+
+def make_json_safe(value):
+    """Перетворює будь-яке значення на JSON-serializable."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, Model):
+        return value.pk
+    if isinstance(value, dict):
+        return {k: make_json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [make_json_safe(v) for v in value]
+    return value
+
+
+def _parse_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+# ============================================================
+# Звіти: (execution, filters, progress) -> (дані, PDF-буфер, ім'я файлу)
+#
+# pdf_generator (reportlab) і report_sender (requests) імпортуються всередині
+# функцій: цей модуль завантажується разом з URL-ами, а PDF будує лише воркер.
+# ============================================================
+
+def _balance_snapshot(execution, filters, progress):
+    report_date = _parse_date(filters.pop('date'))
+
+    # Залишки на кінець дня з матеріалізованої таблиці, якщо вона вирівняна по Balance
+    # на цю дату (початкові залишки); інакше — зліпки
+    valid_from = BalanceService.daily_balances_valid_from()
+    if valid_from and report_date >= valid_from:
+        data = ReportService.get_balance_on_date(report_date, filters)
+    else:
+        snapshot = BalanceSnapshot.objects.filter(
+            **date_range(date_to=report_date, field='snapshot_date')
+        ).order_by('-snapshot_date').first()
+
+        if snapshot:
+            data = ReportService.get_balance_snapshot_data(snapshot, filters)
+        else:
+            # Use current balances if no snapshot exists
+            data = ReportService.get_balance_report(filters=filters)
+    progress(40)
+
+    from .pdf_generator import ReportPDFBuilder
+    pdf_buffer = ReportPDFBuilder.build_balance_report(data, date=report_date, filters=filters)
+    return data, pdf_buffer, f"balance_report_{report_date:%Y%m%d}.pdf"
+
+
+def _balance_period(execution, filters, progress):
+    date_from, date_to = execution.date_from, execution.date_to
+
+    start_snapshot = BalanceSnapshot.objects.filter(
+        **date_range(date_to=date_from, field='snapshot_date')
+    ).order_by('-snapshot_date').first()
+    end_snapshot = BalanceSnapshot.objects.filter(
+        **date_range(date_to=date_to, field='snapshot_date')
+    ).order_by('-snapshot_date').first()
+
+    if not start_snapshot or not end_snapshot:
+        raise JobError('Недостатньо даних для побудови звіту за вказаний період')
+
+    comparison_data = ReportService.compare_balance_snapshots(start_snapshot, end_snapshot, filters)
+    progress(40)
+
+    from .pdf_generator import ReportPDFBuilder
+    pdf_buffer = ReportPDFBuilder.build_balance_period_report(comparison_data, date_from, date_to, filters=filters)
+    return (
+        {'comparison': comparison_data},
+        pdf_buffer,
+        f"balance_period_{date_from:%Y%m%d}_{date_to:%Y%m%d}.pdf",
+    )
+
+
+def _income_date(execution, filters, progress):
+    report_date = _parse_date(filters.pop('date'))
+    data = ReportService.get_fields_report(date_from=report_date, date_to=report_date, filters=filters)
+    progress(40)
+
+    from .pdf_generator import ReportPDFBuilder
+    pdf_buffer = ReportPDFBuilder.build_income_report(data, report_date, report_date, filters)
+    return data, pdf_buffer, f"income_report_{report_date:%Y%m%d}.pdf"
+
+
+def _income_period(execution, filters, progress):
+    date_from, date_to = execution.date_from, execution.date_to
+    data = ReportService.get_fields_report(date_from=date_from, date_to=date_to, filters=filters)
+    progress(40)
+
+    from .pdf_generator import ReportPDFBuilder
+    pdf_buffer = ReportPDFBuilder.build_income_report(data, date_from, date_to, filters)
+    return data, pdf_buffer, f"income_period_{date_from:%Y%m%d}_{date_to:%Y%m%d}.pdf"
+
+
+def _shipment_summary(execution, filters, progress):
+    date_from, date_to = execution.date_from, execution.date_to
+    data = ReportService.get_shipment_report(date_from=date_from, date_to=date_to, filters=filters)
+    progress(40)
+
+    from .pdf_generator import ReportPDFBuilder
+    pdf_buffer = ReportPDFBuilder.build_shipment_summary(data, date_from, date_to, filters)
+    return data, pdf_buffer, f"shipment_summary_{date_from:%Y%m%d}_{date_to:%Y%m%d}.pdf"
+
+
+def _total_income_period(execution, filters, progress):
+    date_from, date_to = execution.date_from, execution.date_to
+    data = ReportService.get_total_income_period_data(date_from, date_to, filters)
+    progress(40)
+
+    from .pdf_generator import ReportPDFBuilder
+    pdf_buffer = ReportPDFBuilder.build_total_income_period_report(data, date_from, date_to, filters)
+    return data, pdf_buffer, f"Прихід_зерна_загальний_{date_from:%d%m%Y}_{date_to:%d%m%Y}.pdf"
+
+
+def _balance_period_history(execution, filters, progress):
+    date_from, date_to = execution.date_from, execution.date_to
+    data = ReportService.get_balance_period_from_history(date_from, date_to, filters)
+    progress(40)
+
+    from .pdf_generator import ReportPDFBuilder
+    pdf_buffer = ReportPDFBuilder.build_balance_period_history_report(data, date_from, date_to, filters)
+    return data, pdf_buffer, f"Залишки_період_історія_{date_from:%d%m%Y}_{date_to:%d%m%Y}.pdf"
+
+
+# Тип звіту (ReportExecution.report_type) -> функція формування
+PDF_JOBS = {
+    'balance_snapshot': _balance_snapshot,
+    'balance_period': _balance_period,
+    'income_date': _income_date,
+    'income_period': _income_period,
+    'shipment_summary': _shipment_summary,
+    'total_income_period': _total_income_period,
+    'balance_period_history': _balance_period_history,
+}
+
+
+class ReportJobService:
+    """Черга фонового формування PDF-звітів на основі ReportExecution."""
+
+    @staticmethod
+    def timeout():
+        """Максимальний час формування одного звіту, секунд."""
+        return getattr(settings, 'REPORT_JOB_TIMEOUT', 10 * 60)
+
+    @staticmethod
+    def enqueue(user, report_type, filters, send_to_report_server=False):
+        """Ставить звіт у чергу. `filters` — параметри звіту, як їх зберігає історія виконань."""
+        if report_type not in PDF_JOBS:
+            raise ValueError(f'Невідомий тип звіту: {report_type}')
+        return ReportExecution.objects.create(
+            executed_by=user,
+            report_type=report_type,
+            date_from=_parse_date(filters.get('date_from')),
+            date_to=_parse_date(filters.get('date_to')),
+            filters=make_json_safe(filters),
+            file_format='pdf',
+            status=ReportExecutionStatus.QUEUED,
+            send_to_report_server=send_to_report_server,
+        )
+
+    @staticmethod
+    def claim(execution_id):
+        """Переводить завдання з черги у "Формується". False — його вже забрали або скасували."""
+        return bool(ReportExecution.objects.filter(
+            pk=execution_id, status=ReportExecutionStatus.QUEUED
+        ).update(status=ReportExecutionStatus.RUNNING, started_at=timezone.now(), progress=0))
+
+    @staticmethod
+    def set_progress(execution_id, percent):
+        """Оновлює прогрес; `JobCancelled`, якщо завдання вже не виконується."""
+        if not ReportExecution.objects.filter(
+            pk=execution_id, status=ReportExecutionStatus.RUNNING
+        ).update(progress=percent):
+            raise JobCancelled()
+
+    @staticmethod
+    def cancel(execution):
+        """Скасовує завдання в черзі або те, що формується. Повертає True, якщо скасовано."""
+        return bool(ReportExecution.objects.filter(
+            pk=execution.pk, status__in=ReportExecution.ACTIVE_STATUSES
+        ).update(status=ReportExecutionStatus.CANCELLED, finished_at=timezone.now()))
+
+    @staticmethod
+    def fail_stale(timeout=None):
+        """Знімає завдання, що формуються довше за таймаут (завис або впав процес). Повертає кількість."""
+        deadline = timezone.now() - timedelta(seconds=timeout or ReportJobService.timeout())
+        return ReportExecution.objects.filter(
+            status=ReportExecutionStatus.RUNNING, started_at__lt=deadline
+        ).update(
+            status=ReportExecutionStatus.FAILED,
+            error='Перевищено час формування звіту',
+            finished_at=timezone.now(),
+        )
+
+    @staticmethod
+    def _row_count(data):
+        if isinstance(data, dict) and 'total_rows' in data:
+            return data['total_rows']
+        if isinstance(data, list):
+            return len(data)
+        if isinstance(data, dict) and 'comparison' in data:
+            return len(data['comparison'])
+        return 0
+
+    @staticmethod
+    def _send(execution, filename):
+        """Відправка на Report Server. Повертає повідомлення для користувача."""
+        from .report_sender import ReportSenderService
+        try:
+            status = ReportSenderService.send_pdf(
+                execution.file_path,
+                metadata={
+                    "report_type": execution.report_type,
+                    "date_from": execution.filters.get("date_from"),
+                    "date_to": execution.filters.get("date_to"),
+                    "user": execution.executed_by.username,
+                    "filename": filename,
+                }
+            )
+        except Exception as e:
+            return f"Помилка відправки: {e}"
+        if status == "duplicate":
+            return "Такий звіт вже існує на Report Server"
+        return "Звіт успішно відправлено на Report Server"
+
+    @staticmethod
+    def run(execution_id):
+        """Формує звіт завдання. Повертає підсумковий статус або None, якщо завдання не взято."""
+        if not ReportJobService.claim(execution_id):
+            return None
+        execution = ReportExecution.objects.select_related('executed_by').get(pk=execution_id)
+
+        def progress(percent):
+            ReportJobService.set_progress(execution_id, percent)
+
+        try:
+            filters = dict(execution.filters)
+            data, pdf_buffer, filename = PDF_JOBS[execution.report_type](execution, filters, progress)
+            progress(80)
+
+            # Файл зберігається без save(): статус міг змінитись (скасування) під час формування
+            execution.file_path.save(
+                f"report_{execution.id}.{execution.file_format}", ContentFile(pdf_buffer.getvalue()), save=False
+            )
+            finished = ReportExecution.objects.filter(
+                pk=execution_id, status=ReportExecutionStatus.RUNNING
+            ).update(
+                status=ReportExecutionStatus.DONE,
+                progress=100,
+                finished_at=timezone.now(),
+                file_path=execution.file_path.name,
+                result_data=make_json_safe(data),
+                row_count=ReportJobService._row_count(data),
+            )
+            if not finished:
+                execution.file_path.delete(save=False)
+                raise JobCancelled()
+
+            # Відправляється лише готовий звіт: скасоване чи зняте за таймаутом завдання не публікується
+            if execution.send_to_report_server:
+                ReportExecution.objects.filter(pk=execution_id).update(
+                    message=ReportJobService._send(execution, filename)
+                )
+            return ReportExecutionStatus.DONE
+        except JobCancelled:
+            return ReportExecution.objects.values_list('status', flat=True).get(pk=execution_id)
+        except Exception as e:
+            ReportExecution.objects.filter(
+                pk=execution_id, status=ReportExecutionStatus.RUNNING
+            ).update(
+                status=ReportExecutionStatus.FAILED,
+                error=str(e) if isinstance(e, JobError) else f'Помилка при генерації звіту: {e}',
+                finished_at=timezone.now(),
+            )
+            return ReportExecutionStatus.FAILED
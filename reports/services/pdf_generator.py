@@ -1,10 +1,6 @@
 # pdf_generator.py
 import os
-import matplotlib
-# Встановлюємо backend 'Agg' перед імпортом pyplot, щоб уникнути помилок на сервері
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from matplotlib import font_manager
+import threading
 
 from io import BytesIO
 from datetime import datetime
@@ -26,38 +22,59 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.colors import HexColor
 
-class PDFReportGenerator:
-    """Генератор PDF звітів з підтримкою графіків та української мови"""
+from .chart_cache import ChartCache
+from .charts import chart_backend, limit_categories, matplotlib_chart, vector_chart
+from .pdf_parallel import build_parallel, parallel_table_source
+from .pdf_tables import CELL_FONT_SIZE, CELL_LEADING, CELL_PADDING_X, CELL_PADDING_Y, FastTableData, PagedTable, format_number
 
-    PRIMARY_COLOR = HexColor('#2563eb')
-    SECONDARY_COLOR = HexColor('#64748b')
-    HEADER_BG = HexColor('#f1f5f9')
-    BORDER_COLOR = HexColor('#e2e8f0')
-    SUCCESS_COLOR = '#10b981'   # зелений
-    DANGER_COLOR = '#ef4444'    # червоний
+PRIMARY_COLOR = HexColor('#2563eb')
+SECONDARY_COLOR = HexColor('#64748b')
+HEADER_BG = HexColor('#f1f5f9')
+BORDER_COLOR = HexColor('#e2e8f0')
+TEXT_COLOR = HexColor('#1e293b')
 
-    def __init__(self, title, orientation='portrait'):
-        self.title = title
-        self.orientation = orientation
 
-        if orientation == 'landscape':
-            self.pagesize = landscape(A4)
-        else:
-            self.pagesize = portrait(A4)
+class PDFRenderContext:
+    """
+    Шрифти, стилі параграфів і шаблони стилів таблиць, спільні для всіх звітів.
 
-        self.page_width, self.page_height = self.pagesize
-        self.margin_x = 1.5 * cm
-        self.margin_y = 2.0 * cm
-        self.content_width = self.page_width - (2 * self.margin_x)
+    Будується один раз на процес (`get_render_context`): пошук і реєстрація
+    шрифту в ReportLab і Matplotlib та побудова стилів не повторюються для
+    кожного звіту. Стилі лише читаються генераторами — змінювати їх не можна.
 
-        self.buffer = BytesIO()
-        self.elements = []
+    matplotlib імпортується лише при першому растровому графіку (`pyplot()`).
+    """
 
+    def __init__(self):
         self.font_path = self._find_font_path()
-        self._register_fonts()
+        self.font_name, self.font_bold = self._register_fonts(self.font_path)
         self.styles = self._create_styles()
+        self.table_style = self._create_table_style()
+        self.fast_table_style = self._create_fast_table_style()
+        self.summary_style = self._create_summary_style()
+        self._pyplot = None
+        self._pyplot_lock = threading.Lock()
+
+    def pyplot(self):
+        """matplotlib.pyplot з backend 'Agg' і зареєстрованим шрифтом звітів."""
+        if self._pyplot is None:
+            with self._pyplot_lock:
+                if self._pyplot is None:
+                    import matplotlib
+                    # Встановлюємо backend 'Agg' перед імпортом pyplot, щоб уникнути помилок на сервері
+                    matplotlib.use('Agg')
+                    import matplotlib.pyplot as plt
+                    from matplotlib import font_manager
+
+                    # Реєстрація для Matplotlib (щоб на графіках була кирилиця)
+                    if self.font_name == 'Regular':
+                        font_manager.fontManager.addfont(self.font_path)
+                        plt.rcParams['font.family'] = 'DejaVu Sans'
+                    self._pyplot = plt
+        return self._pyplot
 
-    def _find_font_path(self):
+    @staticmethod
+    def _find_font_path():
         """Знаходить шлях до файлу шрифту"""
         font_path = os.path.join(settings.BASE_DIR, 'static', 'fonts', 'DejaVuSans.ttf')
         if not os.path.exists(font_path):
@@ -66,26 +83,20 @@ class PDFReportGenerator:
                 font_path = found_path
         return font_path
 
-    def _register_fonts(self):
-        """Реєструє шрифт для PDF та Matplotlib"""
+    @staticmethod
+    def _register_fonts(font_path):
+        """Реєструє шрифт для ReportLab. Повертає (звичайний, жирний)."""
         try:
-            if self.font_path and os.path.exists(self.font_path):
-                # 1. Реєстрація для ReportLab
-                pdfmetrics.registerFont(TTFont('Regular', self.font_path))
-                # Нам підходить 'Regular' як основний і жирний, якщо немає Bold-файлу
-                self.font_name = 'Regular'
-                self.font_bold = 'Regular'
+            if font_path and os.path.exists(font_path):
+                pdfmetrics.registerFont(TTFont('Regular', font_path))
 
-                # 2. Реєстрація для Matplotlib (щоб на графіках була кирилиця)
-                font_manager.fontManager.addfont(self.font_path)
-                plt.rcParams['font.family'] = 'DejaVu Sans'
-            else:
-                raise FileNotFoundError("Шрифт не знайдено")
+                # Нам підходить 'Regular' як основний і жирний, якщо немає Bold-файлу
+                return 'Regular', 'Regular'
+            raise FileNotFoundError("Шрифт не знайдено")
         except Exception as e:
             # не кидаємо — fallback на стандартні шрифти
             print(f"Font warning: {e}")
-            self.font_name = 'Helvetica'
-            self.font_bold = 'Helvetica-Bold'
+            return 'Helvetica', 'Helvetica-Bold'
 
     def _create_styles(self):
         styles = getSampleStyleSheet()
@@ -94,12 +105,12 @@ class PDFReportGenerator:
 
         styles.add(ParagraphStyle(
             name='ReportTitle', parent=styles['Heading1'], fontSize=16,
-            textColor=self.PRIMARY_COLOR, alignment=TA_CENTER, fontName=self.font_bold, spaceAfter=10
+            textColor=PRIMARY_COLOR, alignment=TA_CENTER, fontName=self.font_bold, spaceAfter=10
         ))
 
         styles.add(ParagraphStyle(
             name='SectionTitle', parent=styles['Heading2'], fontSize=12,
-            textColor=HexColor('#1e293b'), spaceBefore=15, spaceAfter=10, fontName=self.font_bold
+            textColor=TEXT_COLOR, spaceBefore=15, spaceAfter=10, fontName=self.font_bold
         ))
 
         styles.add(ParagraphStyle(
@@ -123,8 +134,133 @@ class PDFReportGenerator:
             name='BoldSmall', parent=styles['Normal'], fontName=self.font_bold, fontSize=10
         ))
 
+        # Стилі, які раніше створювались при кожному виклику add_header / add_summary_box / add_subtitle
+        styles.add(ParagraphStyle(
+            name='Meta', parent=styles['Normal'], alignment=TA_CENTER,
+            textColor=SECONDARY_COLOR, spaceAfter=20, fontName=self.font_name
+        ))
+        styles.add(ParagraphStyle(
+            name='BoldLbl', parent=styles['Normal'], fontName=self.font_bold
+        ))
+        for level in (1, 2):
+            styles.add(ParagraphStyle(
+                name=f'SubtitleLevel{level}', parent=styles['Normal'], fontName=self.font_bold,
+                fontSize=14 if level == 1 else 12, textColor=TEXT_COLOR, spaceBefore=12, spaceAfter=8,
+            ))
+
         return styles
 
+    @staticmethod
+    def _create_table_style():
+        """Стиль таблиць даних (add_table)."""
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), PRIMARY_COLOR),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('INNERGRID', (0, 0), (-1, -1), 0.25, BORDER_COLOR),
+            ('BOX', (0, 0), (-1, -1), 0.5, BORDER_COLOR),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, HexColor('#f8fafc')]),
+            ('LEFTPADDING', (0, 0), (-1, -1), 4),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+            ('TOPPADDING', (0, 0), (-1, -1), 3),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+        ])
+
+    def _create_fast_table_style(self):
+        """Стиль швидких таблиць: клітинки — рядки, шрифт задає таблиця."""
+        return self.table_style.getCommands() + [
+            ('FONTNAME', (0, 1), (-1, -1), self.font_name),
+            ('FONTSIZE', (0, 1), (-1, -1), CELL_FONT_SIZE),
+            ('LEADING', (0, 1), (-1, -1), CELL_LEADING),
+        ]
+
+    @staticmethod
+    def _create_summary_style():
+        """Стиль блоку підсумків (add_summary_box)."""
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), HEADER_BG),
+            ('INNERGRID', (0, 0), (-1, -1), 0.25, colors.white),
+            ('BOX', (0, 0), (-1, -1), 0.5, BORDER_COLOR),
+            ('LEFTPADDING', (0, 0), (-1, -1), 6),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 4),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ])
+
+
+_render_context = None
+_render_context_lock = threading.Lock()
+
+
+def get_render_context():
+    """Спільний для процесу PDFRenderContext; створюється при першому зверненні."""
+    global _render_context
+    if _render_context is None:
+        with _render_context_lock:
+            if _render_context is None:
+                _render_context = PDFRenderContext()
+    return _render_context
+
+
+def warm_up():
+    """
+    Готує процес до формування звітів: будує контекст рендерингу і один раз
+    малює текст шрифтом звіту в ReportLab (і в Matplotlib, якщо графіки
+    растрові), щоб кеші гліфів і пошуку шрифтів заповнились до першого звіту.
+    Викликається на старті воркера.
+    """
+    context = get_render_context()
+    pdfmetrics.stringWidth('Звіт 0123456789', context.font_name, 10)
+
+    if chart_backend() == 'matplotlib':
+        plt = context.pyplot()
+        fig, ax = plt.subplots(figsize=(2, 1))
+        ax.set_title('Звіт')
+        ax.bar(['А'], [1])
+        fig.savefig(BytesIO(), format='png', dpi=50)
+        plt.close(fig)
+    return context
+
+
+class PDFReportGenerator:
+    """Генератор PDF звітів з підтримкою графіків та української мови"""
+
+    PRIMARY_COLOR = PRIMARY_COLOR
+    SECONDARY_COLOR = SECONDARY_COLOR
+    HEADER_BG = HEADER_BG
+    BORDER_COLOR = BORDER_COLOR
+    SUCCESS_COLOR = '#10b981'   # зелений
+    DANGER_COLOR = '#ef4444'    # червоний
+
+    def __init__(self, title, orientation='portrait'):
+        self.title = title
+        self.orientation = orientation
+
+        if orientation == 'landscape':
+            self.pagesize = landscape(A4)
+        else:
+            self.pagesize = portrait(A4)
+
+        self.page_width, self.page_height = self.pagesize
+        self.margin_x = 1.5 * cm
+        self.margin_y = 2.0 * cm
+        self.content_width = self.page_width - (2 * self.margin_x)
+
+        self.buffer = BytesIO()
+        self.elements = []
+        # Один час формування в колонтитулах усіх сторінок (і всіх частин паралельного звіту)
+        self.generated_at = datetime.now()
+        # Номер сторінки перед першою сторінкою документа (для частин паралельного звіту)
+        self.page_offset = 0
+        self.page_count = 0
+
+        self.context = get_render_context()
+        self.font_path = self.context.font_path
+        self.font_name = self.context.font_name
+        self.font_bold = self.context.font_bold
+        self.styles = self.context.styles
+
     def _header_footer(self, canvas, doc):
         canvas.saveState()
         # Header
@@ -145,7 +281,7 @@ class PDFReportGenerator:
             canvas.setFont(self.font_name, 9)
         except Exception:
             canvas.setFont('Helvetica', 9)
-        date_str = datetime.now().strftime('%d.%m.%Y %H:%M')
+        date_str = self.generated_at.strftime('%d.%m.%Y %H:%M')
         canvas.drawRightString(self.page_width - self.margin_x, self.page_height - 1.2*cm, f"Згенеровано: {date_str}")
 
         # Footer line
@@ -154,7 +290,7 @@ class PDFReportGenerator:
         canvas.line(self.margin_x, 1.5*cm, self.page_width - self.margin_x, 1.5*cm)
 
         # Page number
-        page_num = canvas.getPageNumber()
+        page_num = self.page_offset + canvas.getPageNumber()
         try:
             canvas.setFont(self.font_name, 9)
         except Exception:
@@ -165,15 +301,7 @@ class PDFReportGenerator:
 
     def add_subtitle(self, text, level=1):
         """Додає підзаголовок секції у PDF."""
-        style = ParagraphStyle(
-            name=f'SubtitleLevel{level}',
-            parent=self.styles['Normal'],
-            fontName=self.font_bold,
-            fontSize=14 if level == 1 else 12,
-            textColor=HexColor('#1e293b'),
-            spaceBefore=12,
-            spaceAfter=8,
-        )
+        style = self.styles['SubtitleLevel1' if level == 1 else 'SubtitleLevel2']
         self.elements.append(Paragraph(text, style))
 
     def add_spacer(self, size=12):
@@ -206,63 +334,99 @@ class PDFReportGenerator:
                 meta.append(f"Дата: {date_range}")
 
         if meta:
-            meta_style = ParagraphStyle(
-                name='Meta', parent=self.styles['Normal'], alignment=TA_CENTER,
-                textColor=self.SECONDARY_COLOR, spaceAfter=20, fontName=self.font_name
-            )
-            self.elements.append(Paragraph(" | ".join(meta), meta_style))
+            self.elements.append(Paragraph(" | ".join(meta), self.styles['Meta']))
 
     def add_summary_box(self, summary_data):
         data = []
         for label, value in summary_data.items():
             style = self.styles['Normal']
             if not str(label).startswith(' '):
-                style = ParagraphStyle('BoldLbl', parent=style, fontName=self.font_bold)
+                style = self.styles['BoldLbl']
             data.append([Paragraph(label, style), Paragraph(str(value), self.styles['TableCellRight'])])
 
         width = min(12*cm, self.content_width)
         table = Table(data, colWidths=[width*0.6, width*0.4], hAlign='LEFT')
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), self.HEADER_BG),
-            ('INNERGRID', (0, 0), (-1, -1), 0.25, colors.white),
-            ('BOX', (0, 0), (-1, -1), 0.5, self.BORDER_COLOR),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+        table.setStyle(self.context.summary_style)
         self.elements.append(Paragraph("Підсумки", self.styles['SectionTitle']))
         self.elements.append(table)
         self.elements.append(Spacer(1, 0.5*cm))
 
-    def add_plot(self, figure):
-        """Додає matplotlib figure у PDF"""
-        img_buffer = BytesIO()
-        figure.savefig(img_buffer, format='png', dpi=150, bbox_inches='tight')
-        img_buffer.seek(0)
+    def add_plot(self, figure, cache_key=None):
+        """
+        Додає графік у PDF.
+
+        `figure` — matplotlib figure або функція, що її будує. З `cache_key`
+        (ChartCache.make_key) готовий PNG береться з кешу графіків, і фігура
+        взагалі не будується; інакше відрендерений PNG зберігається в кеш.
+        """
+        png = ChartCache.get(cache_key) if cache_key else None
+        if png is None:
+            if callable(figure):
+                figure = figure()
+            img_buffer = BytesIO()
+            figure.savefig(img_buffer, format='png', dpi=150, bbox_inches='tight')
+            self.context.pyplot().close(figure)
+            png = img_buffer.getvalue()
+            if cache_key:
+                ChartCache.put(cache_key, png)
 
         # Визначаємо розмір зображення, щоб воно влізло
         img_width = self.content_width
         img_height = img_width * 0.5  # Співвідношення 2:1
 
-        im = Image(img_buffer, width=img_width, height=img_height)
+        im = Image(BytesIO(png), width=img_width, height=img_height)
         self.elements.append(Spacer(1, 0.5*cm))
         self.elements.append(im)
         self.elements.append(Spacer(1, 1*cm))
-        plt.close(figure)
 
-    def add_table(self, headers, data, col_widths=None, title=None, style=None):
+    def add_chart(self, chart_type, labels, values, title='', xlabel='', ylabel='', bar_colors=None, signed=False):
+        """
+        Додає графік типу 'bar' / 'line' / 'pie' / 'area' бекендом REPORT_CHART_BACKEND.
+
+        `bar_colors` — колір кожного стовпчика, `signed` — значення зі знаком
+        (підписи "+1.0" / "-1.0" і нульова лінія).
+        """
+        labels, values, title = limit_categories(chart_type, list(labels), [float(v) for v in values], title)
+        if chart_backend() == 'reportlab':
+            self.elements.append(Spacer(1, 0.5*cm))
+            self.elements.append(vector_chart(
+                chart_type, labels, values, self.content_width, self.content_width * 0.5, self.font_name,
+                title=title, xlabel=xlabel, ylabel=ylabel, bar_colors=bar_colors, signed=signed,
+            ))
+            self.elements.append(Spacer(1, 1*cm))
+            return
+
+        params = dict(title=title, xlabel=xlabel, ylabel=ylabel, bar_colors=bar_colors, signed=signed)
+        self.add_plot(
+            lambda: matplotlib_chart(self.context.pyplot(), chart_type, labels, values, **params),
+            cache_key=ChartCache.make_key(chart_type, labels, values, self.content_width, **params),
+        )
+
+    def add_table(self, headers, data, col_widths=None, title=None, style=None, fast=None):
         """
         headers: list of header strings
         data: list of rows (each row is list of cells). Cells can be Paragraph objects already.
         col_widths: list of widths in points or reportlab units (they will be scaled to content_width)
         title: optional section title
         style: optional list of TableStyle commands (ReportLab style tuples) to apply in addition to default
+        fast: швидкий режим (рядки замість Paragraph, поділ по сторінках); None — для таблиць
+              від REPORT_PDF_FAST_TABLE_ROWS рядків. У швидкому режимі `style` застосовується
+              до частини таблиці на кожній сторінці
         """
         if title:
             self.elements.append(Paragraph(title, self.styles['SectionTitle']))
 
+        widths = self._column_widths(headers, col_widths)
+
+        if fast is None:
+            fast = len(data) >= getattr(settings, 'REPORT_PDF_FAST_TABLE_ROWS', 500)
+        if fast:
+            self.elements.append(self._fast_table(headers, data, widths, style))
+            self.elements.append(Spacer(1, 0.5*cm))
+            return
+
         header_row = [Paragraph(str(h), self.styles['TableHeader']) for h in headers]
+
         table_data = [header_row]
         for row in data:
             r_data = []
@@ -278,33 +442,9 @@ class PDFReportGenerator:
                     r_data.append(Paragraph(str(cell) if cell is not None else '—', self.styles['TableCell']))
             table_data.append(r_data)
 
-        # compute widths
-        if not col_widths:
-            widths = [self.content_width / len(headers)] * len(headers)
-        else:
-            # col_widths provided as numeric weights/absolute; we will scale weights to content_width
-            try:
-                total = sum(col_widths)
-                widths = [w * (self.content_width / total) for w in col_widths]
-            except Exception:
-                widths = [self.content_width / len(headers)] * len(headers)
-
         table = Table(table_data, colWidths=widths, repeatRows=1)
         # default style
-        base_style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), self.PRIMARY_COLOR),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('INNERGRID', (0, 0), (-1, -1), 0.25, self.BORDER_COLOR),
-            ('BOX', (0, 0), (-1, -1), 0.5, self.BORDER_COLOR),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, HexColor('#f8fafc')]),
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-        ])
-        table.setStyle(base_style)
+        table.setStyle(self.context.table_style)
 
         # apply additional style rules if provided
         if style:
@@ -317,25 +457,70 @@ class PDFReportGenerator:
         self.elements.append(table)
         self.elements.append(Spacer(1, 0.5*cm))
 
+    def _column_widths(self, headers, col_widths):
+        if not col_widths:
+            return [self.content_width / len(headers)] * len(headers)
+        # col_widths provided as numeric weights/absolute; we will scale weights to content_width
+        try:
+            total = sum(col_widths)
+            return [w * (self.content_width / total) for w in col_widths]
+        except Exception:
+            return [self.content_width / len(headers)] * len(headers)
+
+    def _fast_table(self, headers, data, widths, style=None, numeric_columns=None, first_row=0):
+        """
+        Велика таблиця (`PagedTable`): клітинки-рядки, виміряні заздалегідь висоти,
+        поділ по сторінках. Найдовші таблиці можуть формуватись паралельно (див. pdf_parallel).
+        """
+        header_row = [Paragraph(str(h), self.styles['TableHeader']) for h in headers]
+        table_data = FastTableData(
+            data, widths, self.font_name, self.styles['TableCell'], self.styles['TableCellRight'],
+            numeric_columns=numeric_columns,
+        )
+        header_height = max(
+            p.wrap(width - CELL_PADDING_X, 1e6)[1] for p, width in zip(header_row, widths)
+        ) + CELL_PADDING_Y
+        extra_style = list(style or [])
+        try:
+            TableStyle(extra_style)
+        except Exception:
+            # не падаємо, якщо стиль некоректний
+            extra_style = []
+        table = PagedTable(
+            header_row, header_height, table_data, self.context.fast_table_style + extra_style,
+            first_row=first_row,
+        )
+        table.source = parallel_table_source(headers, data, widths, extra_style, table_data.numeric_columns)
+        return table
+
     def _format_number(self, value):
-        if isinstance(value, Decimal):
-            value = float(value)
-        if isinstance(value, float):
-            # формат: групування пробілами і кома як десятковий роздільник
-            # якщо ціле число — показуємо без дробової частини
-            if value.is_integer():
-                return f"{int(value):,}".replace(',', ' ')
-            return f"{value:,.3f}".replace(',', ' ').replace('.', ',')
-        return str(value)
+        # формат: групування пробілами і кома як десятковий роздільник (кешується)
+        return format_number(value)
+
+    def frame_height(self):
+        """Висота, доступна flowable на порожній сторінці (рамка без відступів Frame по 6 pt)."""
+        return self.page_height - 2 * self.margin_y - 12
+
+    def render(self, elements, buffer, page_offset=0):
+        """Малює elements у buffer як окремий PDF; повертає кількість сторінок."""
+        self.page_offset = page_offset
+        try:
+            self.doc = SimpleDocTemplate(
+                buffer, pagesize=self.pagesize,
+                rightMargin=self.margin_x, leftMargin=self.margin_x,
+                topMargin=self.margin_y, bottomMargin=self.margin_y,
+                title=self.title
+            )
+            self.doc.build(elements, onFirstPage=self._header_footer, onLaterPages=self._header_footer)
+        finally:
+            self.page_offset = 0
+        return self.doc.page
 
     def build(self):
-        self.doc = SimpleDocTemplate(
-            self.buffer, pagesize=self.pagesize,
-            rightMargin=self.margin_x, leftMargin=self.margin_x,
-            topMargin=self.margin_y, bottomMargin=self.margin_y,
-            title=self.title
-        )
-        self.doc.build(self.elements, onFirstPage=self._header_footer, onLaterPages=self._header_footer)
+        # Найдовші таблиці формуються частинами в пулі процесів; None — звичайна побудова
+        self.page_count = build_parallel(self)
+        if self.page_count is None:
+            self.page_count = self.render(self.elements, self.buffer)
         self.buffer.seek(0)
         return self.buffer
 
@@ -343,41 +528,6 @@ class PDFReportGenerator:
 class ReportPDFBuilder:
     """Логіка побудови конкретних звітів та графіків"""
 
-    @staticmethod
-    def _create_bar_chart(labels, values, title, xlabel, ylabel):
-        """Генерує стовпчасту діаграму"""
-        fig, ax = plt.subplots(figsize=(10, 5))
-
-        # Обмежимо кількість стовпчиків, щоб графік не був перевантажений
-        if len(labels) > 15:
-            labels = labels[:15]
-            values = values[:15]
-            title += " (Топ 15)"
-
-        bars = ax.bar(labels, values, color='#2563eb', alpha=0.8)
-
-        ax.set_title(title, pad=20)
-        ax.set_xlabel(xlabel)
-        ax.set_ylabel(ylabel)
-
-        # Сітка
-        ax.grid(axis='y', linestyle='--', alpha=0.7)
-        ax.set_axisbelow(True)
-
-        # Поворот підписів
-        plt.xticks(rotation=45, ha='right')
-
-        # Додавання значень над стовпчиками
-        for bar in bars:
-            height = bar.get_height()
-            ax.annotate(f'{height:.1f}',
-                        xy=(bar.get_x() + bar.get_width() / 2, height),
-                        xytext=(0, 3),
-                        textcoords="offset points",
-                        ha='center', va='bottom', fontsize=8)
-
-        return fig
-
     @staticmethod
     def build_balance_report(data, date=None, filters=None):
         filters = filters or {}
@@ -399,11 +549,10 @@ class ReportPDFBuilder:
             labels = [k for k, v in sorted_items]
             values = [v for k, v in sorted_items]
 
-            fig = ReportPDFBuilder._create_bar_chart(
-                labels, values,
+            generator.add_chart(
+                'bar', labels, values,
                 "Розподіл залишків", "Місце / Культура", "Кількість (т)"
             )
-            generator.add_plot(fig)
 
         # Таблиця та підсумки (без змін)
         if data.get('aggregation'):
@@ -440,11 +589,10 @@ class ReportPDFBuilder:
             labels = [k for k, v in sorted_dates]
             values = [v for k, v in sorted_dates]
 
-            fig = ReportPDFBuilder._create_bar_chart(
-                labels, values,
+            generator.add_chart(
+                'bar', labels, values,
                 "Динаміка надходжень", "Дата", "Вага (т)"
             )
-            generator.add_plot(fig)
 
         if data.get('aggregation'):
             summary = {'Всього': f"{data['aggregation'].get('total_weight', 0):.3f} т"}
@@ -519,24 +667,11 @@ class ReportPDFBuilder:
                 labels.append(f"{item.get('culture', '—')} ({item.get('place', '—')})")
                 values.append(item['change'])
 
-            fig, ax = plt.subplots(figsize=(10, 5))
-            colors_list = ['#10b981' if v >= 0 else '#ef4444' for v in values]
-            bars = ax.bar(labels, values, color=colors_list, alpha=0.8)
-            ax.set_title("Топ змін залишків", pad=20)
-            ax.axhline(0, color='black', linewidth=0.8)
-            ax.grid(axis='y', linestyle='--', alpha=0.5)
-            plt.xticks(rotation=45, ha='right')
-
-            for bar in bars:
-                height = bar.get_height()
-                offset = 3 if height >= 0 else -12
-                ax.annotate(f'{height:+.1f}',
-                            xy=(bar.get_x() + bar.get_width() / 2, height),
-                            xytext=(0, offset),
-                            textcoords="offset points",
-                            ha='center', va='bottom', fontsize=8)
-
-            generator.add_plot(fig)
+            generator.add_chart(
+                'bar', labels, values, "Топ змін залишків",
+                bar_colors=['#10b981' if v >= 0 else '#ef4444' for v in values],
+                signed=True,
+            )
 
         # --- 3. Таблиця ---
         headers = ['Місце', 'Культура', 'Початок (т)', 'Кінець (т)', 'Зміна (т)', 'Зміна (%)']
@@ -557,13 +692,7 @@ class ReportPDFBuilder:
                 labels = list(agg.keys())
                 values = list(agg.values())
 
-                fig, ax = plt.subplots(figsize=(8, 4))
-                ax.pie(values, labels=labels, autopct='%1.1f%%', startangle=90,
-                       colors=['#3b82f6', '#10b981', '#f59e0b'],
-                       textprops={'fontsize': 10})
-                ax.set_title("Співвідношення операцій")
-
-                generator.add_plot(fig)
+                generator.add_chart('pie', labels, values, "Співвідношення операцій")
 
         headers = ['Дата', 'Тип', 'Культура', 'Звідки', 'Куди', 'Вага']
         table_data = [[r.get('date'), r.get('action_type'), r.get('culture'),
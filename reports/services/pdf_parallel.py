@@ -0,0 +1,206 @@
+"""
+Паралельне формування найдовших PDF-звітів.
+
+ReportLab малює документ в одному потоці і тримає GIL, тому велика таблиця
+(журнал вагової за сезон — десятки тисяч рядків) ділиться на частини (до
+REPORT_PDF_PARALLEL_CHUNK_ROWS рядків), кожна малюється в окремому процесі пулу
+(REPORT_PDF_PARALLEL_WORKERS), а готові частини склеюються PyPDF2 в один PDF.
+
+Частини не змінюють вигляд звіту: початок звіту з першою сторінкою таблиці і
+остання сторінка таблиці з рештою звіту малюються в поточному процесі, а в пул
+ідуть цілі сторінки між ними. Висоти рядків швидкої таблиці відомі заздалегідь,
+тож поділ на сторінки (`PagedTable.page_breaks`) і номер першої сторінки кожної
+частини рахуються до малювання, і колонтитул "Сторінка N" кожен процес малює
+сам. Якщо кількість сторінок частини не збіглась з розрахунком, пул недоступний
+або частина впала з помилкою, звіт будується звичайним способом.
+
+Процеси пулу запускаються через spawn, тому цей модуль не імпортує моделі й
+генератор на рівні модуля.
+"""
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from decimal import Decimal
+from io import BytesIO
+from multiprocessing import util
+
+from django.conf import settings
+
+
+# У процеси пулу передаються лише таблиці з простих значень (без Paragraph)
+CELL_TYPES = (str, int, float, Decimal, type(None))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def parallel_workers():
+    """
+    Скільки процесів малюють частини таблиці: REPORT_PDF_PARALLEL_WORKERS, але не
+    більше ядер процесора (0 або 1 — паралельне формування вимкнено).
+    """
+    return min(getattr(settings, 'REPORT_PDF_PARALLEL_WORKERS', 0), os.cpu_count() or 1)
+
+
+def parallel_table_source(headers, rows, widths, style, numeric_columns):
+    """
+    Дані швидкої таблиці для процесів пулу або None, якщо таблиця коротка
+    (менше REPORT_PDF_PARALLEL_ROWS рядків) чи містить не прості значення.
+    """
+    if parallel_workers() < 2 or len(rows) < getattr(settings, 'REPORT_PDF_PARALLEL_ROWS', 20000):
+        return None
+    if not all(isinstance(cell, CELL_TYPES) for row in rows for cell in row):
+        return None
+    return {
+        'headers': [str(header) for header in headers],
+        'rows': rows,
+        'widths': list(widths),
+        'style': style,
+        'numeric_columns': numeric_columns,
+    }
+
+
+def _init_worker():
+    # Процес пулу запускається "з нуля" (spawn) — Django треба налаштувати в ньому
+    import django
+    django.setup()
+
+    from .pdf_generator import warm_up
+    warm_up()
+
+
+def _executor_instance():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=parallel_workers(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+            )
+            # У процесі пулу воркера звітів multiprocessing на виході чекає дочірні процеси
+            # ще до того, як concurrent.futures зупинить пул, — зупиняємо його раніше
+            # (і раніше, ніж закриються черги пулу: їхній пріоритет — 10)
+            util.Finalize(_executor, _executor.shutdown, kwargs={'cancel_futures': True}, exitpriority=100)
+        return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _render_chunk(title, orientation, generated_at, spec, page_offset):
+    """Малює частину таблиці в процесі пулу; повертає (PDF-байти, кількість сторінок)."""
+    from .pdf_generator import PDFReportGenerator
+
+    generator = PDFReportGenerator(title, orientation=orientation)
+    generator.generated_at = generated_at
+    table = generator._fast_table(
+        spec['headers'], spec['rows'], spec['widths'], spec['style'],
+        numeric_columns=spec['numeric_columns'], first_row=spec['first_row'],
+    )
+    buffer = BytesIO()
+    pages = generator.render([table], buffer, page_offset=page_offset)
+    return buffer.getvalue(), pages
+
+
+def _chunks(breaks, stop, workers):
+    """
+    Групує сторінки (номери їхніх перших рядків) у частини: [(рядок, сторінок)].
+    Частини — не більше REPORT_PDF_PARALLEL_CHUNK_ROWS рядків, а їхня кількість
+    кратна кількості процесів, щоб процеси пулу завершували роботу одночасно.
+    """
+    rows = stop - breaks[0]
+    limit = getattr(settings, 'REPORT_PDF_PARALLEL_CHUNK_ROWS', 4000)
+    rounds = math.ceil(rows / (workers * limit))
+    chunk_rows = math.ceil(rows / (workers * rounds))
+    chunks = []
+    for start in breaks:
+        if not chunks or start - chunks[-1][0] >= chunk_rows:
+            chunks.append([start, 0])
+        chunks[-1][1] += 1
+    return chunks
+
+
+def build_parallel(generator):
+    """
+    Формує PDF генератора частинами в пулі процесів і записує результат у
+    `generator.buffer`. Повертає кількість сторінок або None, якщо звіт треба
+    будувати звичайним способом.
+    """
+    index = next(
+        (i for i, element in enumerate(generator.elements) if getattr(element, 'source', None)), None
+    )
+    if index is None:
+        return None
+    try:
+        from PyPDF2 import PdfReader, PdfWriter
+    except ImportError:
+        return None
+
+    table = generator.elements[index]
+    source = table.source
+
+    # Початок звіту і перша сторінка таблиці: від них залежить, з якого рядка і сторінки піде решта
+    head = table.copy(head_only=True)
+    head_pdf = BytesIO()
+    page = generator.render(generator.elements[:index] + [head], head_pdf)
+
+    breaks = table.page_breaks(generator.frame_height(), head.stop)
+    if not breaks or len(breaks) < 2:
+        return None
+    last = breaks[-1]
+
+    chunks = _chunks(breaks[:-1], last, parallel_workers())
+    futures = []
+    try:
+        executor = _executor_instance()
+        for (start, pages), stop in zip(chunks, [chunk[0] for chunk in chunks[1:]] + [last]):
+            spec = dict(source, rows=source['rows'][start:stop], first_row=start)
+            future = executor.submit(
+                _render_chunk, generator.title, generator.orientation, generator.generated_at, spec, page,
+            )
+            futures.append((future, pages))
+            page += pages
+    except (BrokenProcessPool, RuntimeError, OSError):
+        _reset_executor()
+        return None
+
+    # Поки пул малює середину, тут — остання сторінка таблиці і все, що після неї
+    tail_pdf = BytesIO()
+    total = page + generator.render([table.copy(last)] + generator.elements[index + 1:], tail_pdf, page_offset=page)
+
+    parts = [head_pdf.getvalue()]
+    for future, pages in futures:
+        try:
+            pdf, rendered = future.result()
+        except Exception as e:
+            if not future.done():
+                # Очікування перервано ззовні (наприклад, таймаут звіту у воркері) — не ковтаємо
+                raise
+            rendered = None
+            if isinstance(e, BrokenProcessPool):
+                _reset_executor()
+        if rendered != pages:
+            # Частина впала або поділ на сторінки не збігся з розрахунком (нумерація була б неправильною)
+            for other, _ in futures:
+                other.cancel()
+            return None
+        parts.append(pdf)
+    parts.append(tail_pdf.getvalue())
+
+    writer = PdfWriter()
+    for part in parts:
+        for pdf_page in PdfReader(BytesIO(part)).pages:
+            writer.add_page(pdf_page)
+    writer.add_metadata({'/Title': generator.title})
+    generator.buffer = BytesIO()
+    writer.write(generator.buffer)
+    return total
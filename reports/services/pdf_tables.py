@@ -0,0 +1,199 @@
+"""
+Швидкі таблиці для великих PDF-звітів.
+
+Звичайна таблиця (`PDFReportGenerator.add_table`) обгортає кожну клітинку в
+`Paragraph`, а одна велика `Table` при кожному переносі на нову сторінку
+заново міряє всі рядки, що лишились, — на десятках тисяч рядків це хвилини.
+
+Тут клітинки — звичайні рядки (шрифт і розмір задає стиль таблиці), а
+`Paragraph` лишається лише для тексту, що не вміщується в стовпець або містить
+розмітку. Висота кожного рядка відома заздалегідь, тож `PagedTable` ділить
+таблицю рівно по сторінках: на кожну сторінку будується окрема невелика
+`LongTable` з повтором заголовка, і загальний час росте лінійно з кількістю
+рядків.
+"""
+from bisect import bisect_right
+from decimal import Decimal
+from functools import lru_cache
+
+from reportlab.lib.colors import HexColor, white
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Flowable, LongTable, Paragraph
+
+
+# Розмір шрифту, інтерліньяж і відступи клітинок — як у стилів TableCell і таблиці звітів
+CELL_FONT_SIZE = 9
+CELL_LEADING = 12
+CELL_PADDING_X = 4 + 4
+CELL_PADDING_Y = 3 + 3
+
+NUMBER_TYPES = (int, float, Decimal)
+
+
+@lru_cache(maxsize=65536)
+def format_number(value):
+    """Число для таблиці: групування пробілами, кома як десятковий роздільник."""
+    if isinstance(value, Decimal):
+        value = float(value)
+    if isinstance(value, float):
+        # якщо ціле число — показуємо без дробової частини
+        if value.is_integer():
+            return f"{int(value):,}".replace(',', ' ')
+        return f"{value:,.3f}".replace(',', ' ').replace('.', ',')
+    return str(value)
+
+
+def _needs_paragraph(text):
+    # Розмітка (<font>, &amp;) і переноси рядків працюють лише в Paragraph
+    return '<' in text or '&' in text or '\n' in text
+
+
+class FastTableData:
+    """
+    Рядки таблиці у вигляді для `LongTable` і висота кожного рядка.
+
+    Числа — відформатовані рядки (стовпці лише з чисел вирівнюються праворуч),
+    текст — рядки, якщо вміщується в стовпець; інакше `Paragraph`.
+    """
+
+    def __init__(self, rows, widths, font_name, cell_style, cell_right_style, numeric_columns=None):
+        self.widths = widths
+        columns = len(widths)
+        if numeric_columns is None:
+            # Для частини таблиці (паралельне формування) стовпці визначені по всій таблиці
+            numeric_columns = [
+                col for col in range(columns)
+                if any(isinstance(row[col], NUMBER_TYPES) for row in rows)
+                and all(row[col] is None or isinstance(row[col], NUMBER_TYPES) for row in rows)
+            ]
+        self.numeric_columns = numeric_columns
+        numeric = set(self.numeric_columns)
+        line_height = CELL_LEADING + CELL_PADDING_Y
+
+        # Ширина тексту однакова для однакових значень (місця, культури, водії)
+        fits = {}
+
+        def fits_in(col, text):
+            key = (col, text)
+            if key not in fits:
+                fits[key] = stringWidth(text, font_name, CELL_FONT_SIZE) <= widths[col] - CELL_PADDING_X
+            return fits[key]
+
+        self.rows = []
+        self.heights = []
+        for row in rows:
+            cells = []
+            height = line_height
+            for col, cell in enumerate(row):
+                if isinstance(cell, Paragraph):
+                    value = cell
+                elif isinstance(cell, NUMBER_TYPES):
+                    text = format_number(cell)
+                    value = text if col in numeric else Paragraph(text, cell_right_style)
+                else:
+                    text = str(cell) if cell is not None else '—'
+                    value = text if fits_in(col, text) and not _needs_paragraph(text) else Paragraph(text, cell_style)
+
+                if isinstance(value, Paragraph):
+                    height = max(height, value.wrap(widths[col] - CELL_PADDING_X, 1e6)[1] + CELL_PADDING_Y)
+                cells.append(value)
+            self.rows.append(cells)
+            self.heights.append(height)
+
+
+class PagedTable(Flowable):
+    """
+    Таблиця, що ділиться по сторінках: `split` віддає `LongTable` з рядками,
+    які вміщуються на поточну сторінку, і `PagedTable` з рештою рядків.
+
+    `style` — команди TableStyle для кожної частини (діапазони мають бути
+    відносними, як (0, 0)-(-1, -1), а не номерами рядків усієї таблиці).
+    `first_row` — номер першого рядка `data` в усій таблиці (для смуг рядків,
+    коли таблиця формується частинами). З `head_only` малюється лише перша
+    сторінка, а `stop` після побудови — номер першого рядка, що не ввійшов.
+    """
+
+    def __init__(self, header_row, header_height, data, style, start=0, offsets=None,
+                 first_row=0, head_only=False):
+        super().__init__()
+        self.header_row = header_row
+        self.header_height = header_height
+        self.data = data
+        self.style = style
+        self.start = start
+        self.first_row = first_row
+        self.head_only = head_only
+        self.stop = None
+        if offsets is None:
+            # offsets[i] — сумарна висота рядків до i-го
+            offsets = [0]
+            for height in data.heights:
+                offsets.append(offsets[-1] + height)
+        self.offsets = offsets
+        self.width = sum(data.widths)
+
+    def _height(self, stop):
+        return self.header_height + self.offsets[stop] - self.offsets[self.start]
+
+    def _table(self, stop):
+        style = list(self.style)
+        if (self.first_row + self.start) % 2:
+            # Смуги рядків продовжуються з попередньої сторінки
+            style.append(('ROWBACKGROUNDS', (0, 1), (-1, -1), [HexColor('#f8fafc'), white]))
+        for col in self.data.numeric_columns:
+            style.append(('ALIGN', (col, 1), (col, -1), 'RIGHT'))
+        return LongTable(
+            [self.header_row] + self.data.rows[self.start:stop],
+            colWidths=self.data.widths,
+            rowHeights=[self.header_height] + self.data.heights[self.start:stop],
+            repeatRows=1,
+            style=style,
+        )
+
+    def _fits(self, start, available):
+        # Скільки рядків від start вміщується під заголовком (пошук по накопичених висотах)
+        limit = self.offsets[start] + available - self.header_height
+        return bisect_right(self.offsets, limit) - 1
+
+    def copy(self, start=None, head_only=False):
+        """Та сама таблиця від рядка `start` (без повторного вимірювання рядків)."""
+        return PagedTable(
+            self.header_row, self.header_height, self.data, self.style,
+            self.start if start is None else start, self.offsets, self.first_row, head_only,
+        )
+
+    def page_breaks(self, frame_height, start=None):
+        """
+        Номери перших рядків кожної сторінки, якщо таблиця (від рядка `start`)
+        починається з нової сторінки висотою `frame_height` — так само, як її
+        поділить `split`. None — якщо рядок не вміщується навіть на порожню сторінку.
+        """
+        start = self.start if start is None else start
+        breaks = []
+        while start < len(self.data.rows):
+            stop = self._fits(start, frame_height)
+            if stop <= start:
+                return None
+            breaks.append(start)
+            start = stop
+        return breaks
+
+    def wrap(self, availWidth, availHeight):
+        self.height = self._height(len(self.data.rows))
+        self.stop = len(self.data.rows)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        stop = self._fits(self.start, availHeight)
+        if stop <= self.start:
+            return []
+        self.stop = stop
+        parts = [self._table(stop)]
+        if stop < len(self.data.rows) and not self.head_only:
+            parts.append(self.copy(stop))
+        return parts
+
+    def draw(self):
+        table = self._table(len(self.data.rows))
+        table.wrapOn(self.canv, self.width, self.height)
+        table.drawOn(self.canv, 0, 0)
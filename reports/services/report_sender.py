@@ -1,4 +1,3 @@
-import requests
 import base64
 from datetime import date, datetime
 from decimal import Decimal
@@ -45,6 +44,9 @@ class ReportSenderService:
             "pdf_base64": pdf_base64,
         }
 
+        # requests потрібен лише тут — не імпортуємо його під час старту Django
+        import requests
+
         response = requests.post(
             url,
             json=payload,   # ✅ JSON!
@@ -1,9 +1,14 @@
+from django.core import signing
 from django.db.models import Sum, Count, Avg, Q
 from datetime import datetime, timedelta
-from balances.models import Balance, BalanceHistory, BalanceSnapshot
-from logistics.models import WeigherJournal, ShipmentJournal, FieldsIncome, OtherIncome
+from balances.models import Balance, BalanceHistory, BalanceMovement, BalanceSnapshot, DailyBalance
+from balances.services import BalanceService
+from logistics.models import (
+    WeigherJournal, ShipmentJournal, FieldsIncome, OtherIncome, ShipmentAction, JournalKind, DailyMovementRollup,
+)
 from waste.models import Utilization, Recycling
 from directory.models import Culture, Place
+from .dates import date_range
 import csv
 from io import StringIO, BytesIO
 
@@ -12,49 +17,35 @@ class ReportService:
     """Сервіс для генерації звітів"""
     
     @staticmethod
-    def get_balance_report(date_from=None, date_to=None, filters=None):
-        """Звіт по залишках (поточний стан)"""
-        queryset = Balance.objects.select_related('place', 'culture').all()
-        
-        if filters:
-            if filters.get('place_id'):
-                queryset = queryset.filter(place_id=filters['place_id'])
-            if filters.get('culture_id'):
-                queryset = queryset.filter(culture_id=filters['culture_id'])
-            if filters.get('balance_type'):
-                queryset = queryset.filter(balance_type=filters['balance_type'])
+    def get_balance_report(date_from=None, date_to=None, filters=None, aggregate_only=False):
+        """Звіт по залишках (поточний стан).
+
+        `aggregate_only=True` — без рядків деталізації, лише агрегати (для дашбордів і графіків).
+        """
+        queryset = ReportService.report_queryset('balance', date_from, date_to, filters)
         
         data = []
-        for balance in queryset:
-            data.append({
-                'place': balance.place.name,
-                'culture': balance.culture.name,
-                'type': balance.get_balance_type_display(),
-                'quantity': float(balance.quantity),
-            })
+        if not aggregate_only:
+            for balance in queryset:
+                data.append({
+                    'place': balance.place.name,
+                    'culture': balance.culture.name,
+                    'type': balance.get_balance_type_display(),
+                    'quantity': float(balance.quantity),
+                })
         
-        # Агрегація для графіків
+        # Агрегація для графіків — GROUP BY у БД, а не цикл по рядках
+        total_quantity, total_rows = ReportService._totals(queryset, 'quantity')
         aggregation = {
-            'total_quantity': sum(item['quantity'] for item in data) if data else 0,
-            'by_place': {},
-            'by_culture': {},
+            'total_quantity': total_quantity,
+            'by_place': ReportService._group_sum(queryset, ['place__name'], 'quantity'),
+            'by_culture': ReportService._group_sum(queryset, ['culture__name'], 'quantity'),
         }
         
-        for item in data:
-            # По місцях
-            if item['place'] not in aggregation['by_place']:
-                aggregation['by_place'][item['place']] = 0
-            aggregation['by_place'][item['place']] += item['quantity']
-            
-            # По культурах
-            if item['culture'] not in aggregation['by_culture']:
-                aggregation['by_culture'][item['culture']] = 0
-            aggregation['by_culture'][item['culture']] += item['quantity']
-        
         return {
             'data': data,
             'aggregation': aggregation,
-            'total_rows': len(data),
+            'total_rows': total_rows,
         }
         
     @staticmethod
@@ -63,18 +54,11 @@ class ReportService:
         [FIX] Звіт по залишках на конкретну дату (на основі BalanceSnapshot).
         Помилка, про яку ви повідомили, виправляється цим методом.
         """
-        queryset = snapshot.history_records.select_related('place', 'culture').all()
-        
-        if filters:
-            if place_id := filters.get('place_id'):
-                queryset = queryset.filter(place_id=place_id)
-            if culture_id := filters.get('culture_id'):
-                queryset = queryset.filter(culture_id=culture_id)
-            if balance_type := filters.get('balance_type'):
-                queryset = queryset.filter(balance_type=balance_type)
+        # Для дельта-зліпка записи матеріалізуються з ланцюжка батьків
+        records = snapshot.get_records(filters)
 
         data = []
-        for history in queryset:
+        for history in records:
             data.append({
                 'place': history.place.name,
                 'culture': history.culture.name,
@@ -105,6 +89,35 @@ class ReportService:
             'snapshot_date': snapshot.snapshot_date.strftime('%d.%m.%Y'),
         }
 
+    @staticmethod
+    def get_balance_on_date(date, filters=None):
+        """Звіт по залишках на кінець дня `date` з матеріалізованої таблиці DailyBalance."""
+        data = []
+        for row in BalanceService.get_balances_on_date(date, filters):
+            data.append({
+                'place': row.place.name,
+                'culture': row.culture.name,
+                'type': row.get_balance_type_display(),
+                'quantity': float(row.closing),
+            })
+
+        aggregation = {
+            'total_quantity': sum(item['quantity'] for item in data) if data else 0,
+            'by_place': {},
+            'by_culture': {},
+        }
+
+        for item in data:
+            aggregation['by_place'][item['place']] = aggregation['by_place'].get(item['place'], 0) + item['quantity']
+            aggregation['by_culture'][item['culture']] = aggregation['by_culture'].get(item['culture'], 0) + item['quantity']
+
+        return {
+            'data': data,
+            'aggregation': aggregation,
+            'total_rows': len(data),
+            'snapshot_date': date.strftime('%d.%m.%Y'),
+        }
+
     @staticmethod
     def get_balance_period_data(start_snapshot, end_snapshot, filters=None):
         """
@@ -166,318 +179,274 @@ class ReportService:
     # ... (інші методи get_waste_report, get_weigher_report)
     
     @staticmethod
-    def get_waste_report(date_from=None, date_to=None, filters=None):
+    def get_waste_report(date_from=None, date_to=None, filters=None, aggregate_only=False):
         """Звіт по відходах"""
-        queryset = Balance.objects.filter(
-            balance_type='waste'
-        ).select_related('place', 'culture')
-        
-        if filters:
-            if filters.get('place_id'):
-                queryset = queryset.filter(place_id=filters['place_id'])
-            if filters.get('culture_id'):
-                queryset = queryset.filter(culture_id=filters['culture_id'])
+        queryset = ReportService.report_queryset('waste', date_from, date_to, filters)
         
         data = []
-        for balance in queryset:
-            data.append({
-                'place': balance.place.name,
-                'culture': balance.culture.name,
-                'quantity': float(balance.quantity),
-            })
+        if not aggregate_only:
+            for balance in queryset:
+                data.append({
+                    'place': balance.place.name,
+                    'culture': balance.culture.name,
+                    'quantity': float(balance.quantity),
+                })
         
+        total_waste, total_rows = ReportService._totals(queryset, 'quantity')
         aggregation = {
-            'total_waste': sum(item['quantity'] for item in data) if data else 0,
-            'by_place': {},
+            'total_waste': total_waste,
+            'by_place': ReportService._group_sum(queryset, ['place__name'], 'quantity'),
         }
         
-        for item in data:
-            if item['place'] not in aggregation['by_place']:
-                aggregation['by_place'][item['place']] = 0
-            aggregation['by_place'][item['place']] += item['quantity']
-        
         return {
             'data': data,
             'aggregation': aggregation,
-            'total_rows': len(data),
+            'total_rows': total_rows,
         }
     
     @staticmethod
-    def get_weigher_report(date_from=None, date_to=None, filters=None):
+    def get_weigher_report(date_from=None, date_to=None, filters=None, aggregate_only=False):
         """Звіт по внутрішніх переміщеннях"""
-        queryset = WeigherJournal.objects.select_related(
-            'from_place', 'to_place', 'culture', 'car', 'driver'
-        ).all()
-        
-        if date_from:
-            queryset = queryset.filter(date_time__date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(date_time__date__lte=date_to)
-        
-        if filters:
-            if filters.get('from_place_id'):
-                queryset = queryset.filter(from_place_id=filters['from_place_id'])
-            if filters.get('to_place_id'):
-                queryset = queryset.filter(to_place_id=filters['to_place_id'])
-            if filters.get('culture_id'):
-                queryset = queryset.filter(culture_id=filters['culture_id'])
+        queryset = ReportService.report_queryset('weigher', date_from, date_to, filters)
         
         data = []
-        for journal in queryset:
-            data.append({
-                'date': journal.date_time.strftime('%d.%m.%Y'),
-                'document': journal.document_number or '—',
-                'from_place': journal.from_place.name if journal.from_place else '—',
-                'to_place': journal.to_place.name if journal.to_place else '—',
-                'culture': journal.culture.name if journal.culture else '—',
-                'weight_net': float(journal.weight_net) if journal.weight_net else 0.0,
-                'driver': journal.driver.full_name if journal.driver else '—',
-                'car': journal.car.number if journal.car else '—',
-            })
+        if not aggregate_only:
+            for journal in queryset:
+                data.append({
+                    'date': journal.date_time.strftime('%d.%m.%Y'),
+                    'document': journal.document_number or '—',
+                    'from_place': journal.from_place.name if journal.from_place else '—',
+                    'to_place': journal.to_place.name if journal.to_place else '—',
+                    'culture': journal.culture.name if journal.culture else '—',
+                    'weight_net': float(journal.weight_net) if journal.weight_net else 0.0,
+                    'driver': journal.driver.full_name if journal.driver else '—',
+                    'car': journal.car.number if journal.car else '—',
+                })
         
+        rollup = ReportService._rollup_queryset(JournalKind.WEIGHER, date_from, date_to, filters, aggregate_only)
+        total_weight, total_rows, by_culture = ReportService._journal_totals(queryset, rollup)
         aggregation = {
-            'total_weight': sum(item['weight_net'] for item in data) if data else 0,
-            'by_culture': {},
-            'by_route': {},
-        }
-        
-        for item in data:
-            # По культурах
-            culture = item['culture']
-            if culture not in aggregation['by_culture']:
-                aggregation['by_culture'][culture] = 0
-            aggregation['by_culture'][culture] += item['weight_net']
-            
+            'total_weight': total_weight,
+            'by_culture': by_culture,
             # По маршрутах
-            route = f"{item['from_place']} → {item['to_place']}"
-            if route not in aggregation['by_route']:
-                aggregation['by_route'][route] = 0
-            aggregation['by_route'][route] += item['weight_net']
+            'by_route': ReportService._group_sum(
+                queryset, ['from_place__name', 'to_place__name'],
+                label=lambda from_place, to_place: f"{from_place or '—'} → {to_place or '—'}",
+            ),
+        }
         
         return {
             'data': data,
             'aggregation': aggregation,
-            'total_rows': len(data),
+            'total_rows': total_rows,
         }
     
     @staticmethod
-    def get_shipment_report(date_from=None, date_to=None, place_to=None, filters=None):
+    def get_shipment_report(date_from=None, date_to=None, place_to=None, filters=None, aggregate_only=False):
         """Звіт по відвантаженням"""
-        queryset = ShipmentJournal.objects.select_related(
-            'place_from', 'place_to', 'culture', 'car', 'driver'
-        ).all()
-        
-        if date_from:
-            queryset = queryset.filter(date_time__date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(date_time__date__lte=date_to)
-        
-        if filters:
-            if filters.get('action_type'):
-                queryset = queryset.filter(action_type=filters['action_type'])
-            if filters.get('culture_id'):
-                queryset = queryset.filter(culture_id=filters['culture_id'])
-            if filters.get('place_to_id'):
-                queryset = queryset.filter(place_to_id=filters['place_to_id'])
+        queryset = ReportService.report_queryset('shipment', date_from, date_to, filters)
         
         data = []
-        for journal in queryset:
-            data.append({
-                'date': journal.date_time.strftime('%d.%m.%Y'),
-                'time': journal.date_time.strftime('%H:%M'),
-                'document': journal.document_number or '—',
-                'action_type': journal.get_action_type_display() if journal.action_type else '—',
-
-                'place_from': ReportService._resolve_place(
-                    journal.place_from,
-                    journal.place_from_text
-                ),
-
-                'place_to': ReportService._resolve_place(
-                    journal.place_to,
-                    journal.place_to_text
-                ),
-
-                'culture': journal.culture.name if journal.culture else '—',
-                'weight_net': float(journal.weight_net or 0),
-            })
-
-        
+        if not aggregate_only:
+            for journal in queryset:
+                data.append({
+                    'date': journal.date_time.strftime('%d.%m.%Y'),
+                    'time': journal.date_time.strftime('%H:%M'),
+                    'document': journal.document_number or '—',
+                    'action_type': journal.get_action_type_display() if journal.action_type else '—',
+
+                    'place_from': ReportService._resolve_place(
+                        journal.place_from,
+                        journal.place_from_text
+                    ),
+
+                    'place_to': ReportService._resolve_place(
+                        journal.place_to,
+                        journal.place_to_text
+                    ),
+
+                    'culture': journal.culture.name if journal.culture else '—',
+                    'weight_net': float(journal.weight_net or 0),
+                })
+
+        rollup = ReportService._rollup_queryset(JournalKind.SHIPMENT, date_from, date_to, filters, aggregate_only)
+        total_weight, total_rows, by_culture = ReportService._journal_totals(queryset, rollup)
         aggregation = {
-            'total_weight': sum(item['weight_net'] for item in data) if data else 0,
-            'by_action': {},
-            'by_culture': {},
+            'total_weight': total_weight,
+            # По типу дії (підпис як у get_action_type_display)
+            'by_action': ReportService._group_sum(
+                queryset if rollup is None else rollup,
+                ['action_type' if rollup is None else 'action'],
+                'weight_net' if rollup is None else 'weight',
+                label=lambda action: ShipmentAction(action).label if action else '—',
+            ),
+            'by_culture': by_culture,
         }
         
-        for item in data:
-            # По типу дії
-            action_type = item['action_type']
-            if action_type not in aggregation['by_action']:
-                aggregation['by_action'][action_type] = 0
-            aggregation['by_action'][action_type] += item['weight_net']
-            
-            # По культурах
-            culture = item['culture']
-            if culture not in aggregation['by_culture']:
-                aggregation['by_culture'][culture] = 0
-            aggregation['by_culture'][culture] += item['weight_net']
-        
         return {
             'data': data,
             'aggregation': aggregation,
-            'total_rows': len(data),
+            'total_rows': total_rows,
         }
         
     @staticmethod
-    def get_shipment_summary_data(date_from=None, date_to=None, filters=None):
+    def get_shipment_summary_data(date_from=None, date_to=None, filters=None, aggregate_only=False):
         """
         [NEW ALIAS] Псевдонім для get_shipment_report. 
         Використовується в get_total_income_period_data.
         """
-        return ReportService.get_shipment_report(date_from, date_to, filters)
+        return ReportService.get_shipment_report(date_from, date_to, filters=filters, aggregate_only=aggregate_only)
 
     @staticmethod
-    def get_fields_report(date_from=None, date_to=None, filters=None):
+    def get_fields_report(date_from=None, date_to=None, filters=None, aggregate_only=False):
         """Звіт по надходженням з полів"""
-        queryset = FieldsIncome.objects.select_related(
-            'field', 'place_to', 'culture', 'car', 'driver'
-        ).all()
-        
-        if date_from:
-            queryset = queryset.filter(date_time__date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(date_time__date__lte=date_to)
-        
-        if filters:
-            if filters.get('field_id'):
-                queryset = queryset.filter(field_id=filters['field_id'])
-            if filters.get('culture_id'):
-                queryset = queryset.filter(culture_id=filters['culture_id'])
+        queryset = ReportService.report_queryset('fields', date_from, date_to, filters)
         
         data = []
-        for journal in queryset:
-            data.append({
-                'date': journal.date_time.strftime('%d.%m.%Y'),
-                'time': journal.date_time.strftime('%H:%M'),
-                'document': journal.document_number or '—',
-                'field': journal.field.name if journal.field else '—',
-
-                'place_to': ReportService._resolve_place(
-                    journal.place_to
-                ),
-
-                'culture': journal.culture.name if journal.culture else '—',
-                'weight_net': float(journal.weight_net or 0),
-
-                # важливо для агрегацій
-                'place_from': journal.field.name if journal.field else '—',
-            })
+        if not aggregate_only:
+            for journal in queryset:
+                data.append({
+                    'date': journal.date_time.strftime('%d.%m.%Y'),
+                    'time': journal.date_time.strftime('%H:%M'),
+                    'document': journal.document_number or '—',
+                    'field': journal.field.name if journal.field else '—',
+
+                    'place_to': ReportService._resolve_place(
+                        journal.place_to
+                    ),
+
+                    'culture': journal.culture.name if journal.culture else '—',
+                    'weight_net': float(journal.weight_net or 0),
+
+                    # важливо для агрегацій
+                    'place_from': journal.field.name if journal.field else '—',
+                })
         
+        rollup = ReportService._rollup_queryset(JournalKind.FIELDS, date_from, date_to, filters, aggregate_only)
+        total_weight, total_rows, by_culture = ReportService._journal_totals(queryset, rollup)
         aggregation = {
-            'total_weight': sum(item['weight_net'] for item in data) if data else 0,
-            'by_field': {},
-            'by_culture': {},
+            'total_weight': total_weight,
+            'by_field': ReportService._group_sum(queryset, ['field__name']),
+            'by_culture': by_culture,
         }
         
-        for item in data:
-            # По полях
-            field_name = item['field']
-            if field_name not in aggregation['by_field']:
-                aggregation['by_field'][field_name] = 0
-            aggregation['by_field'][field_name] += item['weight_net']
-            
-            # По культурах
-            culture_name = item['culture']
-            if culture_name not in aggregation['by_culture']:
-                aggregation['by_culture'][culture_name] = 0
-            aggregation['by_culture'][culture_name] += item['weight_net']
-        
         return {
             'data': data,
             'aggregation': aggregation,
-            'total_rows': len(data),
+            'total_rows': total_rows,
         }
         
     @staticmethod
-    def get_field_income_data(date_from=None, date_to=None, filters=None):
+    def get_field_income_data(date_from=None, date_to=None, filters=None, aggregate_only=False):
         """
         [NEW ALIAS] Псевдонім для get_fields_report. 
         Використовується в get_total_income_period_data.
         """
-        return ReportService.get_fields_report(date_from, date_to, filters)
+        return ReportService.get_fields_report(date_from, date_to, filters, aggregate_only=aggregate_only)
     
     @staticmethod
-    def get_other_income_report(date_from=None, date_to=None, filters=None):
+    def get_other_income_report(date_from=None, date_to=None, filters=None, aggregate_only=False):
         """Звіт по іншим надходженням (від людей, продавців)"""
-        queryset = OtherIncome.objects.select_related(
-            'place_to', 'culture'
-        ).all()
-        
-        if date_from:
-            queryset = queryset.filter(date_time__date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(date_time__date__lte=date_to)
-        
-        if filters:
-            if filters.get('culture_id'):
-                queryset = queryset.filter(culture_id=filters['culture_id'])
-            # Accept both `place_to_id` (explicit) and `place_id` (generic "Місце")
-            if filters.get('place_to_id'):
-                queryset = queryset.filter(place_to_id=filters['place_to_id'])
-            if filters.get('place_id'):
-                queryset = queryset.filter(place_to_id=filters['place_id'])
+        queryset = ReportService.report_queryset('other_income', date_from, date_to, filters)
         
         data = []
-        for journal in queryset:
-            data.append({
-                'date': journal.date_time.strftime('%d.%m.%Y'),
-                'time': journal.date_time.strftime('%H:%M'),
-                'document': journal.document_number or '—',
-                'seller': journal.seller or '—',
-
-                'place_to': ReportService._resolve_place(
-                    journal.place_to
-                ),
-
-                'culture': journal.culture.name if journal.culture else '—',
-                'weight_net': float(journal.weight_net or 0),
-            })
+        if not aggregate_only:
+            for journal in queryset:
+                data.append({
+                    'date': journal.date_time.strftime('%d.%m.%Y'),
+                    'time': journal.date_time.strftime('%H:%M'),
+                    'document': journal.document_number or '—',
+                    'seller': journal.seller or '—',
+
+                    'place_to': ReportService._resolve_place(
+                        journal.place_to
+                    ),
+
+                    'culture': journal.culture.name if journal.culture else '—',
+                    'weight_net': float(journal.weight_net or 0),
+                })
         
+        rollup = ReportService._rollup_queryset(JournalKind.OTHER, date_from, date_to, filters, aggregate_only)
+        total_weight, total_rows, by_culture = ReportService._journal_totals(queryset, rollup)
         aggregation = {
-            'total_weight': sum(item['weight_net'] for item in data) if data else 0,
-            'by_seller': {},
-            'by_culture': {},
-        }   
-        
-        for item in data:
-            # По продавцях
-            seller = item['seller']
-            if seller not in aggregation['by_seller']:
-                aggregation['by_seller'][seller] = 0
-            aggregation['by_seller'][seller] += item['weight_net']
-            
-            # По культурах
-            culture_name = item['culture']
-            if culture_name not in aggregation['by_culture']:
-                aggregation['by_culture'][culture_name] = 0
-            aggregation['by_culture'][culture_name] += item['weight_net']
+            'total_weight': total_weight,
+            'by_seller': ReportService._group_sum(queryset, ['seller']),
+            'by_culture': by_culture,
+        }
             
         return {
             'data': data,
             'aggregation': aggregation,
-            'total_rows': len(data),
+            'total_rows': total_rows,
         }
 
     @staticmethod
-    def get_other_income_summary_data(date_from=None, date_to=None, filters=None):
+    def get_other_income_summary_data(date_from=None, date_to=None, filters=None, aggregate_only=False):
         """
         [NEW ALIAS] Псевдонім для get_other_income_report. 
         Використовується в get_total_income_period_data.
         """
-        return ReportService.get_other_income_report(date_from, date_to, filters)
+        return ReportService.get_other_income_report(date_from, date_to, filters, aggregate_only=aggregate_only)
 
         
         
+    @staticmethod
+    def report_queryset(report_type, date_from=None, date_to=None, filters=None):
+        """
+        Queryset рядків звіту `report_type` з застосованими періодом і фільтрами.
+
+        Спільний для побудови звіту і потокового експорту, щоб вони не розходились.
+        """
+        filters = filters or {}
+
+        if report_type in ('balance', 'waste'):
+            queryset = Balance.objects.select_related('place', 'culture').all()
+            if report_type == 'waste':
+                queryset = queryset.filter(balance_type='waste')
+            elif filters.get('balance_type'):
+                queryset = queryset.filter(balance_type=filters['balance_type'])
+            if filters.get('place_id'):
+                queryset = queryset.filter(place_id=filters['place_id'])
+            if filters.get('culture_id'):
+                queryset = queryset.filter(culture_id=filters['culture_id'])
+            return queryset
+
+        if report_type == 'weigher':
+            queryset = WeigherJournal.objects.select_related(
+                'from_place', 'to_place', 'culture', 'car', 'driver'
+            )
+            if filters.get('from_place_id'):
+                queryset = queryset.filter(from_place_id=filters['from_place_id'])
+            if filters.get('to_place_id'):
+                queryset = queryset.filter(to_place_id=filters['to_place_id'])
+        elif report_type == 'shipment':
+            queryset = ShipmentJournal.objects.select_related(
+                'place_from', 'place_to', 'culture', 'car', 'driver'
+            )
+            if filters.get('action_type'):
+                queryset = queryset.filter(action_type=filters['action_type'])
+            if filters.get('place_to_id'):
+                queryset = queryset.filter(place_to_id=filters['place_to_id'])
+        elif report_type == 'fields':
+            queryset = FieldsIncome.objects.select_related(
+                'field', 'place_to', 'culture', 'car', 'driver'
+            )
+            if filters.get('field_id'):
+                queryset = queryset.filter(field_id=filters['field_id'])
+        elif report_type == 'other_income':
+            queryset = OtherIncome.objects.select_related('place_to', 'culture')
+            # Accept both `place_to_id` (explicit) and `place_id` (generic "Місце")
+            if filters.get('place_to_id'):
+                queryset = queryset.filter(place_to_id=filters['place_to_id'])
+            if filters.get('place_id'):
+                queryset = queryset.filter(place_to_id=filters['place_id'])
+        else:
+            raise ValueError(f'Невідомий тип звіту: {report_type}')
+
+        if filters.get('culture_id'):
+            queryset = queryset.filter(culture_id=filters['culture_id'])
+        return queryset.filter(**date_range(date_from, date_to))
+
     @staticmethod
     def _get_field_verbose_name(model, field_name, fallback):
         try:
@@ -570,12 +539,91 @@ class ReportService:
             if column == 'document':
                 return ReportService._get_field_verbose_name(OtherIncome, 'document_number', 'Документ')
 
+        if report_type == 'daily' and column == 'count':
+            return 'Операцій'
+
         return column
 
     @staticmethod
     def get_report_column_labels(report_type, columns):
         return {col: ReportService._resolve_column_label(report_type, col) for col in columns}
 
+    # Тип звіту -> метод сервісу, яким звіт повторно виконується при експорті
+    REPORT_METHODS = {
+        'balance': 'get_balance_report',
+        'waste': 'get_waste_report',
+        'weigher': 'get_weigher_report',
+        'shipment': 'get_shipment_report',
+        'fields': 'get_fields_report',
+        'other_income': 'get_other_income_report',
+        'daily': 'get_daily_export',
+    }
+
+    EXPORT_TOKEN_SALT = 'reports.export'
+    # Скільки живе посилання на експорт виконаного звіту, секунд
+    EXPORT_TOKEN_MAX_AGE = 24 * 60 * 60
+
+    @staticmethod
+    def make_export_token(report_type, date_from=None, date_to=None, filters=None, user=None):
+        """
+        Короткий підписаний токен виконаного звіту (тип, період, фільтри, користувач).
+
+        Сторінка звіту передає на експорт лише токен — сервер сам повторно
+        виконує запит, а не отримує назад від браузера всі рядки звіту.
+        """
+        payload = {
+            'type': report_type,
+            'from': date_from.isoformat() if date_from else None,
+            'to': date_to.isoformat() if date_to else None,
+            'filters': filters or {},
+            'user': user.pk if user is not None else None,
+        }
+        return signing.dumps(payload, salt=ReportService.EXPORT_TOKEN_SALT, compress=True)
+
+    @staticmethod
+    def read_export_token(token, user=None):
+        """
+        Перевіряє токен експорту. Повертає (тип звіту, date_from, date_to, filters).
+
+        `signing.BadSignature` — якщо токен підроблений, застарів
+        або виданий іншому користувачу.
+        """
+        payload = signing.loads(
+            token, salt=ReportService.EXPORT_TOKEN_SALT, max_age=ReportService.EXPORT_TOKEN_MAX_AGE
+        )
+        if payload.get('user') != (user.pk if user is not None else None):
+            raise signing.BadSignature('Токен експорту виданий іншому користувачу')
+        report_type = payload.get('type')
+        if report_type not in ReportService.REPORT_METHODS:
+            raise signing.BadSignature(f'Невідомий тип звіту: {report_type}')
+
+        date_from = datetime.strptime(payload['from'], '%Y-%m-%d').date() if payload.get('from') else None
+        date_to = datetime.strptime(payload['to'], '%Y-%m-%d').date() if payload.get('to') else None
+        return report_type, date_from, date_to, payload.get('filters') or {}
+
+    @staticmethod
+    def run_report(report_type, date_from=None, date_to=None, filters=None):
+        """Виконує звіт за типом (див. REPORT_METHODS)."""
+        method = getattr(ReportService, ReportService.REPORT_METHODS[report_type])
+        return method(date_from=date_from, date_to=date_to, filters=filters or {})
+
+    @staticmethod
+    def get_daily_export(date_from=None, date_to=None, filters=None):
+        """Рядки денного звіту для експорту: тип руху, вага, кількість операцій."""
+        summary = ReportService.get_daily_summary(date_from or date_to)
+        rows = [
+            ('Переміщення', summary['weigher']),
+            ('Відвантаження', summary['shipment']),
+            ('Інші надходження', summary['other_income']),
+            ('Надходження з полів', summary['fields']),
+        ]
+        return {
+            'data': [
+                {'type': label, 'quantity': values['total'], 'count': values['count']}
+                for label, values in rows
+            ],
+        }
+
     @staticmethod
     def export_to_csv(data, columns, column_labels=None):
         """Експорт даних в CSV"""
@@ -592,90 +640,80 @@ class ReportService:
     def export_to_excel(data, columns, sheet_name='Report', column_labels=None):
         """Експорт даних в Excel (XLSX) — повертає байти файлу"""
         try:
-            from openpyxl import Workbook
-            from openpyxl.utils import get_column_letter
+            from .xlsx import write_xlsx
         except Exception as e:
-            raise RuntimeError('openpyxl is required for Excel export') from e
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = sheet_name[:31]
-
-        header = list(column_labels) if column_labels else list(columns)
-        ws.append(header)
-
-        for row in data:
-            ws.append([row.get(col, '') for col in columns])
-
-        # Enable Excel filters and freeze the header row
-        if data:
-            ws.auto_filter.ref = ws.dimensions
-        ws.freeze_panes = ws['A2']
-
-        for idx, col in enumerate(columns, 1):
-            max_len = max(
-                [len(str(row.get(col, ''))) for row in data] + [len(str(header[idx-1]))]
-            ) if data else len(str(header[idx-1]))
-            ws.column_dimensions[get_column_letter(idx)].width = min(50, max_len + 2)
+            raise RuntimeError('xlsxwriter is required for Excel export') from e
 
         output = BytesIO()
-        wb.save(output)
-        output.seek(0)
+        write_xlsx(
+            output,
+            list(column_labels) if column_labels else list(columns),
+            ([row.get(col, '') for col in columns] for row in data),
+            sheet_name=sheet_name,
+        )
         return output.getvalue()
     
+    # Допустимі вікна графіків дашборду, днів
+    SUMMARY_WINDOWS = (7, 30, 90)
+
+    @staticmethod
+    def _daily_stats(date_from, date_to):
+        """
+        {(день, журнал, дія): (кількість, сума ваги)} за вікно — один запит
+        до денних підсумків журналів (DailyMovementRollup).
+        """
+        rows = DailyMovementRollup.objects.filter(day__gte=date_from, day__lte=date_to).values(
+            'day', 'kind', 'action'
+        ).annotate(_count=Sum('count'), _total=Sum('weight')).order_by()
+        return {
+            (row['day'], row['kind'], row['action']): (row['_count'] or 0, float(row['_total'] or 0))
+            for row in rows
+        }
+
     @staticmethod
-    def get_daily_summary(date=None):
+    def get_daily_summary(date=None, days=7):
         """
-        [FIXED] Розширений денний звіт для Dashboard.
-        Виправлено TypeError: перетворення Decimal у float.
+        Розширений денний звіт для Dashboard.
+
+        Один запит до денних підсумків за все вікно `days` (7 / 30 / 90) —
+        сьогодні, вчора, тренди і графіки рахуються з нього в пам'яті.
         """
         if not date:
             date = datetime.now().date()
-            
+        # Вікно має включати вчорашній день для трендів
+        days = max(int(days), 2)
+
         yesterday = date - timedelta(days=1)
-        
-        # --- Допоміжна функція для отримання статистики за день ---
+        window_start = date - timedelta(days=days - 1)
+
+        stats = ReportService._daily_stats(window_start, date)
+
+        # --- Допоміжна функція для отримання статистики за день (з результатів вище) ---
         def get_day_stats(target_date):
-            # Функція для безпечного отримання float
-            def get_safe_sum(queryset):
-                val = queryset.aggregate(t=Sum('weight_net'))['t']
-                return float(val) if val is not None else 0.0
-
-            # 1. Внутрішні переміщення (Weigher)
-            w_qs = WeigherJournal.objects.filter(date_time__date=target_date)
-            weigher = {
-                'count': w_qs.count(),
-                'total': get_safe_sum(w_qs)
-            }
+            def day_values(kind):
+                count, total = stats.get((target_date, kind, ''), (0, 0.0))
+                return {'count': count, 'total': total}
+
+            # Ввезення — прихід, усе інше — вивезення
+            in_count, in_total, out_count, out_total = 0, 0.0, 0, 0.0
+            for (day, kind, action_type), (count, total) in stats.items():
+                if day != target_date or kind != JournalKind.SHIPMENT:
+                    continue
+                if action_type == ShipmentAction.IMPORT:
+                    in_count, in_total = in_count + count, in_total + total
+                else:
+                    out_count, out_total = out_count + count, out_total + total
 
-            # 2. Відвантаження (Shipment)
-            s_qs = ShipmentJournal.objects.filter(date_time__date=target_date)
-            # Фільтри (налаштуйте під свої значення action_type в БД)
-            s_in_qs = s_qs.filter(Q(action_type='Ввезення') | Q(action_type='income'))
-            s_out_qs = s_qs.exclude(Q(action_type='Ввезення') | Q(action_type='income'))
-            
             shipment = {
-                'in_count': s_in_qs.count(),
-                'in_total': get_safe_sum(s_in_qs),
-                'out_count': s_out_qs.count(),
-                'out_total': get_safe_sum(s_out_qs),
-            }
-
-            # 3. Поля (Fields)
-            f_qs = FieldsIncome.objects.filter(date_time__date=target_date)
-            fields = {
-                'count': f_qs.count(),
-                'total': get_safe_sum(f_qs)
-            }
-            
-            # 4. Інші надходження (Other Income)
-            o_qs = OtherIncome.objects.filter(date_time__date=target_date)
-            other_income = {
-                'count': o_qs.count(),
-                'total': get_safe_sum(o_qs)
+                'in_count': in_count,
+                'in_total': in_total,
+                'out_count': out_count,
+                'out_total': out_total,
             }
-
-            return weigher, shipment, fields, other_income
+            return (
+                day_values(JournalKind.WEIGHER), shipment,
+                day_values(JournalKind.FIELDS), day_values(JournalKind.OTHER),
+            )
 
         # --- 1. Отримуємо дані за сьогодні і вчора ---
         today_weigher, today_shipment, today_fields, today_other_income = get_day_stats(date)
@@ -696,7 +734,7 @@ class ReportService:
             'other_income': calc_trend(today_other_income['total'], yest_other_income['total']),
         }
 
-        # --- 3. Генерація даних для графіків (останні 7 днів) ---
+        # --- 3. Генерація даних для графіків (останні `days` днів) ---
         sparkline_data = {
             'dates': [],
             'weigher': [],
@@ -706,7 +744,7 @@ class ReportService:
             'other_income': []
         }
 
-        for i in range(6, -1, -1):
+        for i in range(days - 1, -1, -1):
             d = date - timedelta(days=i)
             w, s, f, o = get_day_stats(d)
             sparkline_data['dates'].append(d.strftime('%d.%m'))
@@ -743,8 +781,17 @@ class ReportService:
                 'balance': total_balance,
             },
 
+            'yesterday': {
+                'weigher': yest_weigher,
+                'shipment': yest_shipment,
+                'fields': yest_fields,
+                'other_income': yest_other_income,
+            },
+            'yest_fields_total': yest_fields['total'],
+
             'trends': trends,
             'sparklines': sparkline_data,
+            'days': days,
 
             'grand_total': (
                 today_weigher['total']
@@ -756,6 +803,76 @@ class ReportService:
         }
 
         
+    @staticmethod
+    def _totals(queryset, amount='weight_net'):
+        """(сума `amount`, кількість рядків) одним агрегатним запитом."""
+        totals = queryset.order_by().aggregate(total=Sum(amount), rows=Count('pk'))
+        return float(totals['total'] or 0), totals['rows']
+
+    @staticmethod
+    def _group_sum(queryset, fields, amount='weight_net', label=None):
+        """
+        Сума `amount` по групах одним GROUP BY-запитом: {мітка: сума}.
+        Мітка — перше поле групи або `label(*значення_полів)`; порожнє значення → '—'.
+        """
+        result = {}
+        rows = queryset.order_by().values(*fields).annotate(_total=Sum(amount))
+        for row in rows:
+            values = [row[field] for field in fields]
+            key = label(*values) if label else (values[0] or '—')
+            result[key] = result.get(key, 0.0) + float(row['_total'] or 0)
+        return result
+
+    # Фільтри, які застосовує report_queryset до журналу; решта ключів `filters`
+    # (орієнтація PDF, графіки, дати) на рядки не впливає
+    JOURNAL_FILTERS = {
+        JournalKind.WEIGHER: {'culture_id', 'from_place_id', 'to_place_id'},
+        JournalKind.SHIPMENT: {'culture_id', 'action_type', 'place_to_id'},
+        JournalKind.FIELDS: {'culture_id', 'field_id'},
+        JournalKind.OTHER: {'culture_id', 'place_to_id', 'place_id'},
+    }
+
+    # Фільтри звітів журналів -> поля DailyMovementRollup. Звіт з іншим фільтром
+    # (поле, місце відправлення...) рахується по самому журналу.
+    ROLLUP_FILTERS = {
+        JournalKind.WEIGHER: {'culture_id': 'culture_id', 'to_place_id': 'place_id'},
+        JournalKind.SHIPMENT: {'culture_id': 'culture_id', 'action_type': 'action'},
+        JournalKind.FIELDS: {'culture_id': 'culture_id'},
+        JournalKind.OTHER: {'culture_id': 'culture_id', 'place_to_id': 'place_id', 'place_id': 'place_id'},
+    }
+
+    @staticmethod
+    def _rollup_queryset(kind, date_from, date_to, filters, aggregate_only=True):
+        """
+        Денні підсумки журналу за період — лише для `aggregate_only`.
+        None, якщо фільтри звіту не виражаються через ключ підсумків.
+        """
+        if not aggregate_only:
+            return None
+        supported = ReportService.ROLLUP_FILTERS[kind]
+        lookups = {'kind': kind, 'count__gt': 0}
+        for name, value in (filters or {}).items():
+            if not value or name not in ReportService.JOURNAL_FILTERS[kind]:
+                continue
+            if name not in supported:
+                return None
+            lookups[supported[name]] = value
+        if date_from:
+            lookups['day__gte'] = date_from
+        if date_to:
+            lookups['day__lte'] = date_to
+        return DailyMovementRollup.objects.filter(**lookups)
+
+    @staticmethod
+    def _journal_totals(queryset, rollup=None):
+        """(загальна вага, кількість документів, by_culture) — з підсумків, якщо є, інакше з журналу."""
+        if rollup is None:
+            total_weight, total_rows = ReportService._totals(queryset)
+            return total_weight, total_rows, ReportService._group_sum(queryset, ['culture__name'])
+        totals = rollup.order_by().aggregate(total=Sum('weight'), rows=Sum('count'))
+        by_culture = ReportService._group_sum(rollup, ['culture__name'], 'weight')
+        return float(totals['total'] or 0), totals['rows'] or 0, by_culture
+
     @staticmethod
     def _resolve_place(place_obj, place_text=None):
         """
@@ -812,28 +929,23 @@ class ReportService:
             item['source'] = 'Поле'
             
         
-        # Інші надходження (від людей, продавців)
+        # Інші надходження (від людей, продавців) — у звіті лише підсумки,
+        # тож рядки документів не вибираються
         other_income_full = ReportService.get_other_income_summary_data(
-            date_from, date_to, filters
+            date_from, date_to, filters, aggregate_only=True
         )
-        other_income = other_income_full.get('data', [])
-        for item in other_income:
-            item['weight_net'] = item.get('weight_net') or 0
-            item['source'] = 'Інші надходження'
-            
-        
 
         # =========================================================
-        # 2. Зовнішнє ввезення
+        # 2. Зовнішнє ввезення (лише документи ввезення — відбір у БД)
         # =========================================================
-        shipment_data_full = ReportService.get_shipment_summary_data(
-            date_from, date_to, filters
-        )
+        if filters.get('action_type') in (None, '', ShipmentAction.IMPORT):
+            shipment_data_full = ReportService.get_shipment_summary_data(
+                date_from, date_to, {**filters, 'action_type': ShipmentAction.IMPORT}
+            )
+        else:
+            shipment_data_full = {'data': [], 'aggregation': {'total_weight': 0.0, 'by_culture': {}}, 'total_rows': 0}
 
-        external_income = [
-            item for item in shipment_data_full.get('data', [])
-            if item.get('action_type') in ('Ввезення', 'income')
-        ]
+        external_income = shipment_data_full.get('data', [])
 
         for item in external_income:
             item['weight_net'] = item.get('weight_net') or 0
@@ -842,27 +954,26 @@ class ReportService:
         # =========================================================
         # 3. Обʼєднання
         # =========================================================
-        all_income = field_data + external_income + other_income
+        all_income = field_data + external_income
 
         # =========================================================
-        # 4. Агрегація
+        # 4. Агрегація — з агрегатів звітів (GROUP BY у БД), а не по рядках
         # =========================================================
         total_weight = 0.0
         by_culture = {}
 
-        for item in all_income:
-            weight = float(item.get('weight_net', 0) or 0)
-            culture = item.get('culture') or '—'
-
-            total_weight += weight
-            by_culture[culture] = by_culture.get(culture, 0.0) + weight
+        for report in (field_data_full, shipment_data_full, other_income_full):
+            aggregation = report.get('aggregation', {})
+            total_weight += aggregation.get('total_weight', 0.0)
+            for culture, weight in aggregation.get('by_culture', {}).items():
+                by_culture[culture] = by_culture.get(culture, 0.0) + weight
 
         # =========================================================
         # 5. Фінальна структура (СТАБІЛЬНИЙ КОНТРАКТ)
         # =========================================================
         return {
-            'data': all_income,                 # ← єдине джерело рядків
-            'total_rows': len(all_income),
+            'data': all_income,                 # ← рядки, які показує звіт (поля + ввезення)
+            'total_rows': len(all_income) + other_income_full.get('total_rows', 0),
             'aggregation': {
                 'total_weight': total_weight,
                 'by_culture': by_culture,
@@ -872,6 +983,9 @@ class ReportService:
                 'external_aggregation': ReportService._aggregate_income_data(
                     external_income
                 ),
+                'other_income_aggregation': other_income_full.get(
+                    'aggregation', {'total_weight': 0.0}
+                ),
             }
         }
 
@@ -880,19 +994,16 @@ class ReportService:
     def get_total_income_period_from_balance_history(date_from, date_to, filters=None):
         """
         Звіт 'Прихід зерна (Загальний за період)'
-        ПРАЦЮЄ СУТО ВІД ІСТОРІЇ ЗАЛИШКІВ (BalanceHistory)
+        ПРАЦЮЄ СУТО ВІД ЖУРНАЛУ РУХІВ ЗАЛИШКІВ (BalanceMovement)
         """
 
-        from balances.models import BalanceHistory
-
         filters = filters or {}
 
-        qs = BalanceHistory.objects.select_related(
+        qs = BalanceMovement.objects.select_related(
             'place', 'culture'
         ).filter(
-            created_at__date__gte=date_from,
-            created_at__date__lte=date_to
-        )
+            **date_range(date_from, date_to)
+        ).order_by('date_time')
 
         # 🔹 Фільтри
         if filters.get('place_id'):
@@ -906,21 +1017,21 @@ class ReportService:
 
         # 🔹 ВАЖЛИВО:
         # беремо ТІЛЬКИ ПРИХІД
-        qs = qs.filter(quantity__gt=0)
+        qs = qs.filter(delta__gt=0)
 
         data = []
         total_weight = 0.0
         by_culture = {}
 
-        for h in qs:
-            weight = float(h.quantity)
-            culture = h.culture.name if h.culture else '—'
+        for m in qs:
+            weight = float(m.delta)
+            culture = m.culture.name if m.culture else '—'
 
             data.append({
-                'date': h.created_at.strftime('%d.%m.%Y'),
-                'place': h.place.name if h.place else '—',
+                'date': m.date_time.strftime('%d.%m.%Y'),
+                'place': m.place.name if m.place else '—',
                 'culture': culture,
-                'balance_type': h.balance_type,
+                'balance_type': m.balance_type,
                 'weight_net': weight,
                 'source': 'Історія залишків',
             })
@@ -945,14 +1056,13 @@ class ReportService:
     ) -> dict:
         """
         Звіт залишків за період, розрахований виключно
-        з історії змін залишків (BalanceHistory).
+        з журналу рухів залишків (BalanceMovement): SUM(delta) по індексованому діапазону дат.
         """
 
         filters = filters or {}
 
-        qs = BalanceHistory.objects.filter(
-            created_at__date__gte=date_from,
-            created_at__date__lte=date_to
+        qs = BalanceMovement.objects.filter(
+            **date_range(date_from, date_to)
         )
 
         # 🔎 ФІЛЬТРИ
@@ -968,7 +1078,7 @@ class ReportService:
         # ========================================================
         # АГРЕГАЦІЯ
         # ========================================================
-        aggregation = qs.values(
+        aggregation = list(qs.values(
             'place__name',
             'culture__name',
             'balance_type'
@@ -977,18 +1087,18 @@ class ReportService:
         ).order_by(
             'place__name',
             'culture__name'
-        )
+        ))
 
         total_weight = sum(row['total_delta'] or 0 for row in aggregation)
 
         return {
             'date_from': date_from,
             'date_to': date_to,
-            'rows': list(aggregation),
+            'rows': aggregation,
             'aggregation': {
                 'total_weight': total_weight,
             },
-            'total_rows': aggregation.count()
+            'total_rows': len(aggregation)
         }
 
     @staticmethod
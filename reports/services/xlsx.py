@@ -0,0 +1,73 @@
+"""
+Запис XLSX з постійним споживанням пам'яті.
+
+xlsxwriter у режимі `constant_memory` скидає кожен записаний рядок у тимчасовий
+файл, тож у пам'яті тримається лише поточний рядок. Ширина стовпців рахується
+як поточний максимум довжини значень під час запису (без повторного проходу по
+даних) і виставляється перед закриттям книги. Числа, дати і час пишуться
+типізованими клітинками, щоб у Excel працювали сортування і формули.
+"""
+from datetime import date, datetime, time
+
+import xlsxwriter
+
+
+# Максимальна ширина стовпця, символів
+MAX_COLUMN_WIDTH = 50
+
+DATE_FORMAT = 'dd.mm.yyyy'
+TIME_FORMAT = 'hh:mm'
+DATETIME_FORMAT = 'dd.mm.yyyy hh:mm'
+
+
+def _cell(value, formats):
+    """(значення для запису, формат клітинки, довжина для ширини стовпця)."""
+    if isinstance(value, datetime):
+        value = value.replace(tzinfo=None)
+        return value, formats['datetime'], len(DATETIME_FORMAT)
+    if isinstance(value, date):
+        return value, formats['date'], len(DATE_FORMAT)
+    if isinstance(value, time):
+        return value.replace(tzinfo=None), formats['time'], len(TIME_FORMAT)
+    if value is None:
+        return '', None, 0
+    return value, None, len(str(value))
+
+
+def write_xlsx(output, header, rows, sheet_name='Report'):
+    """
+    Пише книгу з одним аркушем: заголовки, рядки `rows` (ітерабельне списків значень),
+    фільтр і закріплений рядок заголовків. `output` — шлях або файлоподібний об'єкт.
+
+    Повертає кількість записаних рядків даних.
+    """
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True})
+    try:
+        worksheet = workbook.add_worksheet(sheet_name[:31])
+        formats = {
+            'header': workbook.add_format({'bold': True}),
+            'date': workbook.add_format({'num_format': DATE_FORMAT}),
+            'time': workbook.add_format({'num_format': TIME_FORMAT}),
+            'datetime': workbook.add_format({'num_format': DATETIME_FORMAT}),
+        }
+
+        header = [str(label) for label in header]
+        worksheet.write_row(0, 0, header, formats['header'])
+        widths = [len(label) for label in header]
+
+        row_index = 0
+        for row_index, row in enumerate(rows, 1):
+            for col_index, value in enumerate(row):
+                value, cell_format, width = _cell(value, formats)
+                worksheet.write(row_index, col_index, value, cell_format)
+                if width > widths[col_index]:
+                    widths[col_index] = width
+
+        for col_index, width in enumerate(widths):
+            worksheet.set_column(col_index, col_index, min(MAX_COLUMN_WIDTH, width + 2))
+        if row_index:
+            worksheet.autofilter(0, 0, row_index, len(header) - 1)
+        worksheet.freeze_panes(1, 0)
+    finally:
+        workbook.close()
+    return row_index
@@ -168,9 +168,10 @@ def get_income_by_date(date, filters=None):
     """
     from logistics.models import FieldsIncome
     from django.db.models import Sum
+    from reports.services.dates import on_day
     
     queryset = FieldsIncome.objects.filter(
-        date_time__date=date
+        **on_day(date)
     ).select_related('field', 'place_to', 'culture', 'car', 'driver')
     
     if filters:
@@ -234,9 +235,10 @@ def get_other_income_by_date(date, filters=None):
     """
     from logistics.models import OtherIncome
     from django.db.models import Sum
+    from reports.services.dates import on_day
     
     queryset = OtherIncome.objects.filter(
-        date_time__date=date
+        **on_day(date)
     ).select_related('place_to', 'culture')
     
     if filters:
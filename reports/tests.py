@@ -1,3 +1,307 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from balances.models import Balance, BalanceType
+from balances.versions import bump, get_versions
+from directory.models import Car, Culture, Driver, Place
+from logistics.models import DailyMovementRollup, OtherIncome, ShipmentAction, ShipmentJournal, WeigherJournal
+from logistics.rollup import RollupService
+from reports.models import ReportCacheCounter, ReportExecution, ReportExecutionStatus
+from reports.services.cache import ReportCache
+from reports.services.jobs import PDF_JOBS, JobError, ReportJobService
+from reports.services.services import ReportService
+
+
+class ReportIndexTests(TestCase):
+    """Фільтри звітів журналів за періодом мають іти по індексах, а не повним переглядом."""
+
+    DATE_FROM = date(2026, 9, 1)
+    DATE_TO = date(2026, 9, 30)
+
+    # (тип звіту, фільтри, індекс, який має бути в плані)
+    CASES = [
+        ('weigher', {}, 'weigher_date_idx'),
+        ('weigher', {'culture_id': 1}, 'weigher_cult_date_idx'),
+        ('weigher', {'from_place_id': 1}, 'weigher_from_date_idx'),
+        ('weigher', {'to_place_id': 1}, 'weigher_to_date_idx'),
+        ('shipment', {}, 'shipment_date_idx'),
+        ('shipment', {'culture_id': 1}, 'shipment_cult_date_idx'),
+        ('shipment', {'place_to_id': 1}, 'shipment_to_date_idx'),
+        ('shipment', {'action_type': ShipmentAction.IMPORT}, 'shipment_action_date_idx'),
+        ('fields', {}, 'fields_date_idx'),
+        ('fields', {'culture_id': 1}, 'fields_cult_date_idx'),
+        ('fields', {'field_id': 1}, 'fields_field_date_idx'),
+        ('other_income', {}, 'otherinc_date_idx'),
+        ('other_income', {'culture_id': 1}, 'otherinc_cult_date_idx'),
+        ('other_income', {'place_to_id': 1}, 'otherinc_to_date_idx'),
+    ]
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # На порожніх таблицях планувальник обере seq scan навіть за наявності індексу
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def test_report_querysets_use_date_indexes(self):
+        for report_type, filters, index in self.CASES:
+            with self.subTest(report_type=report_type, filters=filters):
+                queryset = ReportService.report_queryset(report_type, self.DATE_FROM, self.DATE_TO, filters)
+                self.assertIn(index, queryset.explain())
+
+
+class RollupTotalsTests(TestCase):
+    """Підсумки звітів з DailyMovementRollup збігаються з підсумками по самих журналах."""
+
+    DAY = date(2026, 9, 10)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.storage = Place.objects.create(name='Склад')
+        cls.dryer = Place.objects.create(name='Сушка', place_type='dryer')
+        cls.wheat = Culture.objects.create(name='Пшениця')
+        cls.corn = Culture.objects.create(name='Кукурудза')
+        cls.driver = Driver.objects.create(full_name='Водій')
+        cls.car = Car.objects.create(number='AA0000AA')
+        for culture in (cls.wheat, cls.corn):
+            Balance.objects.create(place=cls.storage, culture=culture, balance_type=BalanceType.STOCK, quantity=100)
+
+    def at(self, hour):
+        return timezone.make_aware(datetime.combine(self.DAY, time(hour)))
+
+    def setUp(self):
+        for hour, culture, gross in ((8, self.wheat, '10'), (9, self.corn, '7'), (10, self.wheat, '3')):
+            WeigherJournal(
+                document_number='В', date_time=self.at(hour), culture=culture, from_place=self.storage,
+                to_place=self.dryer, weight_gross=Decimal(gross), weight_tare=Decimal('1'),
+            ).save()
+        for hour, action, gross in ((11, ShipmentAction.IMPORT, '20'), (12, ShipmentAction.EXPORT, '6'),
+                                    (13, ShipmentAction.IMPORT, '4')):
+            ShipmentJournal(
+                document_number='Н', date_time=self.at(hour), culture=self.wheat, action_type=action,
+                driver=self.driver, car=self.car, place_from=self.storage, place_to=self.storage,
+                weight_gross=Decimal(gross), weight_tare=Decimal('1'),
+            ).save()
+        OtherIncome(
+            document_number='І', date_time=self.at(14), culture=self.corn, seller='Продавець',
+            place_to=self.dryer, weight_gross=Decimal('5'), weight_tare=Decimal('0'),
+        ).save()
+
+    def assertSameTotals(self, method, filters=None):
+        aggregated = method(self.DAY, self.DAY, filters=filters, aggregate_only=True)
+        detailed = method(self.DAY, self.DAY, filters=filters)
+        self.assertEqual(aggregated['total_rows'], detailed['total_rows'])
+        self.assertEqual(aggregated['aggregation'], detailed['aggregation'])
+
+    def rollup_rows(self):
+        return sorted(
+            DailyMovementRollup.objects.filter(count__gt=0).values_list(
+                'day', 'kind', 'action', 'culture_id', 'place_id', 'count', 'weight',
+            )
+        )
+
+    def test_report_totals_match_the_journals(self):
+        self.assertSameTotals(ReportService.get_weigher_report)
+        self.assertSameTotals(ReportService.get_weigher_report, {'culture_id': self.wheat.pk})
+        self.assertSameTotals(ReportService.get_shipment_report)
+        self.assertSameTotals(ReportService.get_shipment_report, {'action_type': ShipmentAction.EXPORT})
+        self.assertSameTotals(ReportService.get_other_income_report, {'place_to_id': self.dryer.pk})
+
+    def test_incremental_rollup_matches_rebuild(self):
+        document = ShipmentJournal.objects.filter(action_type=ShipmentAction.EXPORT).get()
+        document.weight_gross = Decimal('8')
+        document.save()
+        WeigherJournal.objects.filter(culture=self.corn).get().delete()
+        incremental = self.rollup_rows()
+        RollupService.rebuild()
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_shipment_without_action_type_is_counted(self):
+        # Старі документи без типу операції (форма і імпорт такого не допускають)
+        ShipmentJournal.objects.filter(date_time=self.at(13)).update(action_type=None)
+        RollupService.rebuild()
+        self.assertSameTotals(ReportService.get_shipment_report)
+        report = ReportService.get_shipment_report(self.DAY, self.DAY, aggregate_only=True)
+        self.assertEqual(report['aggregation']['by_action']['—'], 3.0)
+
+        shipment = ReportService.get_daily_summary(self.DAY, days=2)['today']['shipment']
+        self.assertEqual((shipment['in_count'], shipment['out_count']), (1, 2))
+        self.assertEqual(shipment['in_total'] + shipment['out_total'], 27.0)
+
+    def test_rebuild_command_bumps_rollup_version(self):
+        before = get_versions(['logistics.dailymovementrollup'])
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rebuild_movement_rollup', stdout=io.StringIO())
+        self.assertEqual(
+            get_versions(['logistics.dailymovementrollup'])['logistics.dailymovementrollup'],
+            before['logistics.dailymovementrollup'] + 1,
+        )
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix='kolos-test-media-'))
+class ReportJobTests(TestCase):
+    """Черга PDF-звітів: захоплення, скасування і публікація лише готового звіту."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('operator')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.job = mock.Mock(side_effect=lambda execution, filters, progress: (
+            {'total_rows': 3}, io.BytesIO(b'%PDF-1.4'), 'test.pdf',
+        ))
+        jobs = mock.patch.dict(PDF_JOBS, {'test': lambda *args: self.job(*args)})
+        jobs.start()
+        self.addCleanup(jobs.stop)
+        send = mock.patch.object(ReportJobService, '_send', return_value='Відправлено')
+        self.send = send.start()
+        self.addCleanup(send.stop)
+
+    def enqueue(self, send=False):
+        return ReportJobService.enqueue(self.user, 'test', {'date_from': '2026-09-01'}, send_to_report_server=send)
+
+    def status(self, execution):
+        execution.refresh_from_db()
+        return execution.status
+
+    def test_enqueue_rejects_unknown_report(self):
+        with self.assertRaises(ValueError):
+            ReportJobService.enqueue(self.user, 'unknown', {})
+
+    def test_job_is_claimed_once(self):
+        execution = self.enqueue()
+        self.assertTrue(ReportJobService.claim(execution.pk))
+        self.assertFalse(ReportJobService.claim(execution.pk))
+        self.assertEqual(self.status(execution), ReportExecutionStatus.RUNNING)
+
+    def test_cancelled_job_is_not_claimed(self):
+        execution = self.enqueue()
+        self.assertTrue(ReportJobService.cancel(execution))
+        self.assertIsNone(ReportJobService.run(execution.pk))
+        self.job.assert_not_called()
+
+    def test_finished_job_cannot_be_cancelled(self):
+        execution = self.enqueue()
+        ReportJobService.run(execution.pk)
+        self.assertFalse(ReportJobService.cancel(execution))
+        self.assertEqual(self.status(execution), ReportExecutionStatus.DONE)
+
+    def test_run_saves_file_and_result(self):
+        execution = self.enqueue(send=True)
+        self.assertEqual(ReportJobService.run(execution.pk), ReportExecutionStatus.DONE)
+        execution.refresh_from_db()
+        self.assertEqual((execution.progress, execution.row_count), (100, 3))
+        self.assertEqual(execution.file_path.read(), b'%PDF-1.4')
+        self.assertEqual(execution.message, 'Відправлено')
+        self.send.assert_called_once()
+
+    def test_cancel_while_running_stops_at_next_progress(self):
+        execution = self.enqueue(send=True)
+
+        def cancelled_job(execution, filters, progress):
+            ReportJobService.cancel(execution)
+            progress(40)
+
+        self.job.side_effect = cancelled_job
+        self.assertEqual(ReportJobService.run(execution.pk), ReportExecutionStatus.CANCELLED)
+        self.send.assert_not_called()
+
+    def test_cancel_after_build_discards_file_and_does_not_send(self):
+        execution = self.enqueue(send=True)
+
+        def cancelled_job(execution, filters, progress):
+            ReportJobService.cancel(execution)
+            return {}, io.BytesIO(b'%PDF-1.4'), 'test.pdf'
+
+        self.job.side_effect = cancelled_job
+        with mock.patch.object(ReportJobService, 'set_progress'):
+            status = ReportJobService.run(execution.pk)
+        self.assertEqual(status, ReportExecutionStatus.CANCELLED)
+        execution.refresh_from_db()
+        self.assertFalse(execution.file_path)
+        saved = [name for _, _, names in os.walk(settings.MEDIA_ROOT) for name in names]
+        self.assertNotIn(f'report_{execution.pk}.pdf', saved)
+        self.send.assert_not_called()
+
+    def test_errors_fail_the_job(self):
+        execution = self.enqueue()
+        self.job.side_effect = JobError('Недостатньо даних')
+        self.assertEqual(ReportJobService.run(execution.pk), ReportExecutionStatus.FAILED)
+        execution.refresh_from_db()
+        self.assertEqual(execution.error, 'Недостатньо даних')
+
+    def test_stale_running_jobs_are_failed(self):
+        execution = self.enqueue()
+        ReportJobService.claim(execution.pk)
+        ReportExecution.objects.filter(pk=execution.pk).update(
+            started_at=timezone.now() - timedelta(seconds=ReportJobService.timeout() + 1),
+        )
+        self.assertEqual(ReportJobService.fail_stale(), 1)
+        self.assertEqual(self.status(execution), ReportExecutionStatus.FAILED)
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'reports': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'report-cache-tests'},
+    },
+    REPORT_CACHE_ALIAS='reports',
+    REPORT_CACHE_STATS_FLUSH_INTERVAL=3600,
+)
+class ReportCacheTests(TestCase):
+    """Версіонований кеш звітів і лічильники влучань у БД."""
+
+    def setUp(self):
+        caches['reports'].clear()
+        # Лічильники, накопичені в процесі попередніми тестами, сюди не потрапляють
+        ReportCache.flush_stats()
+        ReportCacheCounter.objects.all().delete()
+        self.compute = mock.Mock(return_value={'data': [1, 2], 'total_rows': 2})
+
+    def run_report(self):
+        return ReportCache.get_or_run('weigher', {'from': '2026-09-01'}, self.compute)
+
+    def test_hit_returns_cached_result_without_writes(self):
+        self.run_report()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.run_report(), {'data': [1, 2], 'total_rows': 2})
+        self.assertEqual(self.compute.call_count, 1)
+        self.assertEqual([query['sql'] for query in queries if not query['sql'].startswith('SELECT')], [])
+
+    def test_write_to_a_table_invalidates_its_reports(self):
+        self.run_report()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump(WeigherJournal)
+        self.run_report()
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_stats_flush_buffered_counters(self):
+        self.run_report()
+        self.run_report()
+        self.run_report()
+        stats = ReportCache.stats()['reports']['weigher']
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+        self.assertEqual(
+            dict(ReportCacheCounter.objects.filter(report_type='weigher').values_list('counter', 'value')),
+            {'hits': 2, 'misses': 1},
+        )
+        self.run_report()
+        self.assertEqual(ReportCache.stats()['reports']['weigher']['hits'], 3)
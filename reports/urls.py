@@ -21,6 +21,9 @@ urlpatterns = [
     # Експорт
     path('export/', views.ExportReportView.as_view(), name='export_report'),
     
+    # Статистика кешу звітів
+    path('cache/stats/', views.ReportCacheStatsView.as_view(), name='report_cache_stats'),
+    
     # Конструктор звітів
     path('builder/', views.CustomReportBuilderView.as_view(), name='custom_report_builder'),
     
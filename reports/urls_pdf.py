@@ -10,7 +10,8 @@ from .views_pdf import (
     ShipmentSummaryReportView,
     ReportTemplateListView, ReportTemplateUpdateView, ReportTemplateDeleteView,
     ReportExecutionListView, ReportExecutionDownloadView, TotalIncomePeriodReportView,
-    BalancePeriodHistoryReportView# <-- ІМПОРТ НОВОГО ПРЕДСТАВЛЕННЯ
+    BalancePeriodHistoryReportView,# <-- ІМПОРТ НОВОГО ПРЕДСТАВЛЕННЯ
+    ReportExecutionStatusView, ReportExecutionCancelView,
 )
 
 # Додайте ці URL до існуючого списку urlpatterns
@@ -34,5 +35,7 @@ pdf_urlpatterns = [
     
     # Виконання звітів
     path('executions/', ReportExecutionListView.as_view(), name='report_execution_list'),
+    path('executions/<int:pk>/', ReportExecutionStatusView.as_view(), name='report_execution_status'),
+    path('executions/<int:pk>/cancel/', ReportExecutionCancelView.as_view(), name='report_execution_cancel'),
     path('executions/<int:pk>/download/', ReportExecutionDownloadView.as_view(), name='report_execution_download'),
 ]
\ No newline at end of file
@@ -1,11 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import ListView, View, CreateView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core import signing
 from django.urls import reverse_lazy
 from datetime import datetime, timedelta
-import json
+import tempfile
 from .services.services import ReportService
+from .services.cache import ReportCache
+from .services.exports import export_columns, stream_report_csv, write_report_xlsx
 from .forms import (
     BalanceReportFilterForm, WasteReportFilterForm,
     WeigherReportFilterForm, ShipmentReportFilterForm,
@@ -19,8 +22,16 @@ class ReportsDashboardView(LoginRequiredMixin, View):
     """Головна сторінка звітів"""
     
     def get(self, request):
+        # Вікно графіків: 7 / 30 / 90 днів
+        try:
+            days = int(request.GET.get('days', 7))
+        except ValueError:
+            days = 7
+        if days not in ReportService.SUMMARY_WINDOWS:
+            days = 7
+
         # Отримуємо денний звіт
-        daily_summary = ReportService.get_daily_summary()
+        daily_summary = ReportCache.daily_summary(days=days)
         
         # Останні виконані звіти
         recent_reports = ReportExecution.objects.filter(
@@ -35,6 +46,7 @@ class ReportsDashboardView(LoginRequiredMixin, View):
         context = {
             'page': 'reports',
             'daily_summary': daily_summary,
+            'summary_windows': ReportService.SUMMARY_WINDOWS,
             'recent_reports': recent_reports,
             'saved_reports': saved_reports,
         }
@@ -79,6 +91,7 @@ class BaseReportView(LoginRequiredMixin, View):
         form = self.form_class(request.POST)
         report_data = None
         filters_applied = False
+        export_token = None
         
         if form.is_valid():
             filters_applied = True
@@ -105,8 +118,9 @@ class BaseReportView(LoginRequiredMixin, View):
             
             # Викликаємо метод сервісу з правильними аргументами
             try:
-                # Викликаємо метод як статичний метод класу з явним передаванням аргументів
-                report_data = self.report_method.__func__(
+                # Результат береться з кешу, доки дані звіту не змінились
+                report_data = ReportCache.run_report(
+                    self.report_type,
                     date_from=date_from,
                     date_to=date_to,
                     filters=filters
@@ -158,6 +172,10 @@ class BaseReportView(LoginRequiredMixin, View):
                     {'key': key, 'label': labels.get(key, key)}
                     for key in keys
                 ]
+                # Експорт отримує лише цей токен і виконує звіт на сервері повторно
+                export_token = ReportService.make_export_token(
+                    self.report_type, date_from, date_to, filters, user=request.user
+                )
         
         context = {
             'page': 'reports',
@@ -165,6 +183,7 @@ class BaseReportView(LoginRequiredMixin, View):
             'report_title': self.report_title,
             'report_type': self.report_type,
             'report_data': report_data,
+            'export_token': export_token,
             'filters_applied': filters_applied,
         }
         
@@ -220,34 +239,55 @@ class OtherIncomeReportView(BaseReportView):
 
 
 class ExportReportView(LoginRequiredMixin, View):
-    """Експорт звіту в CSV або Excel"""
+    """Експорт звіту в CSV або Excel за токеном виконаного звіту"""
     
     def post(self, request):
+        token = request.POST.get('token', '')
+        export_format = request.POST.get('export_format', 'csv')
+
         try:
-            # Отримуємо дані зі запиту
-            data_json = request.POST.get('data', '[]')
-            data = json.loads(data_json)
-            columns_json = request.POST.get('columns', '[]')
-            column_labels_json = request.POST.get('column_labels', '[]')
-            export_format = request.POST.get('export_format', 'csv')
-            report_name = request.POST.get('report_name', 'report')
+            report_type, date_from, date_to, filters = ReportService.read_export_token(token, user=request.user)
+        except signing.BadSignature:
+            return JsonResponse({'error': 'Посилання на експорт недійсне або застаріло. Сформуйте звіт ще раз.'}, status=400)
 
-            try:
-                columns = json.loads(columns_json)
-            except json.JSONDecodeError:
-                columns = []
+        report_name = request.POST.get('report_name') or report_type
+        filename = f'{report_name}_{datetime.now():%Y%m%d_%H%M%S}'
+
+        # CSV журналів і залишків пишеться потоком прямо з БД, без списку рядків у пам'яті
+        if export_format != 'excel' and export_columns(report_type):
+            response = StreamingHttpResponse(
+                stream_report_csv(report_type, date_from, date_to, filters),
+                content_type='text/csv; charset=utf-8',
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+            return response
 
+        # XLSX пишеться у тимчасовий файл з постійним споживанням пам'яті і віддається блоками
+        if export_format == 'excel' and export_columns(report_type):
+            output = tempfile.TemporaryFile()
             try:
-                column_labels = json.loads(column_labels_json)
-            except json.JSONDecodeError:
-                column_labels = None
-            
-            # Фільтруємо порожні колонки
-            columns = [col for col in columns if col]
-            
-            if not data or not columns:
+                write_report_xlsx(output, report_type, date_from, date_to, filters, sheet_name=report_name)
+            except Exception as e:
+                output.close()
+                return JsonResponse({'error': f'Помилка при експорті: {str(e)}'}, status=500)
+            output.seek(0)
+            return FileResponse(
+                output,
+                as_attachment=True,
+                filename=f'{filename}.xlsx',
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+
+        try:
+            report_data = ReportCache.run_report(report_type, date_from, date_to, filters)
+            data = (report_data or {}).get('data') or []
+            if not data:
                 return JsonResponse({'error': 'Немає даних для експорту'}, status=400)
-            
+
+            columns = list(data[0].keys())
+            labels = ReportService.get_report_column_labels(report_type, columns)
+            column_labels = [labels.get(col, col) for col in columns]
+
             if export_format == 'excel':
                 file_content = ReportService.export_to_excel(
                     data,
@@ -267,15 +307,22 @@ class ExportReportView(LoginRequiredMixin, View):
                 extension = 'csv'
             
             response = HttpResponse(file_content, content_type=content_type)
-            response['Content-Disposition'] = f'attachment; filename="{report_name}_{datetime.now():%Y%m%d_%H%M%S}.{extension}"'
+            response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
             
             return response
-        except json.JSONDecodeError as e:
-            return JsonResponse({'error': f'Помилка формату JSON: {str(e)}'}, status=400)
         except Exception as e:
             return JsonResponse({'error': f'Помилка при експорті: {str(e)}'}, status=500)
 
 
+class ReportCacheStatsView(LoginRequiredMixin, View):
+    """Лічильники кешу звітів для моніторингу (JSON, лише для персоналу)"""
+
+    def get(self, request):
+        if not request.user.is_staff:
+            return JsonResponse({'error': 'Недостатньо прав'}, status=403)
+        return JsonResponse(ReportCache.stats())
+
+
 class DailyReportView(LoginRequiredMixin, View):
     """Денний звіт"""
     
@@ -290,7 +337,8 @@ class DailyReportView(LoginRequiredMixin, View):
         else:
             date = datetime.now().date()
         
-        daily_summary = ReportService.get_daily_summary(date)
+        daily_summary = ReportCache.daily_summary(date)
+        export_token = ReportService.make_export_token('daily', date, date, user=request.user)
         
         # Розрахунок дат для навігації
         prev_date = date - timedelta(days=1)
@@ -299,6 +347,7 @@ class DailyReportView(LoginRequiredMixin, View):
         context = {
             'page': 'reports',
             'daily_summary': daily_summary,
+            'export_token': export_token,
             'selected_date': date,
             'prev_date': prev_date,
             'next_date': next_date,
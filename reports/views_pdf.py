@@ -1,57 +1,26 @@
 """
 Views for PDF report generation and management.
+
+PDF-звіти формуються у фоні (`reports.services.jobs`): форма ставить
+завдання в чергу і веде на сторінку завдання, яка опитує його статус.
 """
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import View, ListView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import HttpResponse, FileResponse
-from django.urls import reverse_lazy
+from django.http import FileResponse, JsonResponse
+from django.urls import reverse, reverse_lazy
 from django.contrib import messages
-from django.core.files.base import ContentFile
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any
 
-from .models import ReportTemplate, ReportExecution
+from .models import ReportTemplate, ReportExecution, ReportExecutionStatus
 from .forms_pdf import (
     BalanceDateReportForm, BalancePeriodReportForm,
     IncomeDateReportForm, IncomePeriodReportForm,
     ShipmentSummaryReportForm, ReportTemplateForm,
     TotalIncomePeriodReportForm
 )
-from .services.services import ReportService
-from .services.pdf_generator import ReportPDFBuilder
-from .services.report_sender import ReportSenderService
-from balances.models import BalanceSnapshot
-
-def make_json_safe(value):
-    """Перетворює будь-яке значення на JSON-serializable."""
-    from datetime import date, datetime
-    from decimal import Decimal
-
-    if isinstance(value, (date, datetime)):
-        return value.isoformat()
-
-    if isinstance(value, Decimal):
-        return float(value)
-
-    if isinstance(value, dict):
-        return {k: make_json_safe(v) for k, v in value.items()}
-
-    if isinstance(value, list):
-        return [make_json_safe(v) for v in value]
-
-    if isinstance(value, tuple):
-        return tuple(make_json_safe(v) for v in value)
-
-    # Моделі → str або pk (на твій вибір)
-    try:
-        from django.db.models import Model
-        if isinstance(value, Model):
-            return value.pk
-    except:
-        pass
-
-    return value
-
+from .services.jobs import ReportJobService
 
 
 class PDFReportGeneratorMixin:
@@ -59,45 +28,6 @@ class PDFReportGeneratorMixin:
 
     TEMPLATE_NAME = 'reports/pdf/report_form_base.html'
 
-    # ============================================================
-    # UNIVERSAL JSON-SAFE CONVERTER
-    # ============================================================
-    def make_json_safe(self, value):
-        """Convert any object into JSON-serializable value."""
-        from datetime import date, datetime
-        from decimal import Decimal
-        from django.db.models import Model
-
-        # Dates
-        if isinstance(value, (date, datetime)):
-            return value.isoformat()
-
-        # Decimal
-        if isinstance(value, Decimal):
-            return float(value)
-
-        # Model → pk
-        if isinstance(value, Model):
-            return value.pk
-
-        # Dict
-        if isinstance(value, dict):
-            return {k: self.make_json_safe(v) for k, v in value.items()}
-
-        # List / tuple
-        if isinstance(value, (list, tuple)):
-            return [self.make_json_safe(v) for v in value]
-
-        return value
-
-    # ============================================================
-
-    def generate_pdf_response(self, pdf_buffer, filename: str) -> HttpResponse:
-        """Create HTTP response with PDF file."""
-        response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
-
     def _prepare_filters(self, form_data: Dict[str, Any]) -> Dict[str, Any]:
         """Extract and prepare filters from form data."""
         filters = {
@@ -127,118 +57,21 @@ class PDFReportGeneratorMixin:
 
         return filters
 
-    def save_report_execution(
-        self,
-        template: Optional[ReportTemplate],
-        report_type: str,
-        filters: Dict[str, Any],
-        data: Union[Dict[str, Any], list],
-        pdf_buffer,
-        file_format: str = 'pdf'
-    ) -> dict:
-        """
-        Saves report execution, file and optionally sends to Report Server.
-        Returns status dict for UI layer.
+    def enqueue_report(self, report_type: str, filters: Dict[str, Any]):
         """
+        Ставить звіт у чергу фонового формування і веде на сторінку завдання.
 
-        # -----------------------------
-        # 1. Row count
-        # -----------------------------
-        if isinstance(data, dict) and 'total_rows' in data:
-            row_count = data['total_rows']
-        elif isinstance(data, list):
-            row_count = len(data)
-        elif isinstance(data, dict) and 'comparison' in data:
-            row_count = len(data['comparison'])
-        else:
-            row_count = 0
-
-        # -----------------------------
-        # 2. JSON safe
-        # -----------------------------
-        safe_filters = self.make_json_safe(filters)
-        safe_data = self.make_json_safe(data)
-
-        # -----------------------------
-        # 3. Create execution
-        # -----------------------------
-        execution = ReportExecution.objects.create(
-            template=template,
-            executed_by=self.request.user,
-            report_type=report_type,
-            date_from=filters.get('date_from'),
-            date_to=filters.get('date_to'),
-            filters=safe_filters,
-            result_data=safe_data,
-            row_count=row_count,
-            file_format=file_format
-        )
-
-        # -----------------------------
-        # 4. Save file
-        # -----------------------------
-        filename = f"report_{execution.id}.{file_format}"
-        execution.file_path.save(
-            filename,
-            ContentFile(pdf_buffer.getvalue()),
-            save=True
-        )
-
-        # -----------------------------
-        # 5. Send to Report Server
-        # -----------------------------
-        result = {
-            "execution": execution,
-            "sent": False,
-            "duplicate": False,
-            "error": None,
-        }
-
-        if self.request.POST.get("send_to_report_server"):
-            try:
-                status = ReportSenderService.send_pdf(
-                    execution.file_path,
-                    metadata={
-                        "report_type": report_type,
-                        "date_from": filters.get("date_from"),
-                        "date_to": filters.get("date_to"),
-                        "user": self.request.user.username,
-                        "filename": filename,
-                    }
-                )
-
-                result["sent"] = True
-                result["duplicate"] = (status == "duplicate")
-
-            except Exception as e:
-                result["error"] = str(e)
-
-        return result
-    
-    def handle_execution_messages(self, result: dict):
-        """
-        Standard UI reaction for report execution result
+        З REPORT_JOBS_ASYNC = False звіт формується одразу в запиті (без воркера).
         """
-        if result.get("error"):
-            messages.error(
-                self.request,
-                f"Помилка відправки: {result['error']}"
-            )
-        elif result.get("duplicate"):
-            messages.warning(
-                self.request,
-                "Такий звіт вже існує на Report Server"
-            )
-        elif result.get("sent"):
-            messages.success(
-                self.request,
-                "Звіт успішно відправлено на Report Server"
-            )
-        else:
-            messages.success(
-                self.request,
-                "Звіт успішно сформовано"
-            )
+        execution = ReportJobService.enqueue(
+            self.request.user,
+            report_type,
+            filters,
+            send_to_report_server=bool(self.request.POST.get("send_to_report_server")),
+        )
+        if not getattr(settings, 'REPORT_JOBS_ASYNC', True):
+            ReportJobService.run(execution.pk)
+        return redirect('report_execution_status', pk=execution.pk)
 
     def _get_context(self, form, report_title: str) -> Dict[str, Any]:
         """Get common context for report views."""
@@ -254,6 +87,7 @@ class BasePDFReportView(LoginRequiredMixin, PDFReportGeneratorMixin, View):
     
     form_class = None
     report_title = ''
+    report_type = ''
     
     def get(self, request):
         form = self.form_class()
@@ -272,8 +106,12 @@ class BasePDFReportView(LoginRequiredMixin, PDFReportGeneratorMixin, View):
             return render(request, self.TEMPLATE_NAME, self._get_context(form, self.report_title))
     
     def _process_valid_form(self, form):
-        """Process valid form data - to be implemented by subclasses."""
-        raise NotImplementedError("Subclasses must implement this method")
+        """Ставить звіт у чергу з параметрами `get_job_filters`."""
+        return self.enqueue_report(self.report_type, self.get_job_filters(form))
+
+    def get_job_filters(self, form) -> Dict[str, Any]:
+        """Параметри звіту для завдання (як вони зберігаються в історії виконань)."""
+        return self._prepare_filters(form.cleaned_data)
 
 
 class BalanceDateReportView(BasePDFReportView):
@@ -281,45 +119,11 @@ class BalanceDateReportView(BasePDFReportView):
     
     form_class = BalanceDateReportForm
     report_title = 'Звіт залишків за дату'
+    report_type = 'balance_snapshot'
     
-    def _process_valid_form(self, form):
+    def get_job_filters(self, form):
         report_date = form.cleaned_data['report_date']
-        filters = self._prepare_filters(form.cleaned_data)
-        
-        # Get snapshot data
-        snapshot = BalanceSnapshot.objects.filter(
-            snapshot_date__date__lte=report_date
-        ).order_by('-snapshot_date').first()
-        
-        if snapshot:
-            data = ReportService.get_balance_snapshot_data(snapshot, filters)
-        else:
-            # Use current balances if no snapshot exists
-            data = ReportService.get_balance_report(filters=filters)
-        
-        # Generate PDF
-        pdf_buffer = ReportPDFBuilder.build_balance_report(
-            data, 
-            date=report_date,
-            filters=filters
-        )
-        
-        # Save execution
-        result = self.save_report_execution(
-            template=None,
-            report_type='balance_snapshot',
-            filters={'date': report_date.isoformat(), **filters},
-            data=data,
-            pdf_buffer=pdf_buffer
-        )
-        
-        self.handle_execution_messages(result)
-                
-        if result.get("error") or result.get("duplicate"):
-            return redirect('pdf_balance_date')
-        # Return PDF
-        filename = f"balance_report_{report_date.strftime('%Y%m%d')}.pdf"
-        return self.generate_pdf_response(pdf_buffer, filename)
+        return {'date': report_date.isoformat(), **self._prepare_filters(form.cleaned_data)}
 
 
 class BalancePeriodReportView(BasePDFReportView):
@@ -327,63 +131,7 @@ class BalancePeriodReportView(BasePDFReportView):
     
     form_class = BalancePeriodReportForm
     report_title = 'Звіт залишків за період'
-    
-    def _process_valid_form(self, form):
-        date_from = form.cleaned_data['date_from']
-        date_to = form.cleaned_data['date_to']
-        filters = self._prepare_filters(form.cleaned_data)
-        
-        # Get snapshots for start and end of period
-        start_snapshot = BalanceSnapshot.objects.filter(
-            snapshot_date__date__lte=date_from
-        ).order_by('-snapshot_date').first()
-        
-        end_snapshot = BalanceSnapshot.objects.filter(
-            snapshot_date__date__lte=date_to
-        ).order_by('-snapshot_date').first()
-        
-        if not start_snapshot or not end_snapshot:
-            messages.error(
-                self.request,
-                'Недостатньо даних для побудови звіту за вказаний період'
-            )
-            context = self._get_context(form, self.report_title)
-            return render(self.request, self.TEMPLATE_NAME, context)
-        
-        # Compare data
-        comparison_data = ReportService.compare_balance_snapshots(
-            start_snapshot, end_snapshot, filters
-        )
-        
-        # Generate PDF
-        pdf_buffer = ReportPDFBuilder.build_balance_period_report(
-            comparison_data,
-            date_from,
-            date_to,
-            filters=filters
-        )
-        
-        # Save execution
-        result = self.save_report_execution(
-            template=None,
-            report_type='balance_period',
-            filters={
-                'date_from': date_from.isoformat(),
-                'date_to': date_to.isoformat(),
-                **filters
-            },
-            data={'comparison': comparison_data},
-            pdf_buffer=pdf_buffer
-        )
-        
-        self.handle_execution_messages(result)
-        
-        if result.get("error") or result.get("duplicate"):
-            return redirect('pdf_balance_period')
-
-        # Return PDF
-        filename = f"balance_period_{date_from.strftime('%Y%m%d')}_{date_to.strftime('%Y%m%d')}.pdf"
-        return self.generate_pdf_response(pdf_buffer, filename)
+    report_type = 'balance_period'
 
 
 class IncomeDateReportView(BasePDFReportView):
@@ -391,42 +139,11 @@ class IncomeDateReportView(BasePDFReportView):
     
     form_class = IncomeDateReportForm
     report_title = 'Звіт приходу зерна за дату'
+    report_type = 'income_date'
     
-    def _process_valid_form(self, form):
+    def get_job_filters(self, form):
         report_date = form.cleaned_data['report_date']
-        filters = self._prepare_filters(form.cleaned_data)
-        
-        # Get data for the date
-        data = ReportService.get_fields_report(
-            date_from=report_date,
-            date_to=report_date,
-            filters=filters
-        )
-        
-        # Generate PDF
-        pdf_buffer = ReportPDFBuilder.build_income_report(
-            data,
-            report_date,
-            report_date,
-            filters
-        )
-        
-        # Save execution
-        result = self.save_report_execution(
-            template=None,
-            report_type='income_date',
-            filters={'date': report_date.isoformat(), **filters},
-            data=data,
-            pdf_buffer=pdf_buffer
-        )
-        
-        self.handle_execution_messages(result)
-        
-        if result.get("error") or result.get("duplicate"):
-            return redirect('pdf_income_date')
-        # Return PDF
-        filename = f"income_report_{report_date.strftime('%Y%m%d')}.pdf"
-        return self.generate_pdf_response(pdf_buffer, filename)
+        return {'date': report_date.isoformat(), **self._prepare_filters(form.cleaned_data)}
 
 
 class IncomePeriodReportView(BasePDFReportView):
@@ -434,230 +151,40 @@ class IncomePeriodReportView(BasePDFReportView):
     
     form_class = IncomePeriodReportForm
     report_title = 'Звіт приходу зерна за період'
-    
-    def _process_valid_form(self, form):
-        date_from = form.cleaned_data['date_from']
-        date_to = form.cleaned_data['date_to']
-        filters = self._prepare_filters(form.cleaned_data)
-        
-        # Get data for the period
-        data = ReportService.get_fields_report(
-            date_from=date_from,
-            date_to=date_to,
-            filters=filters
-        )
-        
-        # Generate PDF
-        pdf_buffer = ReportPDFBuilder.build_income_report(
-            data,
-            date_from,
-            date_to,
-            filters
-        )
-        
-        # Save execution
-        result = self.save_report_execution(
-            template=None,
-            report_type='income_period',
-            filters={
-                'date_from': date_from.isoformat(),
-                'date_to': date_to.isoformat(),
-                **filters
-            },
-            data=data,
-            pdf_buffer=pdf_buffer
-        )
+    report_type = 'income_period'
 
-        self.handle_execution_messages(result)
-        
-        if result.get("error") or result.get("duplicate"):
-            return redirect('pdf_income_period')
-
-        # Return PDF
-        filename = f"income_period_{date_from.strftime('%Y%m%d')}_{date_to.strftime('%Y%m%d')}.pdf"
-        return self.generate_pdf_response(pdf_buffer, filename)        
 
 class ShipmentSummaryReportView(BasePDFReportView):
     """Import/export report for a period."""
     
     form_class = ShipmentSummaryReportForm
     report_title = 'Звіт ввезення/вивезення'
-    
-    def _process_valid_form(self, form):
-        date_from = form.cleaned_data['date_from']
-        date_to = form.cleaned_data['date_to']
-        filters = self._prepare_filters(form.cleaned_data)
-        
-        # Get data for the period
-        data = ReportService.get_shipment_report(
-            date_from=date_from,
-            date_to=date_to,
-            filters=filters
-        )
-        
-        # Generate PDF
-        pdf_buffer = ReportPDFBuilder.build_shipment_summary(
-            data,
-            date_from,
-            date_to,
-            filters
-        )
-        
-        # Save execution
-        result = self.save_report_execution(
-            template=None,
-            report_type='shipment_summary',
-            filters={
-                'date_from': date_from.isoformat(),
-                'date_to': date_to.isoformat(),
-                **filters
-            },
-            data=data,
-            pdf_buffer=pdf_buffer
-        )
-        
-        self.handle_execution_messages(result)
-        
-        if result.get("error") or result.get("duplicate"):
-            return redirect('pdf_shipment_summary')
-        
-        # Return PDF
-        filename = f"shipment_summary_{date_from.strftime('%Y%m%d')}_{date_to.strftime('%Y%m%d')}.pdf"
-        return self.generate_pdf_response(pdf_buffer, filename)
-        
+    report_type = 'shipment_summary'
 
 
-class TotalIncomePeriodReportView(LoginRequiredMixin, PDFReportGeneratorMixin, View):
+class TotalIncomePeriodReportView(BasePDFReportView):
     """Total grain income report for a period."""
     
-    template_name = 'reports/pdf/report_form_base.html'
-    
-    def get(self, request):
-        form = TotalIncomePeriodReportForm()
-        context = {
-            'form': form,
-            'page': 'reports',
-            'report_title': 'Прихід зерна (Загальний за період)'
-        }
-        return render(request, self.template_name, context)
+    form_class = TotalIncomePeriodReportForm
+    report_title = 'Прихід зерна (Загальний за період)'
+    report_type = 'total_income_period'
 
-    def post(self, request):
-        form = TotalIncomePeriodReportForm(request.POST)
-        
-        if not form.is_valid():
-            context = {
-                'form': form,
-                'page': 'reports',
-                'report_title': 'Прихід зерна (Загальний за період)'
-            }
-            return render(request, self.template_name, context)
-        
-        filters = form.cleaned_data
-        date_from = filters['date_from']
-        date_to = filters['date_to']
-        output_format = filters['output_format']
-        
-        # 1. Get data
-        try:
-            data = ReportService.get_total_income_period_data(date_from, date_to, filters)
-        except Exception as e:
-            messages.error(request, f"Помилка при отриманні даних: {e}")
-            context = {
-                'form': form,
-                'page': 'reports',
-                'report_title': 'Прихід зерна (Загальний за період)'
-            }
-            return render(request, self.template_name, context)
-        
-        # 2. Generate
-        if output_format == 'pdf':
-            pdf_buffer = ReportPDFBuilder.build_total_income_period_report(
-                data, date_from, date_to, filters
-            )
-            filename = f"Прихід_зерна_загальний_{date_from:%d%m%Y}_{date_to:%d%m%Y}.pdf"
-            
-            # 3. Save execution
-            result = self.save_report_execution(
-                template=None,
-                report_type='total_income_period',
-                filters=filters,
-                data=data,
-                pdf_buffer=pdf_buffer
-            )
-
-            if result.get("error") or result.get("duplicate"):
-                return redirect('pdf_total_income_period')
-            
-            self.handle_execution_messages(result)
-            return self.generate_pdf_response(pdf_buffer, filename)
-        
-        messages.warning(request, f"Формат {output_format.upper()} не підтримується для цього звіту.")
-        context = {
-            'form': form,
-            'page': 'reports',
-            'report_title': 'Прихід зерна (Загальний за період)'
-        }
-        return render(request, self.template_name, context)
-    
-class BalancePeriodHistoryReportView(LoginRequiredMixin, PDFReportGeneratorMixin, View):
+    def _process_valid_form(self, form):
+        output_format = form.cleaned_data['output_format']
+        if output_format != 'pdf':
+            messages.warning(self.request, f"Формат {output_format.upper()} не підтримується для цього звіту.")
+            return render(self.request, self.TEMPLATE_NAME, self._get_context(form, self.report_title))
+        return super()._process_valid_form(form)
+
+
+class BalancePeriodHistoryReportView(BasePDFReportView):
     """
     📊 Звіт залишків за період (по історії)
     """
 
-    template_name = 'reports/pdf/report_form_base.html'
-
-    def get(self, request):
-        return render(request, self.template_name, {
-            'form': BalancePeriodReportForm(),
-            'page': 'reports',
-            'report_title': 'Залишки за період (історія)'
-        })
-
-    def post(self, request):
-        form = BalancePeriodReportForm(request.POST)
-        if not form.is_valid():
-            return render(request, self.template_name, {
-                'form': form,
-                'page': 'reports',
-                'report_title': 'Залишки за період (історія)'
-            })
-
-        date_from = form.cleaned_data['date_from']
-        date_to = form.cleaned_data['date_to']
-        filters = self._prepare_filters(form.cleaned_data)
-
-        try:
-            data = ReportService.get_balance_period_from_history(
-                date_from,
-                date_to,
-                filters
-            )
-        except Exception as e:
-            messages.error(request, f'Помилка формування звіту: {e}')
-            return redirect(request.path)
-
-        pdf_buffer = ReportPDFBuilder.build_balance_period_history_report(
-            data,
-            date_from,
-            date_to,
-            filters
-        )
-
-        result = self.save_report_execution(
-            template=None,
-            report_type='balance_period_history',
-            filters={'date_from': date_from, 'date_to': date_to, **filters},
-            data=data,
-            pdf_buffer=pdf_buffer
-        )
-
-        self.handle_execution_messages(result)
-        
-        if result.get("error") or result.get("duplicate"):
-            return redirect('pdf_balance_period_history')
-        
-        filename = f"Залишки_період_історія_{date_from:%d%m%Y}_{date_to:%d%m%Y}.pdf"
-        return self.generate_pdf_response(pdf_buffer, filename)
+    form_class = BalancePeriodReportForm
+    report_title = 'Залишки за період (історія)'
+    report_type = 'balance_period_history'
 
 
 class ReportTemplateListView(LoginRequiredMixin, ListView):
@@ -750,6 +277,50 @@ class ReportExecutionDownloadView(LoginRequiredMixin, View):
         )
 
 
+class ReportExecutionStatusView(LoginRequiredMixin, View):
+    """Сторінка фонового завдання: прогрес, скасування, завантаження готового файлу."""
+
+    template_name = 'reports/pdf/execution_status.html'
+
+    @staticmethod
+    def status_payload(execution):
+        return {
+            'id': execution.pk,
+            'status': execution.status,
+            'status_display': execution.get_status_display(),
+            'progress': execution.progress,
+            'error': execution.error,
+            'message': execution.message,
+            'is_active': execution.is_active,
+            'download_url': (
+                reverse('report_execution_download', args=[execution.pk])
+                if execution.status == ReportExecutionStatus.DONE and execution.file_path else None
+            ),
+        }
+
+    def get(self, request, pk):
+        execution = get_object_or_404(ReportExecution, pk=pk, executed_by=request.user)
+        if request.GET.get('format') == 'json':
+            return JsonResponse(self.status_payload(execution))
+        return render(request, self.template_name, {
+            'page': 'reports',
+            'execution': execution,
+            'status': self.status_payload(execution),
+        })
+
+
+class ReportExecutionCancelView(LoginRequiredMixin, View):
+    """Скасування завдання, що ще в черзі або формується."""
+
+    def post(self, request, pk):
+        execution = get_object_or_404(ReportExecution, pk=pk, executed_by=request.user)
+        if ReportJobService.cancel(execution):
+            messages.warning(request, 'Формування звіту скасовано')
+        else:
+            messages.info(request, 'Звіт уже сформовано або завдання завершилось')
+        return redirect('report_execution_status', pk=pk)
+
+
 class PDFReportsDashboardView(LoginRequiredMixin, View):
     """Main dashboard for PDF reports."""
     
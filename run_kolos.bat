@@ -72,6 +72,12 @@ REM ------------------------------------
 echo Collecting static files...
 python manage.py collectstatic --noinput
 
+REM ------------------------------------
+REM Report worker (PDF-звіти формуються у фоні)
+REM ------------------------------------
+echo Starting report worker...
+start "Kolos report worker" python manage.py run_report_worker
+
 REM ------------------------------------
 REM Run server
 REM ------------------------------------
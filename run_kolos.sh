@@ -76,6 +76,14 @@ python manage.py migrate --noinput
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
+# ------------------------------------
+# Report worker (PDF-звіти формуються у фоні)
+# ------------------------------------
+echo "Starting report worker..."
+python manage.py run_report_worker &
+WORKER_PID=$!
+trap 'kill $WORKER_PID 2>/dev/null' EXIT
+
 # ------------------------------------
 # Run server
 # ------------------------------------
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('directory', '0001_initial'),
+        ('waste', '0002_alter_recycling_input_quantity_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recycling',
+            index=models.Index(fields=['date_time'], name='recycling_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recycling',
+            index=models.Index(fields=['culture', 'date_time'], name='recycling_cult_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recycling',
+            index=models.Index(fields=['place_from', 'date_time'], name='recycling_from_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recycling',
+            index=models.Index(fields=['place_to', 'date_time'], name='recycling_to_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='utilization',
+            index=models.Index(fields=['date_time'], name='utilization_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='utilization',
+            index=models.Index(fields=['culture', 'date_time'], name='utilization_cult_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='utilization',
+            index=models.Index(fields=['place_from', 'date_time'], name='utilization_from_date_idx'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 from .base import WasteOperation
-from balances.services import BalanceService, BalanceType
+from balances.services import BalanceType
+from balances.postings import PostingRule
 
 
 class Recycling(WasteOperation):
@@ -27,6 +28,12 @@ class Recycling(WasteOperation):
     class Meta:
         verbose_name = "Переробка"
         verbose_name_plural = "Операції переробки"
+        indexes = [
+            models.Index(fields=['date_time'], name='recycling_date_idx'),
+            models.Index(fields=['culture', 'date_time'], name='recycling_cult_date_idx'),
+            models.Index(fields=['place_from', 'date_time'], name='recycling_from_date_idx'),
+            models.Index(fields=['place_to', 'date_time'], name='recycling_to_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.date_time:%d.%m.%Y %H:%M} | Переробка {self.culture.name} {self.input_quantity} т → {self.output_quantity} т у {self.place_from.name} -> {self.place_to.name}"
@@ -35,77 +42,10 @@ class Recycling(WasteOperation):
     def action(self):
         return "recycling"
 
-    def revert_balance(self):
-        """Відкат змін балансу - повертаємо вхід та віднімаємо вихід"""
-        original_input = self.get_original_value('input_quantity')
-        original_output = self.get_original_value('output_quantity')
-        
-        if original_input and original_output:
-            # Повертаємо відходи на склад відправлення
-            BalanceService.adjust_balance(
-                place=self.place_from,
-                culture=self.culture,
-                delta=original_input,
-                balance_type=BalanceType.WASTE
-            )
-            try:
-                # Віднімаємо продукцію зі складу призначення
-                BalanceService.adjust_balance(
-                    place=self.place_to,
-                    culture=self.culture,
-                    delta=-original_output,
-                    balance_type=BalanceType.STOCK
-                )
-            except ValueError:
-                BalanceService.set_balance(
-                    place=self.place_to,
-                    culture=self.culture,
-                    balance_type=BalanceType.STOCK,
-                    quantity=0
-                )
-
-    def update_balance(self):
-        """Оновлення балансу - віднімаємо вхід та додаємо вихід"""
-        input_delta = -self.input_quantity
-        output_delta = self.output_quantity
-        
-        # Якщо це редагування, враховуємо різницю з початковими значеннями
-        original_input = self.get_original_value('input_quantity')
-        original_output = self.get_original_value('output_quantity')
-        
-        input_delta = -(self.input_quantity)
-        output_delta = self.output_quantity
-        
-        BalanceService.adjust_balance(
-            place=self.place_from,
-            culture=self.culture,
-            delta=input_delta,
-            balance_type=BalanceType.WASTE
-        )
-        BalanceService.adjust_balance(
-            place=self.place_to,
-            culture=self.culture,
-            delta=output_delta,
-            balance_type=BalanceType.STOCK
-        )
-
-    def save(self, *args, **kwargs):
-        """Збереження з коректним оновленням балансу"""        
-        is_new = self._state.adding
-        
-        if not is_new:
-            # Для існуючого запису - спочатку відкатуємо старі зміни
-            self.revert_balance()
-        
-        super().save(*args, **kwargs)
-        
-        # Застосовуємо нові зміни балансу
-        self.update_balance()
-        
-        # Оновлюємо початкові значення
-        self._original_values = self._get_operation_values()
-
-    def delete(self, *args, **kwargs):
-        """Видалення з поверненням балансу"""
-        self.revert_balance()
-        super().delete(*args, **kwargs)
\ No newline at end of file
+    @classmethod
+    def balance_posting_rules(cls):
+        """Списання відходів з place_from, прихід продукції на place_to."""
+        return [
+            PostingRule('place_from', 'input_quantity', -1, balance_type=BalanceType.WASTE),
+            PostingRule('place_to', 'output_quantity', +1, balance_type=BalanceType.STOCK),
+        ]